@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+fault_proxy.py - S3 reverse proxy that injects faults, for resilience benchmarking
+
+Sits between a client (warp via S3_ENDPOINT, the functional suite via host/port, Splunk)
+and any S3 endpoint. Per request it can add latency drawn from a distribution, cap
+bandwidth, answer 503 SlowDown, reset the connection, or hold it unanswered during a
+partition. Faults follow a schedule of timed phases, and a seeded RNG makes runs repeatable.
+
+Requests are forwarded with the client's Host header, so SigV4 signatures stay valid;
+the upstream must accept requests addressed to the proxy's host (MinIO, Ceph RGW,
+SeaweedFS, s3tests.standin do; AWS endpoints do not).
+
+Examples:
+  # 20ms +/- jitter and 2% SlowDown in front of a local store
+  python3 fault_proxy.py --upstream http://localhost:9000 --port 9100 \\
+      --latency lognormal:20:0.5 --slowdown-rate 0.02
+
+  # scripted scenario (see README "Fault injection"), stats written on exit
+  python3 fault_proxy.py --upstream https://store:443 --schedule rs1_down.json --stats-file stats.json
+
+Schedule file: {"loop": false, "phases": [{"duration": 60}, {"duration": 30, "partition": true},
+{"duration": 60, "latency": "uniform:50:200", "slowdown_rate": 0.1}]}. Each phase takes the
+same fault options as the command line; after the last phase the proxy passes traffic
+through unchanged (or starts over with "loop": true).
+"""
+
+import argparse
+import http.client
+import json
+import math
+import random
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+CHUNK = 64 * 1024
+
+# Connection-level headers are not forwarded (RFC 7230 6.1); framing is redone per hop
+HOP_BY_HOP = frozenset(('connection', 'keep-alive', 'proxy-connection', 'te', 'trailer',
+                        'transfer-encoding', 'upgrade'))
+# Answered by the proxy itself (100 Continue), not passed on
+PROXY_ANSWERED = HOP_BY_HOP | {'expect'}
+
+SLOWDOWN_BODY = (b'<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>SlowDown</Code>'
+                 b'<Message>Please reduce your request rate.</Message></Error>')
+
+
+def log(msg: str):
+    print(f"[fault_proxy] {msg}", file=sys.stderr, flush=True)
+
+
+def parse_latency(spec):
+    """Parse a latency distribution into a sampler rng -> seconds.
+
+    fixed:MS | uniform:LOW_MS:HIGH_MS | normal:MEAN_MS:STDDEV_MS |
+    lognormal:MEDIAN_MS:SIGMA | exponential:MEAN_MS   (empty/None: no latency)
+    """
+    if not spec:
+        return None
+    kind, *args = str(spec).split(':')
+    try:
+        args = [float(a) for a in args]
+        if kind == 'fixed':
+            ms, = args
+            return lambda rng: ms / 1000.0
+        if kind == 'uniform':
+            low, high = args
+            return lambda rng: rng.uniform(low, high) / 1000.0
+        if kind == 'normal':
+            mean, stddev = args
+            return lambda rng: max(0.0, rng.gauss(mean, stddev)) / 1000.0
+        if kind == 'lognormal':
+            median, sigma = args
+            return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000.0
+        if kind == 'exponential':
+            mean, = args
+            return lambda rng: rng.expovariate(1.0 / mean) / 1000.0
+    except ValueError:
+        pass
+    raise ValueError(f'invalid latency distribution: {spec!r}')
+
+
+class Phase:
+    """Fault settings in effect for `duration` seconds (None: until the end)."""
+
+    __slots__ = ('duration', 'latency_spec', 'latency', 'bandwidth', 'slowdown_rate',
+                 'reset_rate', 'partition')
+
+    def __init__(self, duration=None, latency=None, bandwidth_mibps=0, slowdown_rate=0.0,
+                 reset_rate=0.0, partition=False):
+        self.duration = duration
+        self.latency_spec = latency
+        self.latency = parse_latency(latency)
+        self.bandwidth = bandwidth_mibps * 1024 * 1024 if bandwidth_mibps else None
+        self.slowdown_rate = float(slowdown_rate)
+        self.reset_rate = float(reset_rate)
+        self.partition = bool(partition)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'Phase':
+        unknown = set(d) - {'duration', 'latency', 'bandwidth_mibps', 'slowdown_rate', 'reset_rate', 'partition'}
+        if unknown:
+            raise ValueError(f'unknown phase options: {sorted(unknown)}')
+        return cls(**d)
+
+    def describe(self) -> str:
+        parts = []
+        if self.partition:
+            parts.append('partition')
+        if self.latency_spec:
+            parts.append(f'latency={self.latency_spec}')
+        if self.bandwidth:
+            parts.append(f'bandwidth={self.bandwidth / 1048576:g}MiB/s')
+        if self.slowdown_rate:
+            parts.append(f'slowdown={self.slowdown_rate:g}')
+        if self.reset_rate:
+            parts.append(f'reset={self.reset_rate:g}')
+        return ', '.join(parts) or 'pass-through'
+
+
+PASS_THROUGH = Phase()
+
+
+class FaultSchedule:
+    """Timed phases, starting at start(); current() is the phase in effect now."""
+
+    def __init__(self, phases, loop=False, clock=time.monotonic):
+        self.phases = list(phases)
+        self.loop = loop
+        self.clock = clock
+        self.started = clock()
+
+    @classmethod
+    def load(cls, path) -> 'FaultSchedule':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls([Phase.from_dict(p) for p in data.get('phases', [])], loop=data.get('loop', False))
+
+    def start(self):
+        self.started = self.clock()
+
+    def current(self):
+        """(index, phase, seconds until it ends or None)."""
+        elapsed = self.clock() - self.started
+        total = sum(p.duration or 0 for p in self.phases)
+        if self.loop and total and all(p.duration for p in self.phases):
+            elapsed %= total
+        for i, phase in enumerate(self.phases):
+            if phase.duration is None or elapsed < phase.duration:
+                return i, phase, (phase.duration - elapsed if phase.duration is not None else None)
+            elapsed -= phase.duration
+        return len(self.phases), PASS_THROUGH, None
+
+
+class ProxyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'forwarded': 0, 'slowdown': 0, 'reset': 0, 'partitioned': 0,
+                       'upstream_errors': 0, 'bytes_in': 0, 'bytes_out': 0}
+        self.injected_latency = 0.0
+
+    def add(self, **counts):
+        with self.lock:
+            for name, n in counts.items():
+                self.counts[name] += n
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return dict(self.counts, injected_latency_s=round(self.injected_latency, 3))
+
+
+class FaultProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'fault_proxy'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # -- fault primitives -----------------------------------------------------
+
+    def _throttled_write(self, data, bandwidth):
+        view = memoryview(data)
+        for start in range(0, len(view), CHUNK):
+            chunk = view[start:start + CHUNK]
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+            self.wfile.write(chunk)
+
+    def _reset(self):
+        # SO_LINGER 0: close() sends RST instead of FIN, like a crashed node or a dropped flow
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+        self.server.stats.add(reset=1)
+
+    def _drain_body(self):
+        # the 503 keeps the connection alive, so the body must not be left for the next request to parse
+        if self._is_chunked():
+            try:
+                for _ in self._read_chunks():
+                    pass
+            except ValueError:
+                self.close_connection = True
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        while length > 0:
+            chunk = self.rfile.read(min(CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    def _slowdown(self):
+        self._drain_body()
+        self.server.stats.add(slowdown=1)
+        self.send_response(503)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(SLOWDOWN_BODY)))
+        self.send_header('Retry-After', '1')
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(SLOWDOWN_BODY)
+
+    def _partition(self, remaining):
+        # Nothing comes back while the partition lasts; then the connection is dropped
+        self.server.stats.add(partitioned=1)
+        deadline = time.monotonic() + (remaining if remaining is not None else self.server.partition_hold)
+        while time.monotonic() < deadline and not self.server.stopping.is_set():
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+        self._reset()
+
+    # -- forwarding -----------------------------------------------------------
+
+    def _upstream(self):
+        conn = getattr(self, '_conn', None)
+        if conn is None:
+            u = self.server.upstream
+            if u.scheme == 'https':
+                conn = http.client.HTTPSConnection(u.hostname, u.port or 443, timeout=self.server.upstream_timeout,
+                                                   context=self.server.ssl_context)
+            else:
+                conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=self.server.upstream_timeout)
+            self._conn = conn
+        return conn
+
+    def _is_chunked(self):
+        return 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+
+    def _read_chunks(self):
+        # the decoded chunks of a chunked request body, then its trailers are skipped
+        while True:
+            size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            data = self.rfile.read(size)
+            self.rfile.readline()
+            yield data
+
+    def _request_body(self, bandwidth):
+        length = int(self.headers.get('Content-Length') or 0)
+        if self._is_chunked():
+            # re-framed below with encode_chunked
+            def chunks():
+                for data in self._read_chunks():
+                    self.server.stats.add(bytes_in=len(data))
+                    if bandwidth:
+                        time.sleep(len(data) / bandwidth)
+                    yield data
+            return chunks(), True
+
+        def body():
+            left = length
+            while left > 0:
+                data = self.rfile.read(min(CHUNK, left))
+                if not data:
+                    return
+                left -= len(data)
+                self.server.stats.add(bytes_in=len(data))
+                if bandwidth:
+                    time.sleep(len(data) / bandwidth)
+                yield data
+        return (body() if length else None), False
+
+    def _forward(self, phase):
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in PROXY_ANSWERED}
+        body, chunked = self._request_body(phase.bandwidth)
+        conn = self._upstream()
+        try:
+            conn.putrequest(self.command, self.path, skip_host=True, skip_accept_encoding=True)
+            for name, value in headers.items():
+                conn.putheader(name, value)
+            if chunked:
+                conn.putheader('Transfer-Encoding', 'chunked')
+            conn.endheaders()
+            for data in body or ():
+                conn.send(b'%x\r\n%s\r\n' % (len(data), data) if chunked else data)
+            if chunked:
+                conn.send(b'0\r\n\r\n')
+            resp = conn.getresponse()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            self._conn = None
+            self.server.stats.add(upstream_errors=1)
+            log(f"upstream error on {self.command} {self.path}: {e}")
+            self.send_error(502, 'Bad Gateway')
+            return
+
+        # counted before the client gets the response, so a client that has read it sees the count
+        self.server.stats.add(forwarded=1)
+        self.send_response_only(resp.status, resp.reason)
+        length = resp.getheader('Content-Length')
+        for name, value in resp.getheaders():
+            if name.lower() not in HOP_BY_HOP:
+                self.send_header(name, value)
+        reframe = self.command != 'HEAD' and length is None and resp.status not in (204, 304)
+        if reframe:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        while True:
+            data = resp.read(CHUNK)
+            if not data:
+                break
+            self.server.stats.add(bytes_out=len(data))
+            if reframe:
+                self.wfile.write(b'%x\r\n' % len(data))
+            self._throttled_write(data, phase.bandwidth)
+            if reframe:
+                self.wfile.write(b'\r\n')
+        if reframe:
+            self.wfile.write(b'0\r\n\r\n')
+        if resp.will_close:
+            conn.close()
+            self._conn = None
+
+    def _handle(self):
+        server = self.server
+        server.stats.add(requests=1)
+        index, phase, remaining = server.schedule.current()
+        server.note_phase(index, phase)
+        rng = server.rng
+        with server.rng_lock:
+            draw_reset, draw_slowdown = rng.random(), rng.random()
+            delay = phase.latency(rng) if phase.latency else 0.0
+
+        if phase.partition:
+            return self._partition(remaining)
+        if draw_reset < phase.reset_rate:
+            return self._reset()
+        if delay:
+            with server.stats.lock:
+                server.stats.injected_latency += delay
+            time.sleep(delay)
+        if draw_slowdown < phase.slowdown_rate:
+            return self._slowdown()
+        self._forward(phase)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = do_OPTIONS = _handle
+
+    def finish(self):
+        conn = getattr(self, '_conn', None)
+        if conn is not None:
+            conn.close()
+        super().finish()
+
+
+class FaultProxy(ThreadingHTTPServer):
+    """The proxy on host:port (0: any free port) forwarding to upstream under schedule."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, upstream: str, schedule: FaultSchedule, host='127.0.0.1', port=0, seed=None,
+                 partition_hold=60.0, upstream_timeout=300.0, insecure=False, verbose=False):
+        super().__init__((host, port), FaultProxyHandler)
+        self.upstream = urlsplit(upstream)
+        if self.upstream.scheme not in ('http', 'https') or not self.upstream.hostname:
+            raise ValueError(f'invalid upstream URL: {upstream!r}')
+        self.ssl_context = None
+        if self.upstream.scheme == 'https' and insecure:
+            import ssl
+            self.ssl_context = ssl._create_unverified_context()
+        self.schedule = schedule
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.partition_hold = partition_hold
+        self.upstream_timeout = upstream_timeout
+        self.verbose = verbose
+        self.stats = ProxyStats()
+        self.stopping = threading.Event()
+        self._phase = None
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def note_phase(self, index, phase):
+        if index != self._phase:
+            self._phase = index
+            log(f"phase {index + 1}/{len(self.schedule.phases)}: {phase.describe()}"
+                if index < len(self.schedule.phases) else "schedule finished: pass-through")
+
+    def start(self) -> 'FaultProxy':
+        self.schedule.start()
+        self._thread = threading.Thread(target=self.serve_forever, name='fault-proxy', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='S3 reverse proxy with latency, bandwidth and fault injection')
+    parser.add_argument('--upstream', required=True, help='S3 endpoint URL to forward to')
+    parser.add_argument('--host', default='127.0.0.1', help='listen address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=9100, help='listen port (default: 9100)')
+    parser.add_argument('--schedule', help='JSON schedule of fault phases (overrides the fault options below)')
+    parser.add_argument('--latency', help='latency distribution, e.g. fixed:20, uniform:10:50, normal:30:5, '
+                                          'lognormal:20:0.5, exponential:20 (milliseconds)')
+    parser.add_argument('--bandwidth-mibps', type=float, default=0, help='MiB/s cap per request/response body')
+    parser.add_argument('--slowdown-rate', type=float, default=0.0, help='fraction of requests answered 503 SlowDown')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='fraction of requests whose connection is reset')
+    parser.add_argument('--partition-hold', type=float, default=60.0,
+                        help='seconds a request is held in an open-ended partition phase (default: 60)')
+    parser.add_argument('--seed', type=int, help='seed for latency and fault draws (reproducible runs)')
+    parser.add_argument('--insecure', action='store_true', help='do not verify the upstream TLS certificate')
+    parser.add_argument('--stats-file', help='write request/fault counters as JSON here on exit')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    if args.schedule:
+        schedule = FaultSchedule.load(args.schedule)
+    else:
+        schedule = FaultSchedule([Phase(latency=args.latency, bandwidth_mibps=args.bandwidth_mibps,
+                                        slowdown_rate=args.slowdown_rate, reset_rate=args.reset_rate)])
+    proxy = FaultProxy(args.upstream, schedule, host=args.host, port=args.port, seed=args.seed,
+                       partition_hold=args.partition_hold, insecure=args.insecure, verbose=args.verbose)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    log(f"listening on {proxy.endpoint}, forwarding to {args.upstream}")
+    proxy.schedule.start()
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.stopping.set()
+        proxy.server_close()
+        stats = proxy.stats.to_dict()
+        log(f"stats: {json.dumps(stats)}")
+        if args.stats_file:
+            Path(args.stats_file).write_text(json.dumps(stats, indent=2) + '\n', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
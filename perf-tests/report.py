@@ -82,6 +82,8 @@ def load_data(input_file: Path) -> pd.DataFrame:
             df['object_size'] = df['size']
         else:
             df['object_size'] = '0'
+    # operations without an object (e.g. AssumeRole) chart at size 0
+    df['object_size'] = df['object_size'].fillna('0')
 
     if 'target' not in df.columns:
         try:
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Run a warp benchmark campaign (operations x sizes x concurrency x iterations) for one target.
+
+Called by warp_s3_benchmark.sh for each --target; can also be run directly.
+
+Usage:
+  python3 run_campaign.py --target aws --run-dir results/aws/20260208-020124 \\
+      --sizes 1MiB,16MiB --concurrency 8,32 --operations put,get --iterations 3
+  python3 run_campaign.py --target aws --run-dir results/aws/20260208-020124 --resume
+
+Connection settings come from --target-env FILE, else the S3_* environment variables
+(as exported by warp_s3_benchmark.sh), else targets/<target>.env. Each finished cell is parsed in-process into summary.json
+and its status recorded in manifest.json; --resume re-runs every cell not recorded as done
+(failed, interrupted or never started).
+"""
+
+import argparse
+import os
+import signal
+import sys
+from pathlib import Path
+
+from warp_campaign import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_OBJECTS,
+    MANIFEST_FILE,
+    Campaign,
+    DatasetManager,
+    Target,
+    WarpPrepDatasets,
+    WarpRunner,
+    build_plan,
+    read_plan,
+    size_to_bytes,
+)
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+
+def load_target(args) -> Target:
+    if args.target_env:
+        return Target.from_env_file(args.target, Path(args.target_env))
+    if os.environ.get('S3_ENDPOINT'):
+        return Target.from_environ(args.target)
+    return Target.from_env_file(args.target, SCRIPT_DIR / 'targets' / f'{args.target}.env')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', required=True, help='Target name (results/<target>/...)')
+    parser.add_argument('--run-dir', required=True, help='Run directory (raw/, summary.json, manifest.json)')
+    parser.add_argument('--target-env', help='Target env file (default: S3_* environment, then targets/<target>.env)')
+    parser.add_argument('--operations', default='put,get,delete,list,mixed', help='Comma-separated operations')
+    parser.add_argument('--sizes', default='4KiB,64KiB,1MiB,16MiB,128MiB,750MiB', help='Comma-separated object sizes')
+    parser.add_argument('--concurrency', default='1,8,32,128', help='Comma-separated concurrency levels')
+    parser.add_argument('--iterations', type=int, default=3, help='Iterations per cell')
+    parser.add_argument('--duration', default='5m', help='Measured duration per cell')
+    parser.add_argument('--warmup', default='30s', help='Warmup run per cell (0 to disable)')
+    parser.add_argument('--objects', type=int, default=DEFAULT_OBJECTS, help='Objects per GET/DELETE dataset')
+    parser.add_argument('--dataset-max-size', default=f'{DEFAULT_MAX_BYTES >> 30}GiB',
+                        help='Cap on the total size of one dataset (fewer objects for large sizes)')
+    parser.add_argument('--upload-workers', type=int, default=32, help='Parallel uploads when filling a dataset')
+    parser.add_argument('--prep-duration', default='30s',
+                        help='Upload duration of the warp fallback used when boto3 is not installed')
+    parser.add_argument('--overlap-prep', action='store_true',
+                        help="Upload objects for the next cell during the current cell's measurement (different prefixes only)")
+    parser.add_argument('--heartbeat-interval', type=float, default=30, help='Seconds between progress lines')
+    parser.add_argument('--timeout-buffer', type=float, default=30, help='Seconds past --duration before a run is killed')
+    parser.add_argument('--resume', action='store_true',
+                        help='Re-use the run dir plan and skip cells its manifest records as done')
+    args = parser.parse_args()
+
+    try:
+        target = load_target(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    run_dir = Path(args.run_dir).resolve()
+    if args.resume and not (run_dir / MANIFEST_FILE).is_file():
+        print(f"Error: nothing to resume, no {MANIFEST_FILE} in {run_dir}", file=sys.stderr)
+        sys.exit(2)
+    run_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.resume and (run_dir / 'planned_tests.json').exists():
+        # The matrix of the interrupted run wins over the current command line
+        plan = read_plan(run_dir)
+    else:
+        plan = build_plan(args.operations, args.sizes, args.concurrency, args.iterations)
+    runner = WarpRunner(heartbeat_interval=args.heartbeat_interval,
+                        timeout_buffer=args.timeout_buffer, mask=target.mask)
+    try:
+        datasets = DatasetManager(target, objects=args.objects, max_bytes=size_to_bytes(args.dataset_max_size),
+                                  workers=args.upload_workers)
+    except RuntimeError as e:
+        print(f"[WARN] {e}; filling GET/DELETE datasets with timed 'warp put' runs instead", file=sys.stderr)
+        datasets = WarpPrepDatasets(target, runner, run_dir / 'raw', args.prep_duration)
+    campaign = Campaign(target, plan, run_dir, args.duration, args.warmup, runner=runner,
+                        overlap_prep=args.overlap_prep, datasets=datasets)
+    # Treat TERM like Ctrl-C: stop the running warp and leave the manifest resumable
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        results = campaign.run(resume=args.resume)
+    except KeyboardInterrupt:
+        print(f"Interrupted; resume with: python3 {Path(__file__).name} --target {args.target} "
+              f"--run-dir {run_dir} --resume", file=sys.stderr)
+        sys.exit(130)
+
+    failed = sum(1 for r in results if r.error)
+    print(f"Wrote {len(results)} entries to {campaign.summary_file} ({failed} failed)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
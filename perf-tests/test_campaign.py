@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for the warp campaign orchestrator and its resume manifest (no S3 required).
+
+Run from perf-tests/:
+  python3 test_campaign.py
+  pytest test_campaign.py -v   # if pytest installed
+"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+# Allow running from repo root or perf-tests/
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from warp_campaign import Campaign, Target, WarpRunner, build_plan
+
+
+FAKE_WARP = """#!{python}
+import os, sys, time
+with open(os.environ["FAKE_WARP_LOG"], "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+op = sys.argv[1]
+if op in os.environ.get("FAKE_WARP_FAIL", "").split(",") and "--quiet" not in sys.argv:
+    print("warp: connection reset")
+    sys.exit(1)
+if "--json" in sys.argv:
+    print("Throughput ... Terminating benchmark.")
+    print('{{"v": 2, "total": {{"total_requests": 10, "throughput": {{"measure_duration_millis": 1000, "bytes": 1048576, "ops": 10}}}}}}')
+time.sleep(float(os.environ.get("FAKE_WARP_SLEEP", "0")))
+"""
+
+
+def _fake_warp_env(tmp):
+    warp = Path(tmp) / "bin" / "warp"
+    warp.parent.mkdir()
+    warp.write_text(FAKE_WARP.format(python=sys.executable))
+    warp.chmod(warp.stat().st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = f"{warp.parent}{os.pathsep}{os.environ['PATH']}"
+    os.environ["FAKE_WARP_LOG"] = str(Path(tmp) / "warp.log")
+    return Path(tmp) / "warp.log"
+
+
+def test_campaign_runs_plan_and_resumes():
+    saved_env = dict(os.environ)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            warp_log = _fake_warp_env(tmp)
+            target = Target("t", {"S3_ENDPOINT": "localhost:9000", "S3_ACCESS_KEY": "ak", "S3_SECRET_KEY": "sk",
+                                  "S3_BUCKET": "bench", "S3_TLS": "false"})
+            assert target.host == "localhost:9000" and "--insecure" in target.warp_args()
+            plan = build_plan("get, put", "1MiB", "1,8", 1)
+            assert [c.name for c in plan] == ["get_1MiB_c1_i1", "get_1MiB_c8_i1", "put_1MiB_c1_i1", "put_1MiB_c8_i1"]
+            run_dir = Path(tmp) / "t" / "run"
+            runner = WarpRunner(heartbeat_interval=0.05, timeout_buffer=0.5, kill_grace=0.5)
+
+            os.environ["FAKE_WARP_FAIL"] = "put"
+            results = Campaign(target, plan, run_dir, "1s", "0s", runner=runner, overlap_prep=True).run()
+            assert [bool(r.error) for r in results] == [False, False, True, True]
+            calls = warp_log.read_text().splitlines()
+            # Both GET concurrency levels read the same 1MiB dataset, uploaded once
+            preps = [c for c in calls if c.startswith("put") and "--quiet" in c]
+            assert len(preps) == 1 and "--noclear" in preps[0]
+            assert all("warp-bench/t/datasets/1MiB" in c for c in calls if c.startswith("get"))
+            assert json.loads((run_dir / "summary.json").read_text())[0]["total_operations"] == 10
+
+            manifest = json.loads((run_dir / "manifest.json").read_text())["cells"]
+            assert manifest["get_1MiB_c1_i1"]["status"] == "done"
+            assert manifest["put_1MiB_c1_i1"]["status"] == "failed"
+            assert manifest["put_1MiB_c1_i1"]["exit_code"] == 1
+            assert manifest["put_1MiB_c1_i1"]["parse_status"] == "parse_error"
+
+            # Simulate an interruption during get c1 and a lost raw file for get c8
+            manifest["get_1MiB_c1_i1"]["status"] = "running"
+            (run_dir / "manifest.json").write_text(json.dumps({"version": 1, "cells": manifest}))
+            (run_dir / "raw" / "get_1MiB_c8_i1.json").unlink()
+
+            del os.environ["FAKE_WARP_FAIL"]
+            warp_log.write_text("")
+            campaign = Campaign(target, plan, run_dir, "1s", "0s", runner=runner)
+            assert campaign.manifest.counts(plan) == {"pending": 1, "running": 1, "done": 0, "failed": 2}
+            results = campaign.run(resume=True)
+            assert not any(r.error for r in results) and len(results) == 4
+            measured = [c.split()[0] for c in warp_log.read_text().splitlines() if "--quiet" not in c]
+            assert measured == ["get", "get", "put", "put"]
+            manifest = json.loads((run_dir / "manifest.json").read_text())["cells"]
+            assert {e["status"] for e in manifest.values()} == {"done"}
+            assert manifest["put_1MiB_c8_i1"]["attempts"] == 2
+
+            # Nothing left to do: a second resume runs no warp at all
+            warp_log.write_text("")
+            Campaign(target, plan, run_dir, "1s", "0s", runner=runner).run(resume=True)
+            assert warp_log.read_text() == ""
+
+            # runs overrunning --duration plus the buffer are killed
+            os.environ["FAKE_WARP_SLEEP"] = "30"
+            rc = runner.run(["warp", "put", "--duration", "1s"], Path(tmp) / "slow.json")
+            assert rc == 124
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+def run_all():
+    tests = [
+        test_campaign_runs_plan_and_resumes,
+    ]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except Exception as e:
+            print(f"FAIL {t.__name__}: {e}")
+            failed += 1
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
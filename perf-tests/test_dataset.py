@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared GET/DELETE datasets (no S3 required).
+
+Run from perf-tests/:
+  python3 test_dataset.py
+  pytest test_dataset.py -v   # if pytest installed
+"""
+
+import sys
+from pathlib import Path
+
+# Allow running from repo root or perf-tests/
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from warp_campaign import DatasetManager, PatternReader, Target, size_to_bytes
+
+
+class FakeS3:
+    """Minimal client for DatasetManager: a key set with put_object/upload_fileobj/listing."""
+
+    def __init__(self):
+        self.keys = {}
+        self.puts = 0
+
+    def put_object(self, Bucket, Key, Body):
+        self.keys[Key] = len(Body)
+        self.puts += 1
+
+    def upload_fileobj(self, fileobj, bucket, key, Config=None):
+        size = 0
+        while True:
+            chunk = fileobj.read(1 << 20)
+            if not chunk:
+                break
+            size += len(chunk)
+        self.keys[key] = size
+        self.puts += 1
+
+    def get_paginator(self, name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for k in client.keys if k.startswith(Prefix))
+                for i in range(0, len(keys), 2):
+                    yield {"Contents": [{"Key": k} for k in keys[i:i + 2]]}
+        return Paginator()
+
+
+def test_dataset_manager_tops_up_consumed_objects():
+    assert size_to_bytes("4KiB") == 4096 and size_to_bytes("750MiB") == 750 << 20 and size_to_bytes("1MB") == 10 ** 6
+    reader = PatternReader(b"abc", 8)
+    assert reader.read() == b"abcabcab"
+    reader.seek(4)
+    assert reader.read(3) == b"bca"
+
+    target = Target("t", {"S3_ENDPOINT": "http://localhost:9000", "S3_ACCESS_KEY": "ak", "S3_SECRET_KEY": "sk",
+                          "S3_BUCKET": "bench"})
+    s3 = FakeS3()
+    datasets = DatasetManager(target, objects=10, max_bytes=100 << 20, workers=4, client=s3)
+    # 10 objects, capped by max_bytes: 100MiB / 64MiB -> a single object
+    assert datasets.object_count("64MiB") == 1 and datasets.object_count("4KiB") == 10
+
+    assert datasets.ensure("4KiB") == 10
+    assert datasets.ensure("4KiB") == 0 and s3.puts == 10
+    assert all(size == 4096 for size in s3.keys.values())
+
+    # A DELETE cell removed some objects; only those are uploaded again
+    for key in sorted(s3.keys)[:3]:
+        del s3.keys[key]
+    datasets.consumed("4KiB")
+    assert datasets.ensure("4KiB") == 3 and s3.puts == 13
+
+    assert datasets.ensure("65MiB") == 1
+    assert s3.keys["warp-bench/t/datasets/65MiB/obj000000"] == 65 << 20
+
+
+def run_all():
+    tests = [
+        test_dataset_manager_tops_up_consumed_objects,
+    ]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except Exception as e:
+            print(f"FAIL {t.__name__}: {e}")
+            failed += 1
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
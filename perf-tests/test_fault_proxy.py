@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the fault and latency injection proxy (no S3 required).
+
+Run from perf-tests/:
+  python3 test_fault_proxy.py
+  pytest test_fault_proxy.py -v   # if pytest installed
+"""
+
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Allow running from repo root or perf-tests/
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from fault_proxy import FaultProxy, FaultSchedule, Phase, parse_latency
+
+
+def test_fault_proxy_latency_and_schedule():
+    for spec in ("fixed:20", "uniform:10:50", "normal:30:5", "lognormal:20:0.5", "exponential:20"):
+        sampler = parse_latency(spec)
+        a = [sampler(random.Random(1)) for _ in range(3)]
+        assert a == [sampler(random.Random(1)) for _ in range(3)] and all(x >= 0 for x in a)
+    assert parse_latency("fixed:20")(None) == 0.02 and parse_latency("") is None
+    for bad in ("gamma:1", "uniform:1", "fixed:x"):
+        try:
+            parse_latency(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad} accepted")
+
+    now = [0.0]
+    schedule = FaultSchedule([Phase(duration=10), Phase(duration=5, partition=True)], clock=lambda: now[0])
+    assert schedule.current()[0] == 0
+    now[0] = 12
+    index, phase, remaining = schedule.current()
+    assert index == 1 and phase.partition and remaining == 3
+    now[0] = 16
+    assert schedule.current()[1].describe() == "pass-through"
+    schedule.loop = True
+    assert schedule.current()[0] == 0
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        data = json.dumps({"host": self.headers["Host"], "path": self.path, "length": len(body),
+                           "expect": self.headers.get("Expect")}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        # chunked response without Content-Length
+        self.send_response(200)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for part in (b"hello ", b"world"):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _proxy_request(proxy, method, path, body=None):
+    host, port = proxy.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        conn.request(method, path, body=body, headers={"Expect": "100-continue"} if body else {})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def test_fault_proxy_forwards_and_injects():
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d" % upstream.server_address[1]
+    try:
+        with FaultProxy(url, FaultSchedule([Phase()]), seed=1) as proxy:
+            status, body = _proxy_request(proxy, "PUT", "/bucket/key?x=1", b"x" * 200000)
+            echo = json.loads(body)
+            # the client's Host reaches the upstream, so request signatures still match
+            assert status == 200 and echo["length"] == 200000 and echo["path"] == "/bucket/key?x=1"
+            assert echo["host"] == "127.0.0.1:%d" % proxy.server_address[1] and echo["expect"] is None
+            assert _proxy_request(proxy, "GET", "/bucket/key") == (200, b"hello world")
+            assert proxy.stats.to_dict()["forwarded"] == 2
+
+        with FaultProxy(url, FaultSchedule([Phase(slowdown_rate=1.0)])) as proxy:
+            status, body = _proxy_request(proxy, "PUT", "/b/k", b"data")
+            assert status == 503 and b"<Code>SlowDown</Code>" in body
+            # a chunked body is drained too, so the kept-alive connection parses the next request
+            host, port = proxy.server_address[:2]
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            try:
+                for _ in range(2):
+                    conn.request("PUT", "/b/k", body=iter([b"abc", b"defgh"]), encode_chunked=True)
+                    resp = conn.getresponse()
+                    assert resp.status == 503 and b"<Code>SlowDown</Code>" in resp.read()
+            finally:
+                conn.close()
+            assert proxy.stats.to_dict()["slowdown"] == 3
+
+        with FaultProxy(url, FaultSchedule([Phase(latency="fixed:100")])) as proxy:
+            start = time.monotonic()
+            assert _proxy_request(proxy, "GET", "/b/k")[0] == 200
+            assert time.monotonic() - start >= 0.1
+
+        with FaultProxy(url, FaultSchedule([Phase(reset_rate=1.0)])) as proxy:
+            try:
+                _proxy_request(proxy, "GET", "/b/k")
+            except (ConnectionError, http.client.HTTPException):
+                pass
+            else:
+                raise AssertionError("connection not reset")
+            assert proxy.stats.to_dict()["reset"] == 1
+
+        # requests during a partition hang until it ends, then fail; traffic resumes after
+        with FaultProxy(url, FaultSchedule([Phase(duration=0.5, partition=True)])) as proxy:
+            start = time.monotonic()
+            try:
+                _proxy_request(proxy, "GET", "/b/k")
+            except (ConnectionError, http.client.HTTPException):
+                pass
+            else:
+                raise AssertionError("request passed a partition")
+            assert time.monotonic() - start >= 0.4
+            assert _proxy_request(proxy, "GET", "/b/k") == (200, b"hello world")
+    finally:
+        upstream.shutdown()
+        upstream.server_close()
+
+
+def run_all():
+    tests = [
+        test_fault_proxy_latency_and_schedule,
+        test_fault_proxy_forwards_and_injects,
+    ]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except Exception as e:
+            print(f"FAIL {t.__name__}: {e}")
+            failed += 1
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
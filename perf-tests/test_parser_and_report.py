@@ -7,6 +7,7 @@ Run from perf-tests/:
   pytest test_parser_and_report.py -v   # if pytest installed
 """
 
+import io
 import json
 import sys
 import tempfile
@@ -17,7 +18,16 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 if str(SCRIPT_DIR) not in sys.path:
     sys.path.insert(0, str(SCRIPT_DIR))
 
-from reparse_warp_raw import extract_json_from_raw, parse_warp_v2, parse_raw_filename
+from reparse_warp_raw import extract_json_from_raw, parse_warp_v2, parse_raw_filename, reparse_run_dir
+from warp_parser import (
+    SCHEMA_VERSION,
+    SUMMARY_FIELDS,
+    WARP_FORMAT_LEGACY,
+    WARP_FORMAT_V2,
+    CellResult,
+    extract_json_fields,
+    parse_raw_file,
+)
 
 
 # Minimal warp v2 JSON (one GET run) with leading junk like real warp output
@@ -82,6 +92,84 @@ def test_parse_warp_v2_extracts_metrics():
     assert parsed["avg_latency_ms"] == 20.5
 
 
+def test_extract_json_streaming_chunk_boundaries():
+    """Chunk splits inside strings/escapes/numbers must not change the result."""
+    raw = (
+        "\x1b[2K\rProgress 50%\n"
+        + WARP_RAW_WITH_LEADING_JUNK.strip()[:-1]
+        + ', "by_host": {"h\\"{1": [1, {"x": "}]"}], "n": -1.5e3, "b": true, "z": null}}'
+        + "\nwarp: trailing junk {"
+    )
+    expected = extract_json_from_raw(raw)
+    assert expected["by_host"]['h"{1'][1] == {"x": "}]"}
+    for chunk_size in (1, 2, 3, 7, 64):
+        data = extract_json_fields(io.StringIO(raw), chunk_size=chunk_size)
+        assert data == expected, chunk_size
+
+
+def test_extract_json_fields_skips_unwanted_members():
+    raw = WARP_RAW_WITH_LEADING_JUNK.replace('"v": 2,', '"v": 2, "by_client": ' + json.dumps([{"k": "{" * 50}] * 100) + ',')
+    data = extract_json_fields(io.StringIO(raw), SUMMARY_FIELDS, chunk_size=256)
+    assert set(data) == {"v", "total", "by_op_type"}
+    assert parse_warp_v2(data, "get")["p99_latency_ms"] == 26.0
+    assert extract_json_from_raw('no json here') is None
+    assert extract_json_from_raw('noise {"total": {"total_requests": 1') is None
+
+
+def test_reparse_run_dir_process_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = Path(tmp) / "aws" / "20260101-000000" / "raw"
+        raw_dir.mkdir(parents=True)
+        for i in (1, 2, 3):
+            (raw_dir / f"get_1MiB_c8_i{i}.json").write_text(WARP_RAW_WITH_LEADING_JUNK)
+        (raw_dir / "put_1MiB_c8_i1.json").write_text("warp: connection refused\n")
+        (raw_dir / "prep_1MiB_c8.json").write_text("{}")
+        run_dir = raw_dir.parent
+        serial = reparse_run_dir(run_dir, "aws", jobs=1)
+        pooled = reparse_run_dir(run_dir, "aws", jobs=2)
+        assert serial == pooled
+        assert [e["iteration"] for e in serial] == [1, 2, 3]
+        assert all(e["total_operations"] == 100 for e in serial)
+
+
+def test_cell_result_schema_and_formats():
+    with tempfile.TemporaryDirectory() as tmp:
+        info = parse_raw_filename("get_1MiB_c8_i2.json")
+        v2_path = Path(tmp) / "v2.json"
+        v2_path.write_text(WARP_RAW_WITH_LEADING_JUNK)
+        legacy_path = Path(tmp) / "legacy.json"
+        legacy_path.write_text('noise\n[{"throughput_mb": 12.5, "latency_p99_ms": 9, "operations": 40, "errors": null}]')
+        bad_path = Path(tmp) / "bad.json"
+        bad_path.write_text("FATAL: unable to connect")
+
+        v2 = parse_raw_file(v2_path, "aws", info)
+        assert v2.warp_format == WARP_FORMAT_V2
+        assert v2.total_operations == 100 and v2.p99_latency_ms == 26.0
+        legacy = parse_raw_file(legacy_path, "aws", info)
+        assert legacy.warp_format == WARP_FORMAT_LEGACY
+        assert legacy.throughput_mbps == 12.5 and legacy.errors == 0
+        assert parse_raw_file(bad_path, "aws", info) is None
+        bad = parse_raw_file(bad_path, "aws", info, keep_errors=True)
+        assert bad.error == "parse_error" and bad.error_rate == 1.0
+
+    entry = v2.to_dict()
+    assert entry["schema_version"] == SCHEMA_VERSION
+    assert entry["concurrency"] == 8 and entry["iteration"] == 2
+    assert "error" not in entry
+    assert CellResult.from_dict(entry) == v2
+    assert CellResult.from_dict(bad.to_dict()) == bad
+    # pre-versioning entries (no schema_version) still load
+    unversioned = {k: v for k, v in entry.items() if k not in ("schema_version", "warp_format")}
+    assert CellResult.from_dict(unversioned).throughput_mbps == v2.throughput_mbps
+    try:
+        CellResult.from_dict(dict(entry, schema_version=SCHEMA_VERSION + 1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("newer schema_version accepted")
+    assert not hasattr(v2, "__dict__")
+
+
 def test_parse_raw_filename():
     assert parse_raw_filename("get_1MiB_c1_i1.json") == {
         "operation": "get",
@@ -154,12 +242,59 @@ def test_report_load_data_and_aggregate():
         path.unlink(missing_ok=True)
 
 
+def test_report_load_data_without_object_size():
+    """Rows of operations without an object (object_size null) are kept, at size 0."""
+    try:
+        import pandas as pd
+    except ImportError:
+        print("SKIP report test (pandas not installed)", file=sys.stderr)
+        return
+    report = __import__("report", fromlist=["load_data", "aggregate_iterations"])
+
+    summary = [
+        {
+            "target": "aws",
+            "operation": "sts-assume-role",
+            "object_size": None,
+            "concurrency": 1,
+            "iteration": iteration,
+            "throughput_mbps": 0.0,
+            "ops_per_sec": 50.0,
+            "avg_latency_ms": 20.0,
+            "p50_latency_ms": 19.0,
+            "p90_latency_ms": 24.0,
+            "p99_latency_ms": 26.0,
+            "total_operations": 20,
+            "errors": 0,
+            "error_rate": 0,
+        }
+        for iteration in (1, 2)
+    ]
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
+        json.dump(summary, f)
+        path = Path(f.name)
+    try:
+        df = report.load_data(path)
+        assert len(df) == 2
+        assert set(df["size_bytes"]) == {0}
+        agg = report.aggregate_iterations(df)
+        assert len(agg) == 1
+        assert agg.iloc[0]["total_operations"] == 40
+    finally:
+        path.unlink(missing_ok=True)
+
+
 def run_all():
     tests = [
         test_extract_json_strips_leading_junk,
         test_parse_warp_v2_extracts_metrics,
+        test_extract_json_streaming_chunk_boundaries,
+        test_extract_json_fields_skips_unwanted_members,
+        test_reparse_run_dir_process_pool,
+        test_cell_result_schema_and_formats,
         test_parse_raw_filename,
         test_report_load_data_and_aggregate,
+        test_report_load_data_without_object_size,
     ]
     failed = 0
     for t in tests:
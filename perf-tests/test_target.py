@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for target configuration (no S3 required).
+
+Run from perf-tests/:
+  python3 test_target.py
+  pytest test_target.py -v   # if pytest installed
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Allow running from repo root or perf-tests/
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+from warp_campaign import Target, load_s3tests_conf
+
+
+def test_target_from_s3tests_conf():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "s3tests").mkdir()
+        (tmp / "s3tests" / "splunk.conf").write_text(
+            "[DEFAULT]\nhost = store.local\nis_secure = False\n"
+            "[s3 main]\naccess_key = mainak\nsecret_key = mainsk\n"
+            "[s3 alt]\naccess_key = altak\nsecret_key = altsk\n")
+        (tmp / "targets").mkdir()
+        env_file = tmp / "targets" / "store.env"
+        env_file.write_text("S3TESTS_CONFIG=../s3tests/splunk.conf\nS3_BUCKET=bench\n")
+        target = Target.from_env_file("store", env_file)
+        assert (target.endpoint, target.access_key, target.secret_key) == ("http://store.local:80", "mainak", "mainsk")
+        assert target.bucket == "bench" and not target.tls
+
+        # the env file's own settings and section choice win
+        env_file.write_text("S3TESTS_CONFIG=../s3tests/splunk.conf\nS3TESTS_SECTION=s3 alt\n"
+                            "S3_BUCKET=bench\nS3_ENDPOINT=http://127.0.0.1:9100\n")
+        target = Target.from_env_file("store", env_file)
+        assert (target.endpoint, target.access_key) == ("http://127.0.0.1:9100", "altak")
+        assert load_s3tests_conf(tmp / "s3tests" / "splunk.conf")["S3_TLS"] == "false"
+
+        # warp_s3_benchmark.sh gets the same values, whatever S3TEST_CONF the shell exports
+        env = dict(os.environ, S3TEST_CONF="s3tests/splunk.conf")
+        output = subprocess.run([sys.executable, str(Path(__file__).parent / "warp_campaign" / "target.py"),
+                                 str(env_file)], env=env, stdout=subprocess.PIPE, universal_newlines=True,
+                                check=True).stdout
+        assert output.splitlines() == ["S3_ACCESS_KEY=altak", "S3_SECRET_KEY=altsk", "S3_TLS=false"]
+
+
+def run_all():
+    tests = [
+        test_target_from_s3tests_conf,
+    ]
+    failed = 0
+    for t in tests:
+        try:
+            t()
+            print(f"PASS {t.__name__}")
+        except Exception as e:
+            print(f"FAIL {t.__name__}: {e}")
+            failed += 1
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
@@ -0,0 +1,36 @@
+"""
+Python orchestrator for warp benchmark campaigns (used by warp_s3_benchmark.sh via run_campaign.py).
+"""
+
+from .dataset import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_OBJECTS,
+    DatasetManager,
+    PatternReader,
+    WarpPrepDatasets,
+    make_s3_client,
+    size_to_bytes,
+)
+from .manifest import (
+    CELL_DONE,
+    CELL_FAILED,
+    CELL_PENDING,
+    CELL_RUNNING,
+    MANIFEST_FILE,
+    MANIFEST_VERSION,
+    Manifest,
+    write_json_atomic,
+)
+from .orchestrator import Campaign
+from .plan import (
+    DEFAULT_OPERATIONS,
+    READS_EXISTING,
+    Cell,
+    build_plan,
+    dataset_prefix,
+    read_plan,
+    split_list,
+    write_plan,
+)
+from .runner import TIMEOUT_EXIT, WarpRunner, duration_to_seconds, human_readable_seconds, warp_command
+from .target import Target, load_env_file, load_s3tests_conf
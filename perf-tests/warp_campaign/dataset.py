@@ -0,0 +1,244 @@
+"""
+Shared object datasets for the cells that read existing objects (GET, DELETE).
+
+Those cells run warp with --list-existing against warp-bench/<target>/datasets/<size>, one dataset per
+object size shared by every concurrency level and iteration. A dataset is uploaded once per
+campaign; after a DELETE cell the prefix is listed again and only the deleted objects are
+uploaded (topped up).
+
+DatasetManager uploads with boto3 in a thread pool and tracks the keys that are alive.
+Without boto3, WarpPrepDatasets falls back to a timed `warp put --noclear` per dataset.
+"""
+
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+except ImportError:  # DatasetManager needs boto3; WarpPrepDatasets does not
+    boto3 = None
+
+from .plan import dataset_prefix
+from .runner import log, warn, warp_command
+
+DEFAULT_OBJECTS = 1000
+DEFAULT_MAX_BYTES = 16 << 30      # cap per dataset, so 750MiB datasets stay a few dozen objects
+DEFAULT_WORKERS = 32
+
+# Objects above this go through multipart upload_fileobj; smaller ones are single PUTs
+MULTIPART_THRESHOLD = 64 << 20
+PATTERN_BLOCK = 1 << 20
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]i?B?|B)?\s*$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'B': 1}
+for _i, _p in enumerate('KMGT', 1):
+    _SIZE_UNITS[_p] = _SIZE_UNITS[_p + 'B'] = 1000 ** _i
+    _SIZE_UNITS[_p + 'I'] = _SIZE_UNITS[_p + 'IB'] = 1024 ** _i
+
+
+def size_to_bytes(size: str) -> int:
+    """Convert warp object sizes ("4KiB", "750MiB", "1MB", "4096") into bytes."""
+    m = _SIZE_RE.match(str(size))
+    if not m:
+        raise ValueError(f'invalid object size: {size!r}')
+    return int(float(m.group(1)) * _SIZE_UNITS[(m.group(2) or '').upper()])
+
+
+class PatternReader(io.RawIOBase):
+    """Seekable stream of `length` bytes repeating `block`, for multipart uploads without
+    holding a whole 750MiB object in memory (boto3 seeks back on retries)."""
+
+    def __init__(self, block: bytes, length: int):
+        self.block = block
+        self.length = length
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.length}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def readinto(self, buf):
+        n = min(len(buf), self.length - self.pos)
+        if n <= 0:
+            return 0
+        view = memoryview(buf)
+        done = 0
+        while done < n:
+            start = (self.pos + done) % len(self.block)
+            chunk = min(n - done, len(self.block) - start)
+            view[done:done + chunk] = self.block[start:start + chunk]
+            done += chunk
+        self.pos += n
+        return n
+
+
+def make_s3_client(target, max_pool_connections: int = DEFAULT_WORKERS):
+    """boto3 S3 client for a Target (same endpoint, credentials and addressing as warp)."""
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        retries={'max_attempts': 5, 'mode': 'standard'},
+        s3={'addressing_style': 'path' if target.path_style else 'auto'},
+    )
+    return boto3.client(
+        's3',
+        endpoint_url=target.endpoint,
+        aws_access_key_id=target.access_key,
+        aws_secret_access_key=target.secret_key,
+        region_name=target.region or 'us-east-1',
+        verify=target.tls,
+        config=config,
+    )
+
+
+class DatasetManager:
+    """Uploads and tops up the per-size datasets of one target with a pool of boto3 workers.
+
+    Dataset keys are <prefix>/obj<NNNNNN>; a dataset holds `objects` of them, capped at
+    max_bytes in total. `alive` caches the keys known to exist per size; consumed() drops
+    that cache, so the next ensure() lists the prefix and uploads only what is missing.
+    """
+
+    def __init__(self, target, objects: int = DEFAULT_OBJECTS, max_bytes: int = DEFAULT_MAX_BYTES,
+                 workers: int = DEFAULT_WORKERS, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError('DatasetManager needs boto3 (pip install boto3) or an explicit client')
+            # multipart uploads run up to 4 part uploads each
+            client = make_s3_client(target, max_pool_connections=workers * 4)
+        self.target = target
+        self.client = client
+        self.objects = objects
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.alive = {}
+        self._cancelled = threading.Event()
+
+    def prefix(self, size: str) -> str:
+        return dataset_prefix(self.target.name, size)
+
+    def object_count(self, size: str) -> int:
+        return max(1, min(self.objects, self.max_bytes // max(1, size_to_bytes(size))))
+
+    def keys(self, size: str) -> list:
+        prefix = self.prefix(size)
+        return [f'{prefix}/obj{i:06d}' for i in range(self.object_count(size))]
+
+    def list_alive(self, size: str) -> set:
+        alive = set()
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.target.bucket, Prefix=self.prefix(size) + '/'):
+            alive.update(obj['Key'] for obj in page.get('Contents', ()))
+        return alive
+
+    def _upload(self, key: str, length: int, block: bytes, body: bytes):
+        if self._cancelled.is_set():
+            raise RuntimeError('upload cancelled')
+        if body is not None:
+            self.client.put_object(Bucket=self.target.bucket, Key=key, Body=body)
+        else:
+            config = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD, max_concurrency=4,
+                                    multipart_chunksize=MULTIPART_THRESHOLD // 4)
+            self.client.upload_fileobj(PatternReader(block, length), self.target.bucket, key, Config=config)
+
+    def ensure(self, size: str) -> int:
+        """Make the dataset for size complete; returns the number of objects uploaded."""
+        if size not in self.alive:
+            self.alive[size] = self.list_alive(size)
+        alive = self.alive[size]
+        missing = [k for k in self.keys(size) if k not in alive]
+        if not missing:
+            return 0
+        length = size_to_bytes(size)
+        block = os.urandom(min(length, PATTERN_BLOCK) or 1)
+        # Single-PUT objects share one immutable payload across all workers
+        body = PatternReader(block, length).read() if length <= MULTIPART_THRESHOLD else None
+        log(f"Uploading {len(missing)} test objects (size={size}, prefix={self.prefix(size)}, "
+            f"{len(alive)} already present, {self.workers} workers)...")
+        uploaded = 0
+        failures = []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+            futures = {pool.submit(self._upload, key, length, block, body): key for key in missing}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:  # keep the rest of the dataset; warp reads whatever exists
+                    failures.append((futures[future], e))
+                else:
+                    alive.add(futures[future])
+                    uploaded += 1
+        if failures:
+            key, e = failures[0]
+            warn(f"Failed to upload {len(failures)} of {len(missing)} test objects (first: {key}: {e}). "
+                 "Read operations may fail.")
+        else:
+            log("Test objects prepared successfully")
+        return uploaded
+
+    def consumed(self, size: str):
+        """Note that a cell deleted objects of the size dataset."""
+        self.alive.pop(size, None)
+
+    def cancel(self):
+        """Skip the uploads not started yet (used when the campaign is interrupted)."""
+        self._cancelled.set()
+
+
+class WarpPrepDatasets:
+    """Fallback without boto3: fill a dataset with a timed `warp put --noclear` run.
+
+    The number of objects is whatever warp uploads in `duration`, and deleted objects cannot
+    be told apart, so a consumed dataset is simply filled again.
+    """
+
+    def __init__(self, target, runner, raw_dir, duration: str = '30s', concurrency: int = 8):
+        self.target = target
+        self.runner = runner
+        self.raw_dir = raw_dir
+        self.duration = duration
+        self.concurrency = concurrency
+        self.ready = set()
+        self._proc = None
+
+    def prefix(self, size: str) -> str:
+        return dataset_prefix(self.target.name, size)
+
+    def ensure(self, size: str) -> int:
+        if size in self.ready:
+            return 0
+        output = self.raw_dir / f'prep_{size}.json'
+        cmd = warp_command(self.target, 'put', size, self.concurrency, self.prefix(size),
+                           self.duration, json_output=False, quiet=True)
+        cmd.append('--noclear')
+        log(f"Uploading test objects (size={size}, prefix={self.prefix(size)})...")
+        self._proc = self.runner.start(cmd, output)
+        rc = self.runner.wait(self._proc, output, self.runner.timeout_for(cmd))
+        self._proc = None
+        if rc == 0:
+            log("Test objects prepared successfully")
+            self.ready.add(size)
+            return 1
+        warn(f"Failed to prepare test objects (see {output}). Read operations may fail.")
+        return 0
+
+    def consumed(self, size: str):
+        self.ready.discard(size)
+
+    def cancel(self):
+        proc = self._proc
+        if proc is not None:
+            self.runner.stop(proc)
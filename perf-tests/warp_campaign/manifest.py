@@ -0,0 +1,111 @@
+"""
+Campaign manifest (manifest.json): durable per-cell state of a run dir.
+
+Every cell of the plan has an entry with its status, raw output path, warp exit code and
+parse status. The file is rewritten atomically on each change, so after an interruption
+it still tells which cells finished; run_campaign.py --resume re-runs everything else.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .plan import Cell
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+CELL_PENDING = 'pending'   # planned, not started
+CELL_RUNNING = 'running'   # started; still 'running' on load means the run was interrupted
+CELL_DONE = 'done'         # warp exited 0 and its raw output parsed
+CELL_FAILED = 'failed'     # warp failed or timed out, or the raw output did not parse
+
+PARSE_OK = 'ok'
+
+
+def write_json_atomic(path: Path, data):
+    """Write JSON next to path and rename it into place, so readers never see a partial file."""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class Manifest:
+    """Cell name -> state entry of one run dir, backed by run_dir/manifest.json."""
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.path = self.run_dir / MANIFEST_FILE
+        self.cells = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            version = data.get('version', 0)
+            if version > MANIFEST_VERSION:
+                raise ValueError(f'{self.path}: manifest version {version} is newer than supported ({MANIFEST_VERSION})')
+            self.cells = data.get('cells', {})
+
+    def save(self):
+        write_json_atomic(self.path, {'version': MANIFEST_VERSION, 'cells': self.cells})
+
+    def add_plan(self, plan):
+        """Register the cells of plan that have no entry yet as pending."""
+        for cell in plan:
+            self.cells.setdefault(cell.name, {
+                'cell': cell.to_dict(),
+                'status': CELL_PENDING,
+                'raw_file': f'raw/{cell.name}.json',
+                'attempts': 0,
+            })
+        self.save()
+
+    def entry(self, cell: Cell) -> dict:
+        return self.cells.get(cell.name, {})
+
+    def status(self, cell: Cell) -> str:
+        return self.entry(cell).get('status', CELL_PENDING)
+
+    def is_done(self, cell: Cell) -> bool:
+        """True when the cell finished and its raw output is still on disk."""
+        entry = self.entry(cell)
+        return entry.get('status') == CELL_DONE and (self.run_dir / entry['raw_file']).is_file()
+
+    def __contains__(self, cell: Cell) -> bool:
+        return self.is_done(cell)
+
+    def start(self, cell: Cell):
+        entry = self.cells.setdefault(cell.name, {'cell': cell.to_dict(), 'raw_file': f'raw/{cell.name}.json',
+                                                  'attempts': 0})
+        entry.update(status=CELL_RUNNING, attempts=entry.get('attempts', 0) + 1, started_at=_now())
+        for key in ('exit_code', 'parse_status', 'error_msg', 'finished_at'):
+            entry.pop(key, None)
+        self.save()
+
+    def finish(self, cell: Cell, exit_code: int, result) -> bool:
+        """Record a finished attempt; returns True when the cell counts as done."""
+        entry = self.cells[cell.name]
+        ok = exit_code == 0 and not result.error
+        entry.update(status=CELL_DONE if ok else CELL_FAILED, exit_code=exit_code,
+                     parse_status=result.error or PARSE_OK, finished_at=_now())
+        if result.error_msg:
+            entry['error_msg'] = result.error_msg
+        self.save()
+        return ok
+
+    def counts(self, plan) -> dict:
+        """Number of plan cells per status ('done' only if the raw file is still there)."""
+        counts = {CELL_PENDING: 0, CELL_RUNNING: 0, CELL_DONE: 0, CELL_FAILED: 0}
+        for cell in plan:
+            status = self.status(cell)
+            if status == CELL_DONE and not self.is_done(cell):
+                status = CELL_PENDING
+            counts[status] += 1
+        return counts
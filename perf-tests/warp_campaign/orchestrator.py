@@ -0,0 +1,174 @@
+"""
+Campaign orchestrator: runs a benchmark plan cell by cell for one target.
+
+Per cell: dataset preparation (GET/DELETE), warmup run, measured run, in-process parsing
+(warp_parser) and a summary.json/manifest.json update, so an interrupted campaign can be
+resumed without repeating finished cells.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+from warp_parser import parse_raw_file
+
+from .dataset import WarpPrepDatasets
+from .manifest import CELL_DONE, CELL_FAILED, CELL_PENDING, CELL_RUNNING, Manifest, write_json_atomic
+from .plan import READS_EXISTING, Cell, write_plan
+from .runner import WarpRunner, duration_to_seconds, human_readable_seconds, log, warn, warp_command
+
+
+class Campaign:
+    """One target's benchmark plan, stored in run_dir (raw/, summary.json, manifest.json).
+
+    GET/DELETE cells read the per-size datasets of `datasets` (a DatasetManager, or by default
+    WarpPrepDatasets). With overlap_prep, the dataset the next cell needs is uploaded while
+    the current cell is being measured, unless the current cell uses that same dataset.
+    The upload then shares client and store capacity with that measurement, so it is opt-in.
+    """
+
+    def __init__(self, target, plan: List[Cell], run_dir: Path, duration: str, warmup: str = '0s',
+                 runner: WarpRunner = None, overlap_prep: bool = False, prep_duration: str = '30s',
+                 datasets=None):
+        self.target = target
+        self.plan = plan
+        self.run_dir = Path(run_dir)
+        self.raw_dir = self.run_dir / 'raw'
+        self.summary_file = self.run_dir / 'summary.json'
+        self.duration = duration
+        self.warmup = warmup
+        self.runner = runner or WarpRunner(mask=target.mask)
+        self.overlap_prep = overlap_prep
+        self.prep_duration = prep_duration
+        self.manifest = Manifest(self.run_dir)
+        self.datasets = datasets or WarpPrepDatasets(target, self.runner, self.raw_dir, prep_duration)
+        self.results = {}
+
+    # -- object preparation ---------------------------------------------------
+
+    def _prepare(self, size: str):
+        """Complete the GET/DELETE dataset of size; failures only warn (the cell then fails)."""
+        try:
+            self.datasets.ensure(size)
+        except Exception as e:
+            warn(f"Failed to prepare the {size} dataset: {e}. Read operations may fail.")
+
+    def _can_overlap(self, cell: Cell, nxt: Cell) -> bool:
+        """Whether nxt's dataset can be filled while cell is measured (never cell's own dataset)."""
+        return (nxt.operation in READS_EXISTING
+                and not (cell.operation in READS_EXISTING and cell.size == nxt.size))
+
+    # -- cells ----------------------------------------------------------------
+
+    def _command(self, cell: Cell, duration: str) -> list:
+        return warp_command(self.target, cell.operation, cell.size, cell.concurrency,
+                            cell.prefix(self.target.name), duration)
+
+    def _run_cell(self, cell: Cell) -> int:
+        self.manifest.start(cell)
+        # DELETE is not warmed up: the warmup would consume the objects the measurement deletes
+        if duration_to_seconds(self.warmup) and cell.operation != 'delete':
+            warmup_output = self.raw_dir / f'{cell.name}.warmup'
+            log(f"Warmup run started: {cell.name} (duration: {self.warmup})")
+            if self.runner.run(self._command(cell, self.warmup), warmup_output) == 0:
+                log(f"Warmup completed: {cell.name}")
+            else:
+                warn(f"Warmup failed: {cell.name} (see {warmup_output} for details)")
+            warmup_output.unlink(missing_ok=True)
+
+        raw_output = self.raw_dir / f'{cell.name}.json'
+        cmd = self._command(cell, self.duration)
+        log(f"Test run started: {cell.name} (output: {raw_output})")
+        log(f"Running: {self.target.mask(' '.join(cmd))}")
+        rc = self.runner.run(cmd, raw_output)
+        if rc == 0:
+            log(f"Test run completed: {cell.name}")
+        else:
+            warn(f"Benchmark failed: {cell.name} (exit {rc}, see {raw_output} for details)")
+
+        info = {'operation': cell.operation, 'size': cell.size,
+                'concurrency': cell.concurrency, 'iteration': cell.iteration}
+        self.results[cell] = parse_raw_file(raw_output, self.target.name, info, keep_errors=True)
+        return rc
+
+    def _parse_existing(self, cell: Cell):
+        raw_output = self.raw_dir / f'{cell.name}.json'
+        info = {'operation': cell.operation, 'size': cell.size,
+                'concurrency': cell.concurrency, 'iteration': cell.iteration}
+        self.results[cell] = parse_raw_file(raw_output, self.target.name, info, keep_errors=True)
+
+    def write_summary(self):
+        entries = [self.results[c].to_dict() for c in self.plan if c in self.results]
+        write_json_atomic(self.summary_file, entries)
+
+    # -- campaign -------------------------------------------------------------
+
+    def run(self, resume: bool = False) -> list:
+        """Run every cell of the plan (on resume: every cell the manifest does not record as done).
+
+        Failed cells and cells left 'running' by an interrupted run are run again; so are
+        done cells whose raw output has gone missing.
+        """
+        self.raw_dir.mkdir(parents=True, exist_ok=True)
+        if resume:
+            counts = self.manifest.counts(self.plan)
+            log(f"Resuming campaign in {self.run_dir}: {counts[CELL_DONE]} of {len(self.plan)} cells done, "
+                f"{counts[CELL_FAILED]} failed, {counts[CELL_RUNNING]} interrupted, {counts[CELL_PENDING]} pending")
+        else:
+            write_plan(self.plan, self.run_dir)
+        self.manifest.add_plan(self.plan)
+
+        todo = []
+        for cell in self.plan:
+            if resume and cell in self.manifest:
+                self._parse_existing(cell)
+            else:
+                todo.append(cell)
+        self.write_summary()
+
+        est_one = duration_to_seconds(self.duration) + duration_to_seconds(self.warmup) + 15
+        log(f"Running {len(todo)} tests... Estimated total time (initial): {human_readable_seconds(est_one * len(todo))}")
+
+        prep_pool = ThreadPoolExecutor(max_workers=1) if self.overlap_prep else None
+        pending_prep = None   # future of the dataset upload overlapping the previous cell
+        cumulative = 0.0
+        try:
+            for idx, cell in enumerate(todo):
+                log(f"Test {idx + 1}/{len(todo)}: {cell.operation} size={cell.size} "
+                    f"concurrency={cell.concurrency} iteration={cell.iteration}")
+                start = time.monotonic()
+
+                if pending_prep is not None:
+                    pending_prep.result()
+                    pending_prep = None
+                if cell.operation in READS_EXISTING:
+                    # No-op when an overlapped upload already completed the dataset
+                    self._prepare(cell.size)
+
+                nxt = todo[idx + 1] if idx + 1 < len(todo) else None
+                if prep_pool and nxt is not None and self._can_overlap(cell, nxt):
+                    pending_prep = prep_pool.submit(self._prepare, nxt.size)
+
+                rc = self._run_cell(cell)
+                self.manifest.finish(cell, rc, self.results[cell])
+                if cell.operation == 'delete':
+                    self.datasets.consumed(cell.size)
+                self.write_summary()
+
+                elapsed = time.monotonic() - start
+                cumulative += elapsed
+                remaining = cumulative / (idx + 1) * (len(todo) - idx - 1)
+                log(f"Finished test: {cell.name} (elapsed: {human_readable_seconds(elapsed)})")
+                log(f"Progress: {idx + 1}/{len(todo)} tests completed. "
+                    f"Estimated remaining time: {human_readable_seconds(remaining)}")
+        except BaseException:
+            # Stop an overlapped upload instead of leaving it running behind an interrupted campaign
+            if pending_prep is not None:
+                self.datasets.cancel()
+            raise
+        finally:
+            if prep_pool:
+                prep_pool.shutdown(wait=True)
+
+        return [self.results[c] for c in self.plan if c in self.results]
@@ -0,0 +1,86 @@
+"""
+Benchmark plan: the operations x sizes x concurrency x iterations matrix as data.
+"""
+
+import json
+from pathlib import Path
+from typing import List, NamedTuple
+
+DEFAULT_OPERATIONS = ('put', 'get', 'delete', 'list', 'mixed')
+
+# Operations run with --list-existing: they need objects under the cell prefix beforehand
+READS_EXISTING = frozenset(('get', 'delete'))
+
+
+def dataset_prefix(target: str, size: str) -> str:
+    """Prefix of the shared GET/DELETE dataset of an object size.
+
+    Kept under datasets/ so warp's listing never picks up other cells' <size>_c<N> objects.
+    """
+    return f'warp-bench/{target}/datasets/{size}'
+
+
+class Cell(NamedTuple):
+    """One benchmark run: operation x size x concurrency x iteration."""
+
+    operation: str
+    size: str
+    concurrency: int
+    iteration: int
+
+    @property
+    def name(self) -> str:
+        """Raw output file stem, matching warp_parser.FILENAME_RE."""
+        return f'{self.operation}_{self.size}_c{self.concurrency}_i{self.iteration}'
+
+    def prefix(self, target: str) -> str:
+        """Object prefix of the cell.
+
+        GET/DELETE read the dataset of their object size (shared by all concurrency levels);
+        the other operations upload and clean up their own objects per size/concurrency.
+        """
+        if self.operation in READS_EXISTING:
+            return dataset_prefix(target, self.size)
+        return f'warp-bench/{target}/{self.size}_c{self.concurrency}'
+
+    def to_dict(self) -> dict:
+        return {'operation': self.operation, 'size': self.size,
+                'concurrency': self.concurrency, 'iteration': self.iteration}
+
+
+def split_list(value) -> List[str]:
+    """Split a comma-separated option ("4KiB, 64KiB") into trimmed, non-empty tokens."""
+    if isinstance(value, str):
+        value = value.split(',')
+    return [v.strip() for v in value if v and v.strip()]
+
+
+def build_plan(operations, sizes, concurrency, iterations: int) -> List[Cell]:
+    """Return cells in run order: operation, then size, then concurrency, then iteration.
+
+    Operations stay outermost, so each GET/DELETE dataset is uploaded once and reused by
+    all concurrency levels of that size.
+    """
+    operations = [op.lower() for op in split_list(operations)] or list(DEFAULT_OPERATIONS)
+    return [
+        Cell(op, size, int(conc), it)
+        for op in operations
+        for size in split_list(sizes)
+        for conc in split_list(concurrency)
+        for it in range(1, int(iterations) + 1)
+    ]
+
+
+def write_plan(plan: List[Cell], run_dir: Path):
+    """Write planned_tests.json and planned_tests.txt into run_dir."""
+    with open(run_dir / 'planned_tests.json', 'w', encoding='utf-8') as f:
+        json.dump([c.to_dict() for c in plan], f, indent=2)
+    with open(run_dir / 'planned_tests.txt', 'w', encoding='utf-8') as f:
+        for c in plan:
+            f.write(f'{c.operation} size={c.size} concurrency={c.concurrency} iteration={c.iteration}\n')
+
+
+def read_plan(run_dir: Path) -> List[Cell]:
+    """Load the plan written by write_plan (used on resume, so the matrix cannot drift)."""
+    with open(run_dir / 'planned_tests.json', 'r', encoding='utf-8') as f:
+        return [Cell(c['operation'], c['size'], int(c['concurrency']), int(c['iteration'])) for c in json.load(f)]
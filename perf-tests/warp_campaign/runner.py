@@ -0,0 +1,128 @@
+"""
+warp subprocess management: command lines, heartbeats and timeouts.
+"""
+
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Exit code reported for a run that was killed after exceeding its timeout (as timeout(1) does)
+TIMEOUT_EXIT = 124
+
+_DURATION_RE = re.compile(r'(\d+)([hms]?)')
+
+
+def log(msg: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", file=sys.stderr, flush=True)
+
+
+def warn(msg: str):
+    print(f"[WARN] {msg}", file=sys.stderr, flush=True)
+
+
+def duration_to_seconds(text: str) -> int:
+    """Convert warp durations like "3m", "30s", "1h30m" or "45" into seconds."""
+    total = 0
+    for amount, unit in _DURATION_RE.findall(str(text)):
+        total += int(amount) * {'h': 3600, 'm': 60}.get(unit, 1)
+    return total
+
+
+def human_readable_seconds(secs: float) -> str:
+    secs = int(secs)
+    days, rem = divmod(secs, 86400)
+    hours, rem = divmod(rem, 3600)
+    mins, s = divmod(rem, 60)
+    if days:
+        return f"{days}d {hours:02d}h {mins:02d}m {s:02d}s"
+    if hours:
+        return f"{hours:02d}h {mins:02d}m {s:02d}s"
+    if mins:
+        return f"{mins:02d}m {s:02d}s"
+    return f"{s:02d}s"
+
+
+def warp_command(target, operation: str, size: str, concurrency: int, prefix: str,
+                 duration: str, json_output: bool = True, quiet: bool = False) -> list:
+    """Build a warp command line for one run against target."""
+    cmd = ['warp', operation] + target.warp_args() + [
+        '--duration', duration,
+        '--concurrent', str(concurrency),
+        '--obj.size', size,
+        '--prefix', prefix,
+        '--autoterm',
+    ]
+    if json_output:
+        cmd.append('--json')
+    if quiet:
+        cmd.append('--quiet')
+    # GET and DELETE work on the dataset already under the prefix (see dataset.py)
+    if operation in ('get', 'delete'):
+        cmd.append('--list-existing')
+    return cmd
+
+
+class WarpRunner:
+    """Runs warp processes with output to a file, periodic heartbeats and a hard timeout.
+
+    The timeout is the run's --duration plus timeout_buffer seconds; an overrunning
+    process gets SIGTERM, then SIGKILL after kill_grace seconds.
+    """
+
+    def __init__(self, heartbeat_interval: float = 30, timeout_buffer: float = 30,
+                 kill_grace: float = 5, mask=None):
+        self.heartbeat_interval = heartbeat_interval
+        self.timeout_buffer = timeout_buffer
+        self.kill_grace = kill_grace
+        self.mask = mask or (lambda text: text)
+
+    def timeout_for(self, cmd: list) -> float:
+        duration = 0
+        if '--duration' in cmd:
+            duration = duration_to_seconds(cmd[cmd.index('--duration') + 1])
+        return (duration or 600) + self.timeout_buffer
+
+    def start(self, cmd: list, output: Path) -> subprocess.Popen:
+        with open(output, 'wb') as out:
+            return subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+
+    def wait(self, proc: subprocess.Popen, output: Path, timeout: float) -> int:
+        """Wait for proc, logging heartbeats; returns its exit code or TIMEOUT_EXIT."""
+        start = time.monotonic()
+        try:
+            while True:
+                elapsed = time.monotonic() - start
+                remaining = timeout - elapsed
+                if remaining <= 0:
+                    warn(f"pid={proc.pid} exceeded expected duration ({int(timeout)}s). Terminating to avoid hang.")
+                    self.stop(proc)
+                    return TIMEOUT_EXIT
+                try:
+                    return proc.wait(timeout=min(self.heartbeat_interval, remaining))
+                except subprocess.TimeoutExpired:
+                    elapsed = time.monotonic() - start
+                    log(f"pid={proc.pid} still running (elapsed: {human_readable_seconds(elapsed)}) - output: {output}")
+        except BaseException:
+            # Interrupted (Ctrl-C, orchestrator error): never leave warp running behind us
+            self.stop(proc)
+            raise
+
+    def stop(self, proc: subprocess.Popen):
+        if proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=self.kill_grace)
+        except subprocess.TimeoutExpired:
+            warn(f"pid={proc.pid} did not exit after TERM; sending KILL")
+            proc.kill()
+            proc.wait()
+
+    def run(self, cmd: list, output: Path) -> int:
+        """Run cmd to completion (or timeout) with stdout+stderr written to output."""
+        proc = self.start(cmd, output)
+        log(f"Started pid={proc.pid}")
+        return self.wait(proc, output, self.timeout_for(cmd))
@@ -0,0 +1,159 @@
+"""
+Target configuration (targets/<name>.env) for warp invocations.
+
+A target env file may set S3TESTS_CONFIG to the s3-tests config of the same
+store (e.g. ../../s3tests/splunk.conf, relative to the env file) instead of
+repeating its endpoint and keys; S3TESTS_SECTION picks the credentials section
+(default "s3 main"). Variables set in the env file itself take precedence. Both
+are read from the env file only (unlike the suite's own S3TEST_CONF, which is
+usually exported in the shell).
+
+The config is parsed by s3tests/conf.py, the loader the suite's configure()
+uses, so the endpoint and its defaults (port 443 with TLS, else 80) are the
+suite's.
+
+Run as a script (python3 target.py <env file>) it prints, as shell assignments,
+the S3_* variables the named s3-tests config supplies and the env file leaves
+unset; warp_s3_benchmark.sh evaluates them after sourcing the env file, so both
+paths resolve a target the same way.
+"""
+
+import configparser
+import os
+import re
+import shlex
+import sys
+from pathlib import Path
+
+# s3tests/conf.py (standard library only) is shared with the functional suite
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from s3tests import conf as s3tests_conf  # noqa: E402
+
+REQUIRED_VARS = ('S3_ENDPOINT', 'S3_ACCESS_KEY', 'S3_SECRET_KEY', 'S3_BUCKET')
+
+_ENV_LINE_RE = re.compile(r'^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)=(.*)$')
+
+
+def load_env_file(path: Path) -> dict:
+    """Read KEY=VALUE lines of a target env file (comments, 'export' and quotes allowed)."""
+    env = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            m = _ENV_LINE_RE.match(line)
+            if not m:
+                continue
+            value = m.group(2).strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+                value = value[1:-1]
+            else:
+                value = value.split(' #', 1)[0].strip()
+            env[m.group(1)] = value
+    return env
+
+
+def load_s3tests_conf(path: Path, section: str = 's3 main') -> dict:
+    """S3_* variables from an s3-tests config: the [DEFAULT] endpoint and the keys of [section]."""
+    if not Path(path).is_file():
+        raise OSError(f"cannot read s3-tests config {path}")
+    cfg = s3tests_conf.load(path)
+    if not cfg.has_section(section):
+        raise ValueError(f"{path}: no [{section}] section")
+    endpoint = s3tests_conf.endpoint(cfg)
+    if not endpoint.host:
+        raise ValueError(f"{path}: no host in [DEFAULT]")
+    access_key, secret_key = s3tests_conf.credentials(cfg, section)
+    return {
+        'S3_ENDPOINT': endpoint.url,
+        'S3_ACCESS_KEY': access_key,
+        'S3_SECRET_KEY': secret_key,
+        'S3_TLS': 'true' if endpoint.is_secure else 'false',
+    }
+
+
+def s3tests_conf_vars(env: dict, base_dir: Path = Path('.')) -> dict:
+    """The S3_* variables the s3-tests config named in env's S3TESTS_CONFIG adds to env."""
+    conf = env.get('S3TESTS_CONFIG')
+    if not conf:
+        return {}
+    conf_vars = load_s3tests_conf(base_dir / conf, env.get('S3TESTS_SECTION') or 's3 main')
+    return {var: value for var, value in conf_vars.items() if not env.get(var)}
+
+
+def resolve_s3tests_conf(env: dict, base_dir: Path = Path('.')) -> dict:
+    """env completed from the s3-tests config it names in S3TESTS_CONFIG, if any."""
+    return {**env, **s3tests_conf_vars(env, base_dir)}
+
+
+class Target:
+    """Connection settings of one benchmark target, normalized the way warp expects them."""
+
+    __slots__ = ('name', 'endpoint', 'access_key', 'secret_key', 'bucket', 'region', 'tls', 'path_style')
+
+    def __init__(self, name: str, env: dict):
+        missing = [v for v in REQUIRED_VARS if not env.get(v)]
+        if missing:
+            raise ValueError(f"target '{name}': missing {', '.join(missing)}")
+        self.name = name
+        endpoint = env['S3_ENDPOINT']
+        if not re.match(r'^https?://', endpoint):
+            endpoint = 'https://' + endpoint
+        self.endpoint = endpoint
+        self.access_key = env['S3_ACCESS_KEY']
+        self.secret_key = env['S3_SECRET_KEY']
+        self.bucket = env['S3_BUCKET']
+        self.region = env.get('S3_REGION') or None
+        self.tls = (env.get('S3_TLS') or 'true').lower() not in ('no', 'false', '0')
+        self.path_style = (env.get('S3_PATH_STYLE') or 'false').lower() == 'true'
+
+    @classmethod
+    def from_env_file(cls, name: str, path: Path) -> 'Target':
+        return cls(name, resolve_s3tests_conf(load_env_file(path), Path(path).parent))
+
+    @classmethod
+    def from_environ(cls, name: str) -> 'Target':
+        """Use the S3_* variables exported by warp_s3_benchmark.sh."""
+        return cls(name, os.environ)
+
+    @property
+    def host(self) -> str:
+        """warp --host value: endpoint without scheme or path."""
+        return re.sub(r'^https?://', '', self.endpoint).split('/', 1)[0]
+
+    def warp_args(self) -> list:
+        """Connection arguments common to every warp invocation."""
+        args = [
+            '--host', self.host,
+            '--access-key', self.access_key,
+            '--secret-key', self.secret_key,
+            '--bucket', self.bucket,
+        ]
+        if self.region:
+            args += ['--region', self.region]
+        if not self.tls:
+            args.append('--insecure')
+        if self.path_style:
+            args.append('--host-style=path')
+        return args
+
+    def mask(self, text: str) -> str:
+        """Replace credentials in text (e.g. a logged command line) with masked forms."""
+        for secret in (self.access_key, self.secret_key):
+            if secret:
+                masked = secret[:4] + '****' + secret[-4:] if len(secret) > 8 else '****'
+                text = text.replace(secret, masked)
+        return text
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit(f"usage: {sys.argv[0]} <target env file>")
+    env_file = Path(sys.argv[1])
+    try:
+        conf_vars = s3tests_conf_vars(load_env_file(env_file), env_file.parent)
+    except (OSError, ValueError, configparser.Error) as e:
+        sys.exit(f"Error: {e}")
+    for var, value in conf_vars.items():
+        print(f"{var}={shlex.quote(value)}")
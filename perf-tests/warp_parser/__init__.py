@@ -0,0 +1,34 @@
+"""
+Shared parser for raw warp benchmark output.
+
+Used by reparse_warp_raw.py and by warp_s3_benchmark.sh (which parses a whole suite
+in one batch instead of starting an interpreter per cell).
+"""
+
+from .model import (
+    METRIC_FIELDS,
+    SCHEMA_VERSION,
+    WARP_FORMAT_LEGACY,
+    WARP_FORMAT_V2,
+    CellResult,
+)
+from .parse import (
+    FILENAME_RE,
+    PARSERS,
+    detect_format,
+    list_raw_files,
+    parse_raw_file,
+    parse_raw_filename,
+    parse_run_dirs,
+    parse_warp_legacy,
+    parse_warp_v2,
+)
+from .stream import (
+    CHUNK_SIZE,
+    SUMMARY_FIELDS,
+    SUMMARY_STOP_AFTER,
+    extract_json_fields,
+    extract_json_from_file,
+    extract_json_from_raw,
+    iter_json_fields,
+)
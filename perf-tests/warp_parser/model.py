@@ -0,0 +1,107 @@
+"""
+Result record for one benchmark cell and the schema versions involved.
+
+Two versions are tracked separately:
+  - WARP_FORMAT_*: layout of the raw warp JSON a result was parsed from.
+  - SCHEMA_VERSION: layout of the summary.json entries written by CellResult.to_dict().
+    Entries written before versioning carry no 'schema_version' key and read as 0.
+"""
+
+WARP_FORMAT_LEGACY = 1   # flat {"throughput_mb": ..., "latency_p99_ms": ...} (or a list of them)
+WARP_FORMAT_V2 = 2       # {"v": 2, "total": {...}, "by_op_type": {...}, ...}
+
+SCHEMA_VERSION = 1
+
+# Metric fields and their types, in summary.json order
+METRIC_FIELDS = (
+    ('throughput_mbps', float),
+    ('ops_per_sec', float),
+    ('avg_latency_ms', float),
+    ('p50_latency_ms', float),
+    ('p90_latency_ms', float),
+    ('p99_latency_ms', float),
+    ('total_operations', int),
+    ('errors', int),
+    ('error_rate', float),
+)
+
+
+class CellResult:
+    """Parsed metrics of one benchmark cell (operation x size x concurrency x iteration)."""
+
+    __slots__ = (
+        'target', 'operation', 'object_size', 'concurrency', 'iteration',
+        'throughput_mbps', 'ops_per_sec', 'avg_latency_ms', 'p50_latency_ms',
+        'p90_latency_ms', 'p99_latency_ms', 'total_operations', 'errors', 'error_rate',
+        'warp_format', 'error', 'error_msg',
+    )
+
+    def __init__(self, target: str, operation: str, object_size: str, concurrency: int, iteration: int):
+        self.target = target
+        self.operation = operation
+        self.object_size = object_size
+        self.concurrency = int(concurrency)
+        self.iteration = int(iteration)
+        for name, kind in METRIC_FIELDS:
+            setattr(self, name, kind(0))
+        self.warp_format = None
+        self.error = None
+        self.error_msg = None
+
+    def set_metrics(self, metrics: dict, warp_format: int):
+        for name, kind in METRIC_FIELDS:
+            if name in metrics:
+                setattr(self, name, kind(metrics[name] or 0))
+        self.warp_format = warp_format
+
+    def fail(self, error: str, error_msg: str):
+        """Mark the cell as failed; report.py drops rows with error_rate >= 1.0."""
+        self.error = error
+        self.error_msg = error_msg
+        self.error_rate = 1.0
+
+    @property
+    def key(self) -> tuple:
+        return (self.target, self.operation, self.object_size, self.concurrency, self.iteration)
+
+    def to_dict(self) -> dict:
+        entry = {
+            'schema_version': SCHEMA_VERSION,
+            'target': self.target,
+            'operation': self.operation,
+            'object_size': self.object_size,
+            'concurrency': self.concurrency,
+            'iteration': self.iteration,
+        }
+        for name, _ in METRIC_FIELDS:
+            entry[name] = getattr(self, name)
+        if self.warp_format is not None:
+            entry['warp_format'] = self.warp_format
+        if self.error:
+            entry['error'] = self.error
+            entry['error_msg'] = self.error_msg
+        return entry
+
+    @classmethod
+    def from_dict(cls, entry: dict) -> 'CellResult':
+        """Load a summary.json entry of any schema version up to SCHEMA_VERSION."""
+        version = entry.get('schema_version', 0)
+        if version > SCHEMA_VERSION:
+            raise ValueError(f'summary entry schema_version {version} is newer than supported ({SCHEMA_VERSION})')
+        result = cls(entry['target'], entry['operation'], entry['object_size'],
+                     entry['concurrency'], entry['iteration'])
+        result.set_metrics(entry, entry.get('warp_format'))
+        if entry.get('error'):
+            result.error = entry['error']
+            result.error_msg = entry.get('error_msg')
+            result.error_rate = float(entry.get('error_rate', 1.0) or 0)
+        return result
+
+    def __eq__(self, other):
+        if not isinstance(other, CellResult):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    def __repr__(self):
+        state = 'error=%r' % self.error if self.error else 'throughput_mbps=%.2f' % self.throughput_mbps
+        return 'CellResult(%s %s c%d i%d, %s)' % (self.operation, self.object_size, self.concurrency, self.iteration, state)
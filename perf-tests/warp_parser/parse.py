@@ -0,0 +1,169 @@
+"""
+Parsers from raw warp output to CellResult records, per cell or in batch.
+
+One parser per warp output format is registered in PARSERS, keyed by the
+WARP_FORMAT_* version that detect_format() returns for a decoded report.
+"""
+
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .model import WARP_FORMAT_LEGACY, WARP_FORMAT_V2, CellResult
+from .stream import extract_json_from_file
+
+
+def parse_warp_v2(data: dict, operation: str) -> dict:
+    """Extract summary metrics from warp v2 JSON."""
+    total = data.get('total') or {}
+    by_op = data.get('by_op_type') or {}
+    op_block = by_op.get(operation.upper()) if isinstance(by_op, dict) else {}
+    if not op_block:
+        op_block = total
+    thr = total.get('throughput') or op_block.get('throughput') or {}
+    duration_millis = thr.get('measure_duration_millis') or 0
+    duration_sec = duration_millis / 1000.0 if duration_millis else 0
+    bytes_val = float(thr.get('bytes') or total.get('total_bytes') or 0)
+    total_requests = int(total.get('total_requests') or total.get('total_objects') or 0)
+    total_errors = int(total.get('total_errors') or 0)
+    ops_val = thr.get('ops') or thr.get('objects')
+    if ops_val is None and total_requests and duration_sec:
+        ops_val = total_requests
+    ops_val = float(ops_val or 0)
+    throughput_mbps = (bytes_val / (1024.0 * 1024.0)) / duration_sec if duration_sec else 0
+    ops_per_sec = ops_val / duration_sec if duration_sec else 0
+    error_rate = (total_errors / total_requests) if total_requests else 0
+    avg_ms = p50_ms = p90_ms = p99_ms = 0
+    req_by_client = op_block.get('requests_by_client') or total.get('requests_by_client') or {}
+    for _client_name, segments in (req_by_client.items() if isinstance(req_by_client, dict) else []):
+        for seg in segments if isinstance(segments, list) else [segments]:
+            s = seg.get('single_sized_requests') or {}
+            fb = s.get('first_byte') or {}
+            if fb:
+                avg_ms = float(fb.get('average_millis') or 0)
+                p50_ms = float(fb.get('median_millis') or 0)
+                p90_ms = float(fb.get('p90_millis') or 0)
+                p99_ms = float(fb.get('p99_millis') or 0)
+                break
+            dur_avg = s.get('dur_avg_millis')
+            if dur_avg is not None:
+                avg_ms = float(dur_avg)
+                p99_ms = float(s.get('dur_99_millis') or 0)
+                p90_ms = float(s.get('dur_90_millis') or 0)
+                p50_ms = float(s.get('dur_median_millis') or avg_ms)
+                break
+        break
+    return {
+        'throughput_mbps': throughput_mbps,
+        'ops_per_sec': ops_per_sec,
+        'avg_latency_ms': avg_ms,
+        'p50_latency_ms': p50_ms,
+        'p90_latency_ms': p90_ms,
+        'p99_latency_ms': p99_ms,
+        'total_operations': total_requests,
+        'errors': total_errors,
+        'error_rate': error_rate,
+    }
+
+
+def parse_warp_legacy(data: dict, operation: str = None) -> dict:
+    """Extract summary metrics from the flat pre-v2 warp JSON."""
+    return {
+        'throughput_mbps': data.get('throughput_mb', 0),
+        'ops_per_sec': data.get('ops_per_sec', 0),
+        'avg_latency_ms': data.get('latency_avg_ms', 0),
+        'p50_latency_ms': data.get('latency_p50_ms', 0),
+        'p90_latency_ms': data.get('latency_p90_ms', 0),
+        'p99_latency_ms': data.get('latency_p99_ms', 0),
+        'total_operations': data.get('operations', 0),
+        'errors': data.get('errors', 0),
+        'error_rate': data.get('error_rate', 0),
+    }
+
+
+PARSERS = {
+    WARP_FORMAT_LEGACY: parse_warp_legacy,
+    WARP_FORMAT_V2: parse_warp_v2,
+}
+
+
+def detect_format(data: dict) -> int:
+    if data.get('total') is not None:
+        return WARP_FORMAT_V2
+    return WARP_FORMAT_LEGACY
+
+
+# Filename pattern: {operation}_{size}_c{concurrency}_i{iteration}.json
+FILENAME_RE = re.compile(r'^([a-zA-Z]+)_(.+)_c(\d+)_i(\d+)\.json$')
+
+
+def parse_raw_filename(name: str):
+    m = FILENAME_RE.match(name)
+    if not m:
+        return None
+    return {'operation': m.group(1).lower(), 'size': m.group(2), 'concurrency': int(m.group(3)), 'iteration': int(m.group(4))}
+
+
+def parse_raw_file(path: Path, target: str, info: dict, keep_errors: bool = False):
+    """Parse one raw file into a CellResult.
+
+    Files without a usable JSON report give None, or a failed CellResult (error='parse_error')
+    with keep_errors, so the cell still shows up in summary.json.
+    """
+    result = CellResult(target, info['operation'], info['size'], info['concurrency'], info['iteration'])
+    try:
+        data = extract_json_from_file(path)
+    except OSError as e:
+        data = None
+        reason = str(e)
+    else:
+        reason = 'No JSON object found in raw output (leading non-JSON or invalid format)'
+    if not data:
+        if not keep_errors:
+            print(f"  Skip (no JSON): {Path(path).name}", file=sys.stderr)
+            return None
+        result.fail('parse_error', reason)
+        return result
+    fmt = detect_format(data)
+    result.set_metrics(PARSERS[fmt](data, info['operation']), fmt)
+    return result
+
+
+def list_raw_files(run_dir: Path) -> list:
+    """Return (path, filename info) for every benchmark raw file in run_dir/raw, sorted by name."""
+    raw_dir = run_dir / 'raw'
+    if not raw_dir.is_dir():
+        print(f"Warning: no raw/ in {run_dir}", file=sys.stderr)
+        return []
+    files = []
+    for path in sorted(raw_dir.glob('*.json')):
+        info = parse_raw_filename(path.name)
+        if info:
+            files.append((path, info))
+    return files
+
+
+def parse_run_dirs(run_dirs: list, jobs: int = None, keep_errors: bool = False, targets: dict = None) -> dict:
+    """Parse every raw file of several run dirs into {run_dir: [CellResult]}, in raw filename order.
+
+    All files are submitted to one process pool up front, so one large run does not hold up
+    the others. The target of a run dir is taken from targets, else from its parent dir name
+    (results/<target>/<timestamp>). jobs=1 parses inline without starting a pool.
+    """
+    targets = targets or {}
+    work = [(d, targets.get(d, d.parent.name), list_raw_files(d)) for d in run_dirs]
+    if jobs == 1:
+        return {
+            run_dir: [r for r in (parse_raw_file(p, target, info, keep_errors) for p, info in files) if r]
+            for run_dir, target, files in work
+        }
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        submitted = [
+            (run_dir, [pool.submit(parse_raw_file, p, target, info, keep_errors) for p, info in files])
+            for run_dir, target, files in work
+        ]
+        for run_dir, futures in submitted:
+            results[run_dir] = [r for r in (f.result() for f in futures) if r]
+    return results
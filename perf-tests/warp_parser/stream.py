@@ -0,0 +1,209 @@
+"""
+Streaming extraction of the JSON report from raw warp output.
+
+warp prints progress lines and ANSI codes before its --json report, and long runs
+produce reports of hundreds of MB. The reader here skips the noise, decodes only the
+requested top-level members and releases everything else chunk by chunk.
+"""
+
+import io
+import json
+import re
+
+
+# Top-level keys needed to build a summary entry: the warp v2 blocks plus the flat
+# keys of the legacy format. Everything else (by_host, by_client, ...) is skipped
+# without being decoded.
+SUMMARY_FIELDS = frozenset((
+    'v', 'total', 'by_op_type',
+    'throughput_mb', 'ops_per_sec', 'latency_avg_ms', 'latency_p50_ms',
+    'latency_p90_ms', 'latency_p99_ms', 'operations', 'errors', 'error_rate',
+))
+# warp writes total/by_op_type before the bulky per-host/per-client blocks, so reading
+# can stop as soon as both have been seen.
+SUMMARY_STOP_AFTER = frozenset(('total', 'by_op_type'))
+
+CHUNK_SIZE = 1 << 20
+
+# Tokens that matter when skipping a JSON value: complete strings (so brackets inside
+# them are ignored), a lone quote (string cut off at the end of the buffer) and brackets.
+# The capture group that matched tells them apart without building token strings.
+_SKIP_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|(")|([{\[])|([}\]])', re.S)
+_TOK_PARTIAL, _TOK_OPEN, _TOK_CLOSE = 1, 2, 3
+_STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Longest prefix that does not end inside an unterminated string.
+_COMPLETE_STRINGS_RE = re.compile(r'[^"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"]*)*', re.S)
+_NON_BRACKET_BYTES = bytes(c for c in range(256) if c not in b'{}[]')
+_SCALAR_END_RE = re.compile(r'[,}\]\s]')
+_WS_RE = re.compile(r'[ \t\n\r]*')
+
+
+class _JSONStream:
+    """Chunked reader over a text stream that walks one top-level JSON object."""
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self):
+        """Drop consumed text and append one chunk. Returns the shift applied to indexes, or None at EOF."""
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            return None
+        shift = self.pos
+        self.buf = self.buf[shift:] + chunk
+        self.pos = 0
+        return shift
+
+    def seek_object(self) -> bool:
+        """Skip leading non-JSON (ANSI codes, warp progress lines) up to the first '{'."""
+        while True:
+            idx = self.buf.find('{', self.pos)
+            if idx != -1:
+                self.pos = idx
+                return True
+            self.pos = len(self.buf)
+            if self._fill() is None:
+                return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character ('' at EOF) without consuming it."""
+        while True:
+            self.pos = _WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self._fill() is None:
+                return ''
+
+    def _more(self, i: int, keep: bool):
+        """Read another chunk while scanning at i; returns i adjusted to the new buffer, or None at EOF."""
+        if not keep:
+            self.pos = i
+        shift = self._fill()
+        return None if shift is None else i - shift
+
+    def _value_end(self, keep: bool) -> int:
+        """Return the end index of the value starting at pos, reading more input as needed.
+
+        With keep=False consumed text is released while scanning, so skipping a large
+        value needs no more memory than one chunk.
+        """
+        i = self.pos
+        if self.buf[i] not in '{["':
+            # number, true, false or null
+            while True:
+                m = _SCALAR_END_RE.search(self.buf, i)
+                if m:
+                    return m.start()
+                j = self._more(len(self.buf), keep)
+                if j is None:
+                    return len(self.buf)
+                i = j
+        depth = 0
+        if self.buf[i] != '"':
+            depth = 1
+            i += 1
+        while True:
+            if depth:
+                # Fast path: reduce the rest of the buffer to its unmatched brackets with
+                # C-level string operations. Unless enough leading closers are left to
+                # end the value here, the whole buffer is consumed without a Python loop.
+                end = _COMPLETE_STRINGS_RE.match(self.buf, i).end()
+                brackets = _STRING_RE.sub('', self.buf[i:end]).encode('utf-8', 'ignore')
+                brackets = brackets.translate(None, _NON_BRACKET_BYTES)
+                while b'{}' in brackets or b'[]' in brackets:
+                    brackets = brackets.replace(b'{}', b'').replace(b'[]', b'')
+                closes = len(brackets) - len(brackets.lstrip(b'}]'))
+                if closes < depth:
+                    depth += len(brackets) - 2 * closes
+                    i = self._more(end, keep)
+                    if i is None:
+                        raise ValueError('truncated JSON value')
+                    continue
+            # The value ends in this buffer (or starts with a string): find the exact end.
+            for m in _SKIP_TOKEN_RE.finditer(self.buf, i):
+                kind = m.lastindex
+                if kind == _TOK_PARTIAL:
+                    i = m.start()
+                    break
+                if kind == _TOK_OPEN:
+                    depth += 1
+                elif kind == _TOK_CLOSE:
+                    depth -= 1
+                if depth == 0:
+                    return m.end()
+            else:
+                i = len(self.buf)
+            # Out of input, possibly in the middle of a string: keep the tail and read more.
+            i = self._more(i, keep)
+            if i is None:
+                raise ValueError('truncated JSON value')
+
+    def decode(self):
+        end = self._value_end(keep=True)
+        value = json.loads(self.buf[self.pos:end])
+        self.pos = end
+        return value
+
+    def skip(self):
+        self.pos = self._value_end(keep=False)
+
+
+def iter_json_fields(fp, fields=None, chunk_size=CHUNK_SIZE, stop_after=None):
+    """Yield (key, value) for the top-level members of the first JSON object in fp.
+
+    Leading noise before the first '{' and anything after the closing '}' is ignored.
+    Only members named in fields are decoded (all of them if fields is None). If
+    stop_after is given, reading stops once all of those keys have been yielded.
+    Raises ValueError on malformed or truncated JSON.
+    """
+    pending = set(stop_after or ())
+    stream = _JSONStream(fp, chunk_size)
+    if not stream.seek_object():
+        return
+    stream.pos += 1
+    while True:
+        c = stream.peek()
+        if c == '}':
+            return
+        if c == ',':
+            stream.pos += 1
+            continue
+        if c != '"':
+            raise ValueError(f'expected object key, got {c!r}')
+        key = stream.decode()
+        if stream.peek() != ':':
+            raise ValueError(f'expected ":" after key {key!r}')
+        stream.pos += 1
+        if stream.peek() == '':
+            raise ValueError('truncated JSON value')
+        if fields is None or key in fields:
+            yield key, stream.decode()
+            if pending:
+                pending.discard(key)
+                if not pending:
+                    return
+        else:
+            stream.skip()
+
+
+def extract_json_fields(fp, fields=None, chunk_size=CHUNK_SIZE, stop_after=None):
+    """Return the first JSON object in fp as a dict (restricted to fields), or None."""
+    try:
+        data = dict(iter_json_fields(fp, fields, chunk_size, stop_after))
+    except ValueError:
+        return None
+    return data or None
+
+
+def extract_json_from_raw(content: str, fields=None):
+    """Strip leading non-JSON and return parsed JSON."""
+    return extract_json_fields(io.StringIO(content), fields)
+
+
+def extract_json_from_file(path, fields=SUMMARY_FIELDS):
+    """Stream a raw warp output file and return the summary fields of its JSON report."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return extract_json_fields(f, fields, stop_after=SUMMARY_STOP_AFTER)
@@ -44,9 +44,11 @@ DO_COMPARE=false
 DO_REPORT=false
 USE_LATEST=false
 REPARSE=false
+RESUME=false
 SKIP_CLEANUP=false
 VERBOSE=false
 HEARTBEAT_INTERVAL=30
+OVERLAP_PREP=false
 
 # ============================================================================
 # Utility Functions
@@ -71,109 +73,6 @@ verbose() {
     fi
 }
 
-# Convert duration strings like "3m", "30s", "1h30m" into seconds.
-duration_to_seconds() {
-    local input="$1"
-    local total=0
-    # Find all occurrences like 1h, 30m, 45s
-    while [[ -n "$input" ]]; do
-        if [[ "$input" =~ ^([0-9]+)h(.*)$ ]]; then
-            total=$((total + ${BASH_REMATCH[1]} * 3600))
-            input="${BASH_REMATCH[2]}"
-        elif [[ "$input" =~ ^([0-9]+)m(.*)$ ]]; then
-            total=$((total + ${BASH_REMATCH[1]} * 60))
-            input="${BASH_REMATCH[2]}"
-        elif [[ "$input" =~ ^([0-9]+)s(.*)$ ]]; then
-            total=$((total + ${BASH_REMATCH[1]}))
-            input="${BASH_REMATCH[2]}"
-        elif [[ "$input" =~ ^([0-9]+)(.*)$ ]]; then
-            # Plain number (seconds)
-            total=$((total + ${BASH_REMATCH[1]}))
-            input="${BASH_REMATCH[2]}"
-        else
-            # Unknown format, break
-            break
-        fi
-    done
-    echo "$total"
-}
-
-# Format seconds to human readable form
-human_readable_seconds() {
-    local secs=$1
-    local days=$((secs/86400))
-    local hours=$(( (secs%86400)/3600 ))
-    local mins=$(( (secs%3600)/60 ))
-    local s=$((secs%60))
-    if (( days > 0 )); then
-        printf "%dd %02dh %02dm %02ds" "$days" "$hours" "$mins" "$s"
-    elif (( hours > 0 )); then
-        printf "%02dh %02dm %02ds" "$hours" "$mins" "$s"
-    elif (( mins > 0 )); then
-        printf "%02dm %02ds" "$mins" "$s"
-    else
-        printf "%02ds" "$s"
-    fi
-}
-
-# Run a command and print periodic heartbeats so the user can see progress.
-run_with_heartbeat() {
-    local raw_output="$1"
-    shift
-    # Start the command, redirect both stdout and stderr to the raw_output file
-    # The command should run in background so we can print heartbeats
-    ("$@" >"$raw_output" 2>&1) &
-    local cmd_pid=$!
-    local start_ts=$(date +%s)
-    log "Started pid=$cmd_pid"
-
-    # Determine an expected timeout by parsing --duration from the command args (fallback: global DURATION or 10m)
-    local expected_secs=0
-    for a in "$@"; do
-        if [[ "$a" =~ ^--duration= ]]; then
-            local dur_val="${a#--duration=}"
-            expected_secs=$(duration_to_seconds "$dur_val")
-            break
-        fi
-    done
-    if [[ $expected_secs -eq 0 ]]; then
-        # fallback to script-level DURATION if set, else default to 600s
-        expected_secs=$(duration_to_seconds "${DURATION:-10m}")
-    fi
-    # Add a buffer to allow for warmup/teardown time
-    local timeout_buffer=30
-    local timeout_secs=$((expected_secs + timeout_buffer))
-
-    # Print heartbeat every $HEARTBEAT_INTERVAL seconds while process is running
-    local interval=${HEARTBEAT_INTERVAL}
-    while kill -0 "$cmd_pid" 2>/dev/null; do
-        sleep "$interval"
-        if kill -0 "$cmd_pid" 2>/dev/null; then
-            local now=$(date +%s)
-            local elapsed=$((now - start_ts))
-            log "pid=$cmd_pid still running (elapsed: $(human_readable_seconds "$elapsed")) - output: $raw_output"
-            # If the process has exceeded expected duration + buffer, terminate it to avoid hanging
-            if [[ $elapsed -gt $timeout_secs ]]; then
-                warn "pid=$cmd_pid exceeded expected duration (${timeout_secs}s). Terminating to avoid hang."
-                kill "$cmd_pid" 2>/dev/null || true
-                # give it a moment to exit gracefully
-                sleep 5
-                if kill -0 "$cmd_pid" 2>/dev/null; then
-                    warn "pid=$cmd_pid did not exit after TERM; sending KILL"
-                    kill -9 "$cmd_pid" 2>/dev/null || true
-                fi
-                # Wait for any remaining child reaping
-                wait "$cmd_pid" 2>/dev/null || true
-                return 124
-            fi
-        fi
-    done
-
-    # Wait for the command to exit to capture exit status
-    wait "$cmd_pid" || return $?
-    return 0
-}
-
 usage() {
     cat <<EOF
 Usage: $0 [OPTIONS]
@@ -186,13 +85,18 @@ Options:
   --sizes SIZES          Comma-separated sizes (default: ${DEFAULT_SIZES})
   --concurrency CONC     Comma-separated concurrency levels (default: ${DEFAULT_CONCURRENCY})
   --iterations N         Number of iterations per test (default: ${DEFAULT_ITERATIONS})
-  --objects N            Number of objects per test (default: ${DEFAULT_OBJECTS})
+  --objects N            Objects per GET/DELETE dataset, one per size (default: ${DEFAULT_OBJECTS})
   --operations OPS       Comma-separated operations (default: put,get,delete,list,mixed)
   --compare              Generate comparison after running targets
   --report               Generate final HTML report
   --use-latest           Use latest results for comparison/report
   --reparse              Re-parse raw/*.json into summary.json before compare (fixes invalid_raw_output)
+  --resume               Continue the latest run of each --target: skip cells done in its
+                         manifest.json, re-run failed/interrupted ones
   --skip-cleanup         Don't clean up test objects
+  --overlap-prep         Upload the dataset of the next GET/DELETE cell while the current cell runs
+                         (shares client/store capacity with the measurement)
+  --heartbeat-interval S Seconds between progress lines of a running test (default: 30)
   --verbose              Enable verbose logging
   -h, --help             Show this help
 
@@ -209,6 +113,9 @@ Examples:
   # Regenerate report from latest data
   $0 --report --use-latest
 
+  # Continue an interrupted comparison run
+  $0 --target aws --target other --resume --compare --report
+
 EOF
     exit 0
 }
@@ -243,6 +150,11 @@ check_prerequisites() {
         warn "  pip install matplotlib pandas jinja2 seaborn"
     fi
     
+    # boto3 fills the shared GET/DELETE datasets in parallel (run_campaign.py falls back to warp put)
+    if ! python3 -c "import boto3" 2>/dev/null; then
+        warn "boto3 missing: GET/DELETE datasets will be filled with timed 'warp put' runs (pip install boto3)"
+    fi
+
     # Print versions
     log "Tool versions:"
     warp --version 2>&1 | head -1 || echo "  warp: unknown"
@@ -256,6 +168,20 @@ check_prerequisites() {
     log "Prerequisites check passed"
 }
 
+# Source a target env file (exporting its variables). If it sets S3TESTS_CONFIG, the
+# S3_* connection variables it leaves unset come from that s3-tests config, resolved
+# by warp_campaign/target.py exactly as run_campaign.py does.
+load_target_env() {
+    local config_file="$1"
+    local conf_vars
+    conf_vars="$(python3 "${SCRIPT_DIR}/warp_campaign/target.py" "$config_file")" || \
+        error "Cannot read the S3TESTS_CONFIG named in $config_file"
+    set -a
+    source "$config_file"
+    eval "$conf_vars"
+    set +a
+}
+
 check_target_config() {
     local target="$1"
     local config_file="${TARGETS_DIR}/${target}.env"
@@ -265,9 +191,7 @@ check_target_config() {
     fi
     
     # Source and validate
-    set -a
-    source "$config_file"
-    set +a
+    load_target_env "$config_file"
     
     # Required variables
     local required_vars=(
@@ -299,23 +223,39 @@ check_target_config() {
 # Benchmark Execution
 # ============================================================================
 
+# Latest run dir of a target that has a campaign manifest (i.e. can be resumed)
+find_resumable_run() {
+    local target="$1"
+    local run_dir
+    for run_dir in $(ls -dt "${RESULTS_DIR}/${target}"/*/ 2>/dev/null); do
+        if [[ -f "${run_dir%/}/manifest.json" ]]; then
+            echo "${run_dir%/}"
+            return 0
+        fi
+    done
+    return 1
+}
+
 run_benchmark_suite() {
     local target="$1"
+    local resume_dir="${2:-}"
     local timestamp="$(date '+%Y%m%d-%H%M%S')"
-    local target_dir="${RESULTS_DIR}/${target}/${timestamp}"
+    local target_dir="${resume_dir:-${RESULTS_DIR}/${target}/${timestamp}}"
     local raw_dir="${target_dir}/raw"
     local summary_file="${target_dir}/summary.json"
     
-    log "Starting benchmark suite for target: $target"
+    if [[ -n "$resume_dir" ]]; then
+        log "Resuming benchmark suite for target: $target"
+    else
+        log "Starting benchmark suite for target: $target"
+    fi
     log "Results will be stored in: $target_dir"
     
     # Create directories
     mkdir -p "$raw_dir"
     
     # Load target config
-    set -a
-    source "${TARGETS_DIR}/${target}.env"
-    set +a
+    load_target_env "${TARGETS_DIR}/${target}.env"
     # Print loaded config (mask secrets) to help debug access issues
     {
         masked_access=$(printf '%s' "${S3_ACCESS_KEY:-}" | sed -E 's/(.{4}).*(.{4})/\1****\2/')
@@ -354,159 +294,37 @@ run_benchmark_suite() {
     # Validate bucket access
     validate_bucket_access "$target"
     
-    # Initialize summary
-    echo "[]" > "$summary_file"
-    
-    # Parse sizes and concurrency
-    IFS=',' read -ra SIZE_ARRAY <<< "$SIZES"
-    IFS=',' read -ra CONC_ARRAY <<< "$CONCURRENCY"
-
-    # Trim whitespace from parsed tokens (allow inputs like "4KiB, 64KiB")
-    for i in "${!SIZE_ARRAY[@]}"; do
-        # remove leading/trailing spaces
-        SIZE_ARRAY[$i]="$(printf '%s' "${SIZE_ARRAY[$i]}" | sed -E 's/^\s+|\s+$//g')"
-    done
-    for i in "${!CONC_ARRAY[@]}"; do
-        CONC_ARRAY[$i]="$(printf '%s' "${CONC_ARRAY[$i]}" | sed -E 's/^\s+|\s+$//g')"
-    done
-
-    # Define the operations from OPERATIONS (comma-separated) and export a planned test suite file
-    local operations=()
-    IFS=',' read -ra _ops <<< "${OPERATIONS:-put,get,delete,list,mixed}"
-    for op in "${_ops[@]}"; do
-        op=$(printf '%s' "$op" | sed 's/^[[:space:]]*//;s/[[:space:]]*$//')
-        [[ -n "$op" ]] && operations+=("$op")
-    done
-    if [[ ${#operations[@]} -eq 0 ]]; then
-        operations=(put get delete list mixed)
+    # Run the operations x sizes x concurrency x iterations matrix (planned_tests.json,
+    # per-cell warmup/prep/measurement, summary.json and manifest.json) in one process
+    local campaign_args=(
+        --target "$target"
+        --run-dir "$target_dir"
+        --operations "${OPERATIONS:-put,get,delete,list,mixed}"
+        --sizes "$SIZES"
+        --concurrency "$CONCURRENCY"
+        --iterations "$ITERATIONS"
+        --duration "$DURATION"
+        --warmup "$WARMUP"
+        --objects "$OBJECTS"
+        --heartbeat-interval "$HEARTBEAT_INTERVAL"
+    )
+    if [[ "$OVERLAP_PREP" == "true" ]]; then
+        campaign_args+=(--overlap-prep)
+    fi
+    # Resume keeps the run dir's planned matrix and re-runs only cells not done in manifest.json
+    if [[ -n "$resume_dir" ]]; then
+        campaign_args+=(--resume)
     fi
-    mkdir -p "$target_dir"
-    local planned_txt="${target_dir}/planned_tests.txt"
-    local planned_json="${target_dir}/planned_tests.json"
-    : > "$planned_txt"
-    : > "$planned_json"
-    # Build JSON list using python to avoid shell quoting pitfalls
-    # Pass the arrays as arguments to the embedded python script (safe and portable)
-    python3 - "$planned_json" "${operations[*]}" "${SIZE_ARRAY[*]}" "${CONC_ARRAY[*]}" "$ITERATIONS" <<'PY' > /dev/null 2>&1
-import sys, json
-output_path = sys.argv[1]
-ops = sys.argv[2].split()
-sizes = sys.argv[3].split()
-concs = sys.argv[4].split()
-iters = int(sys.argv[5])
-planned = []
-for op in ops:
-    for s in sizes:
-        for c in concs:
-            for i in range(1, iters+1):
-                planned.append({"operation": op, "size": s, "concurrency": int(c), "iteration": i})
-open(output_path, 'w', encoding='utf-8').write(json.dumps(planned, indent=2))
-PY
-
-    # Also write a human-readable list
-    for op in "${operations[@]}"; do
-        for s in "${SIZE_ARRAY[@]}"; do
-            for c in "${CONC_ARRAY[@]}"; do
-                for it in $(seq 1 $ITERATIONS); do
-                    echo "$op size=$s concurrency=$c iteration=$it" >> "$planned_txt"
-                done
-            done
-        done
-    done
-
-    log "Planned tests written: $planned_txt and $planned_json"
-    
-    # Benchmark operations (operations defined above)
-    local total_tests=$((${#operations[@]} * ${#SIZE_ARRAY[@]} * ${#CONC_ARRAY[@]} * $ITERATIONS))
-    local current_test=0
-    
-    # Estimate total run time: convert durations to seconds
-    local duration_secs=$(duration_to_seconds "$DURATION")
-    local warmup_secs=$(duration_to_seconds "$WARMUP")
-
-    # Heuristic: per-operation overhead in seconds (setup/teardown/parsing)
-    # put/get: higher overhead due to object creation; list/delete: lower
-    estimate_overhead() {
-        local op="$1"
-        local conc="$2"
-        local base=10
-        case "$op" in
-            put|get)
-                base=20
-                ;;
-            mixed)
-                base=25
-                ;;
-            list|delete)
-                base=8
-                ;;
-            *)
-                base=12
-                ;;
-        esac
-        # Additional overhead for high concurrency
-        if (( conc >= 64 )); then
-            base=$((base + 10))
-        elif (( conc >= 16 )); then
-            base=$((base + 4))
-        fi
-        echo "$base"
-    }
-
-    # Compute an initial estimate using the first operation heuristic (conservative)
-    local sample_overhead=15
-    local est_one_test_secs=$((duration_secs + warmup_secs + sample_overhead))
-    local est_total_secs=$((est_one_test_secs * total_tests))
-
-    log "Running $total_tests tests... Estimated total time (initial): $(human_readable_seconds "$est_total_secs")"
-
-    # Track elapsed time to compute dynamic ETA
-    local suite_start_ts=$(date +%s)
-    local completed_tests=0
-    local cumulative_elapsed=0
-    
-    # Track which size/concurrency combos have been prepared with objects (simple string list)
-    local prepared_prefixes=""
-    
-    for operation in "${operations[@]}"; do
-        for size in "${SIZE_ARRAY[@]}"; do
-            for concurrency in "${CONC_ARRAY[@]}"; do
-                # NOTE: We no longer pre-populate objects because:
-                # - PUT uses --noclear to keep objects after completion
-                # - GET/DELETE use --list-existing to use objects from previous PUT tests
-                # This approach is more efficient and matches how warp is designed to work
-                
-                for iteration in $(seq 1 $ITERATIONS); do
-                    current_test=$((current_test + 1))
-                    log "Test $current_test/$total_tests: $operation size=$size concurrency=$concurrency iteration=$iteration"
-                    log "Starting test: $operation size=$size concurrency=$concurrency iteration=$iteration"
-                    local test_start_ts=$(date +%s)
-
-                    run_single_benchmark \
-                        "$target" \
-                        "$operation" \
-                        "$size" \
-                        "$concurrency" \
-                        "$iteration" \
-                        "$raw_dir" \
-                        "$summary_file"
 
-                    local test_end_ts=$(date +%s)
-                    local test_elapsed=$((test_end_ts - test_start_ts))
-                    log "Finished test: $operation size=$size concurrency=$concurrency iteration=$iteration (elapsed: $(human_readable_seconds "$test_elapsed"))"
+    # Failed cells are recorded in summary.json; a non-zero exit here must not kill the run
+    set +e
+    python3 "${SCRIPT_DIR}/run_campaign.py" "${campaign_args[@]}" >&2
+    local campaign_rc=$?
+    set -e
+    if [[ $campaign_rc -ne 0 ]]; then
+        warn "Benchmark campaign for $target exited with status $campaign_rc (see log above)"
+    fi
 
-                    # Update dynamic ETA
-                    completed_tests=$((completed_tests + 1))
-                    cumulative_elapsed=$((cumulative_elapsed + test_elapsed))
-                    local avg_per_test=$((cumulative_elapsed / completed_tests))
-                    local remaining_tests=$((total_tests - completed_tests))
-                    local est_remaining_secs=$((avg_per_test * remaining_tests))
-                    log "Progress: $completed_tests/$total_tests tests completed. Estimated remaining time: $(human_readable_seconds "$est_remaining_secs")"
-                done
-            done
-        done
-    done
-    
     # Save metadata
     save_metadata "$target" "$target_dir"
     
@@ -517,349 +335,6 @@ PY
     echo "$target_dir"
 }
 
-prepare_test_objects() {
-    local target="$1"
-    local size="$2"
-    local concurrency="$3"
-    local raw_dir="$4"
-    
-    local prefix="warp-bench/${target}/${size}_c${concurrency}"
-    local prep_output="${raw_dir}/prep_${size}_c${concurrency}.json"
-    
-    # Derive warp host
-    local _ep_no_scheme_prep="${S3_ENDPOINT#http://}"
-    _ep_no_scheme_prep="${_ep_no_scheme_prep#https://}"
-    local WARP_HOST_PREP="${_ep_no_scheme_prep%%/*}"
-    
-    local prep_cmd=(
-        warp put
-        --host "${WARP_HOST_PREP}"
-        --access-key "${S3_ACCESS_KEY}"
-        --secret-key "${S3_SECRET_KEY}"
-        --bucket "${S3_BUCKET}"
-        --obj.size "$size"
-        --prefix "$prefix"
-        --concurrent "$concurrency"
-        --duration 30s
-        --autoterm
-        --quiet
-    )
-    
-    if [[ -n "${S3_REGION:-}" ]]; then
-        prep_cmd+=(--region "$S3_REGION")
-    fi
-    
-    if [[ "${S3_TLS:-true}" == "false" ]]; then
-        prep_cmd+=(--insecure)
-    fi
-    
-    if [[ "${S3_PATH_STYLE:-false}" == "true" ]]; then
-        prep_cmd+=(--host-style=path)
-    fi
-    
-    log "Uploading $OBJECTS test objects (size=$size, prefix=$prefix)..."
-    if "${prep_cmd[@]}" >"$prep_output" 2>&1; then
-        log "Test objects prepared successfully"
-    else
-        warn "Failed to prepare test objects (see $prep_output). Read operations may fail."
-    fi
-}
-
-run_single_benchmark() {
-    local target="$1"
-    local operation="$2"
-    local size="$3"
-    local concurrency="$4"
-    local iteration="$5"
-    local raw_dir="$6"
-    local summary_file="$7"
-    
-    local test_name="${operation}_${size}_c${concurrency}_i${iteration}"
-    local raw_output="${raw_dir}/${test_name}.json"
-    
-    # Use a shared prefix for operations that need existing objects (get, delete, list, stat, mixed)
-    # This ensures GET/DELETE/LIST can find objects created by earlier operations
-    local prefix="warp-bench/${target}/${size}_c${concurrency}"
-    
-    # Build warp command
-    # Derive warp host for this run (strip scheme/path)
-    local _ep_no_scheme_run="${S3_ENDPOINT#http://}"
-    _ep_no_scheme_run="${_ep_no_scheme_run#https://}"
-    local WARP_HOST_RUN="${_ep_no_scheme_run%%/*}"
-    verbose "Derived warp host for run: ${WARP_HOST_RUN}"
-
-    local warp_cmd=(
-        warp "$operation"
-        --host "${WARP_HOST_RUN}"
-        --access-key "${S3_ACCESS_KEY}"
-        --secret-key "${S3_SECRET_KEY}"
-        --bucket "${S3_BUCKET}"
-        --duration "$DURATION"
-        --concurrent "$concurrency"
-        --obj.size "$size"
-        --prefix "$prefix"
-        --json
-        --autoterm
-    )
-    
-    # Add operation-specific flags
-    # PUT: Keep objects for subsequent GET/DELETE/LIST tests
-    if [[ "$operation" == "put" ]]; then
-        warp_cmd+=(--noclear)
-    fi
-    
-    # GET and DELETE: Use existing objects instead of uploading new ones
-    if [[ "$operation" == "get" || "$operation" == "delete" ]]; then
-        warp_cmd+=(--list-existing)
-    fi
-    
-    # Add optional parameters
-    if [[ -n "${S3_REGION:-}" ]]; then
-        warp_cmd+=(--region "$S3_REGION")
-    fi
-    
-    if [[ "${S3_TLS:-true}" == "false" ]]; then
-        warp_cmd+=(--insecure)
-    fi
-    
-    if [[ "${S3_PATH_STYLE:-false}" == "true" ]]; then
-        warp_cmd+=(--host-style=path)
-    fi
-    
-    # warp does not support a --warmup flag; run a separate warmup invocation if requested
-    # (we'll run warmup before the main benchmark run to let caches/warm paths stabilize)
-    
-    # If a warmup is configured, run it first (discarding output) so the main run is stable
-    if [[ "$WARMUP" != "0s" && "$WARMUP" != "0" ]]; then
-        local warmup_output
-        warmup_output=$(mktemp "${raw_dir}/${test_name}.warmup.XXXXXX")
-        # Build warmup command copying warp_cmd but with duration set to WARMUP
-        local warmup_cmd=()
-        for arg in "${warp_cmd[@]}"; do
-            warmup_cmd+=("$arg")
-        done
-        # Replace the --duration argument (if present) with warmup duration
-        for i in "${!warmup_cmd[@]}"; do
-            if [[ "${warmup_cmd[$i]}" =~ ^--duration=.+ ]]; then
-                warmup_cmd[$i]="--duration=$WARMUP"
-            fi
-        done
-
-        verbose "Running warmup: ${warmup_cmd[*]}"
-        log "Warmup run started: ${test_name} (duration: $WARMUP)"
-        # Run warmup (we don't fail the whole test if warmup fails)
-        if run_with_heartbeat "$warmup_output" "${warmup_cmd[@]}"; then
-            log "Warmup completed: ${test_name}"
-        else
-            warn "Warmup failed: ${test_name} (see $warmup_output for details)"
-        fi
-        rm -f "$warmup_output"
-    fi
-
-    # Run benchmark with heartbeat so progress is visible
-    verbose "Running: ${warp_cmd[*]}"
-    log "Test run started: $test_name (output: $raw_output)"
-
-    if run_with_heartbeat "$raw_output" "${warp_cmd[@]}"; then
-        log "Test run completed: $test_name"
-    else
-        warn "Benchmark failed: $test_name (see $raw_output for details)"
-    fi
-
-    # Parse and add to summary (will append an error entry if raw output is invalid)
-    parse_warp_output "$target" "$operation" "$size" "$concurrency" "$iteration" "$raw_output" "$summary_file"
-    
-    # Cleanup objects unless --skip-cleanup
-    if [[ "$SKIP_CLEANUP" == "false" ]]; then
-        cleanup_test_objects "$prefix"
-    fi
-}
-
-parse_warp_output() {
-    local target="$1"
-    local operation="$2"
-    local size="$3"
-    local concurrency="$4"
-    local iteration="$5"
-    local raw_output="$6"
-    local summary_file="$7"
-
-    # Temporarily disable exit-on-error so parsing failures don't kill the whole run
-    set +e
-
-    # Ensure summary file exists and is a JSON array
-    if [[ ! -f "$summary_file" ]]; then
-        echo '[]' > "$summary_file"
-    fi
-
-    # Prepare a temporary file to hold the new entry (use jq to produce valid JSON)
-    local new_entry_file
-    new_entry_file=$(mktemp "${summary_file}.entry.XXXXXX")
-
-    # Single Python parser: strips leading non-JSON (warp progress/ANSI), parses warp v2 and legacy formats
-    python3 - "$raw_output" "$target" "$operation" "$size" "$concurrency" "$iteration" "$new_entry_file" <<'PY'
-import json,sys
-
-raw_path=sys.argv[1]
-target=sys.argv[2]
-operation=sys.argv[3]
-size=sys.argv[4]
-concurrency=int(sys.argv[5])
-iteration=int(sys.argv[6])
-out_path=sys.argv[7]
-
-entry={
-    'target': target,
-    'operation': operation,
-    'object_size': size,
-    'concurrency': concurrency,
-    'iteration': iteration,
-    'throughput_mbps': 0,
-    'ops_per_sec': 0,
-    'avg_latency_ms': 0,
-    'p50_latency_ms': 0,
-    'p90_latency_ms': 0,
-    'p99_latency_ms': 0,
-    'total_operations': 0,
-    'errors': 0,
-    'error_rate': 0
-}
-
-def extract_json_from_raw(content):
-    """Strip leading non-JSON (ANSI, 'Throughput... Terminating benchmark.', etc.) and return parsed JSON."""
-    start = content.find('{')
-    if start == -1:
-        return None
-    # Warp may emit multiple JSON objects; we want the final report (last object). Try parsing from first {.
-    json_str = content[start:]
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        pass
-    # If trailing junk, try truncating at the last complete '}' (match depth)
-    depth = 0
-    end = -1
-    for i, c in enumerate(json_str):
-        if c == '{': depth += 1
-        elif c == '}':
-            depth -= 1
-            if depth == 0:
-                end = i
-    if end >= 0:
-        try:
-            return json.loads(json_str[:end+1])
-        except json.JSONDecodeError:
-            pass
-    return None
-
-def parse_warp_v2(data, operation):
-    """Extract summary metrics from warp v2 JSON (total, by_op_type, throughput, requests_by_client)."""
-    total = data.get('total') or {}
-    by_op = data.get('by_op_type') or {}
-    op_block = by_op.get(operation.upper()) if isinstance(by_op, dict) else {}
-    if not op_block:
-        op_block = total
-    thr = (total.get('throughput') or op_block.get('throughput') or {})
-    duration_millis = thr.get('measure_duration_millis') or 0
-    duration_sec = duration_millis / 1000.0 if duration_millis else 0
-    bytes_val = float(thr.get('bytes') or total.get('total_bytes') or 0)
-    total_requests = int(total.get('total_requests') or total.get('total_objects') or 0)
-    total_errors = int(total.get('total_errors') or 0)
-    ops_val = thr.get('ops') or thr.get('objects')
-    if ops_val is None and total_requests and duration_sec:
-        ops_val = total_requests
-    ops_val = float(ops_val or 0)
-    throughput_mbps = (bytes_val / (1024.0 * 1024.0)) / duration_sec if duration_sec else 0
-    ops_per_sec = ops_val / duration_sec if duration_sec else 0
-    error_rate = (total_errors / total_requests) if total_requests else 0
-    # Latency from first client's first segment (first_byte or single_sized_requests)
-    avg_ms = p50_ms = p90_ms = p99_ms = 0
-    req_by_client = op_block.get('requests_by_client') or total.get('requests_by_client') or {}
-    for client_name, segments in (req_by_client.items() if isinstance(req_by_client, dict) else []):
-        for seg in (segments if isinstance(segments, list) else [segments]):
-            s = seg.get('single_sized_requests') or {}
-            fb = s.get('first_byte') or {}
-            if fb:
-                avg_ms = float(fb.get('average_millis') or 0)
-                p50_ms = float(fb.get('median_millis') or 0)
-                p90_ms = float(fb.get('p90_millis') or 0)
-                p99_ms = float(fb.get('p99_millis') or 0)
-                break
-            dur_avg = s.get('dur_avg_millis')
-            if dur_avg is not None:
-                avg_ms = float(dur_avg)
-                p99_ms = float(s.get('dur_99_millis') or 0)
-                p90_ms = float(s.get('dur_90_millis') or 0)
-                p50_ms = float(s.get('dur_median_millis') or avg_ms)
-                break
-        break
-    return {
-        'throughput_mbps': throughput_mbps,
-        'ops_per_sec': ops_per_sec,
-        'avg_latency_ms': avg_ms,
-        'p50_latency_ms': p50_ms,
-        'p90_latency_ms': p90_ms,
-        'p99_latency_ms': p99_ms,
-        'total_operations': total_requests,
-        'errors': total_errors,
-        'error_rate': error_rate,
-    }
-
-try:
-    with open(raw_path, 'r', encoding='utf-8', errors='replace') as f:
-        content = f.read()
-    data = extract_json_from_raw(content)
-    if not data:
-        raise ValueError('No JSON object found in raw output (leading non-JSON or invalid format)')
-    # Warp v2 format: has "total" and often "v": 2
-    if isinstance(data, dict) and data.get('total') is not None:
-        parsed = parse_warp_v2(data, operation)
-        entry.update(parsed)
-    else:
-        # Legacy flat format or list of objects
-        r0 = data[0] if isinstance(data, list) and len(data) > 0 else data
-        if not isinstance(r0, dict):
-            raise ValueError('Expected dict or list of dicts')
-        entry['throughput_mbps'] = float(r0.get('throughput_mb', 0) or 0)
-        entry['ops_per_sec'] = float(r0.get('ops_per_sec', 0) or 0)
-        entry['avg_latency_ms'] = float(r0.get('latency_avg_ms', 0) or 0)
-        entry['p50_latency_ms'] = float(r0.get('latency_p50_ms', 0) or 0)
-        entry['p90_latency_ms'] = float(r0.get('latency_p90_ms', 0) or 0)
-        entry['p99_latency_ms'] = float(r0.get('latency_p99_ms', 0) or 0)
-        entry['total_operations'] = int(r0.get('operations', 0) or 0)
-        entry['errors'] = int(r0.get('errors', 0) or 0)
-        entry['error_rate'] = float(r0.get('error_rate', 0) or 0)
-except Exception as e:
-    entry['error'] = 'parse_error'
-    entry['error_msg'] = str(e)
-    entry['error_rate'] = 1.0
-
-with open(out_path, 'w', encoding='utf-8') as f:
-    json.dump(entry, f)
-PY
-
-    # If jq/python failed to write a new entry (empty file), write a minimal fallback entry
-    if [[ ! -s "$new_entry_file" ]]; then
-        echo "[WARN] new entry file is empty; writing fallback entry" >&2
-        printf '{"target":"%s","operation":"%s","object_size":"%s","concurrency":%s,"iteration":%s,"error":"entry_generation_failed"}' \
-            "$target" "$operation" "$size" "$concurrency" "$iteration" > "$new_entry_file"
-    fi
-
-    local tmp_file="${summary_file}.tmp"
-    if jq -s '.[0] + [.[1]]' "$summary_file" "$new_entry_file" > "$tmp_file" 2>/dev/null; then
-        mv "$tmp_file" "$summary_file"
-        verbose "Appended new summary entry for $target/$operation size=$size concurrency=$concurrency iteration=$iteration"
-    else
-        echo "[ERROR] Failed to append summary entry. New entry saved at: $new_entry_file" >&2
-        rm -f "$tmp_file"
-    fi
-    # cleanup temp entry file
-    rm -f "$new_entry_file"
-
-    # Re-enable exit-on-error for the rest of the script
-    set -e
-}
-
 validate_bucket_access() {
     local target="$1"
 
@@ -950,12 +425,6 @@ PY
     fi
 }
 
-cleanup_test_objects() {
-    local prefix="$1"
-    verbose "Cleaning up objects with prefix: $prefix"
-    # WARP typically cleans up its own objects, but we can add explicit cleanup if needed
-}
-
 save_metadata() {
     local target="$1"
     local target_dir="$2"
@@ -1132,10 +601,18 @@ parse_arguments() {
                 REPARSE=true
                 shift
                 ;;
+            --resume)
+                RESUME=true
+                shift
+                ;;
             --skip-cleanup)
                 SKIP_CLEANUP=true
                 shift
                 ;;
+            --overlap-prep)
+                OVERLAP_PREP=true
+                shift
+                ;;
             --heartbeat-interval)
                 HEARTBEAT_INTERVAL="$2"
                 shift 2
@@ -1208,7 +685,13 @@ main() {
         
         # Run benchmarks
         for target in "${TARGETS[@]}"; do
-            run_benchmark_suite "$target"
+            if [[ "$RESUME" == "true" ]]; then
+                local resume_dir
+                resume_dir=$(find_resumable_run "$target") || error "No resumable run (manifest.json) found for target: $target"
+                run_benchmark_suite "$target" "$resume_dir"
+            else
+                run_benchmark_suite "$target"
+            fi
         done
     else
         if [[ ${#TARGETS[@]} -eq 0 ]]; then
@@ -0,0 +1,59 @@
+"""
+The s3-tests config file: parsing, and the defaults applied to its [DEFAULT] endpoint.
+
+Shared by the functional suite (read_config() and configure() in
+s3tests/functional/__init__.py) and the perf-tests warp targets
+(perf-tests/warp_campaign/target.py), so both read a store's endpoint and keys
+the same way. Standard library only, so perf-tests can import it without the
+suite's dependencies.
+"""
+
+import configparser
+import os
+from collections import namedtuple
+
+# the [DEFAULT] host, port and is_secure, and the URL they make
+Endpoint = namedtuple('Endpoint', ['host', 'port', 'is_secure', 'url'])
+
+_parsed = {}
+
+
+def load(path):
+    """
+    Return the RawConfigParser of path, parsed once per process and again only
+    when the file changes. Callers must not modify it. A missing file gives an
+    empty parser, as RawConfigParser.read() does.
+    """
+    try:
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = (os.path.abspath(path), None, None)
+    cfg = _parsed.get(key)
+    if cfg is None:
+        cfg = configparser.RawConfigParser()
+        cfg.read(path)
+        _parsed.clear()
+        _parsed[key] = cfg
+    return cfg
+
+
+def endpoint(cfg):
+    """
+    The Endpoint of cfg's [DEFAULT] section. is_secure defaults to False and a
+    missing port to the conventional one for it (443 with TLS, else 80).
+    """
+    defaults = cfg.defaults()
+    try:
+        is_secure = cfg.getboolean('DEFAULT', 'is_secure')
+    except (configparser.NoOptionError, configparser.NoSectionError):
+        is_secure = False
+    port = defaults.get('port')
+    port = int(port) if port is not None else (443 if is_secure else 80)
+    host = defaults.get('host')
+    return Endpoint(host, port, is_secure, '%s://%s:%d' % ('https' if is_secure else 'http', host, port))
+
+
+def credentials(cfg, section):
+    """The (access_key, secret_key) of a user section such as 's3 main'."""
+    return cfg.get(section, 'access_key'), cfg.get(section, 'secret_key')
@@ -15,6 +15,9 @@ import itertools
 import urllib3
 import re
 
+from .. import conf
+from . import retry
+
 config = munch.Munch
 
 # this will be assigned by setup()
@@ -95,26 +98,28 @@ def list_versions(client, bucket, batch_size):
         if len(objs):
             yield [{'Key': o['Key'], 'VersionId': o['VersionId']} for o in objs]
 
+def _delete_objects(client, bucket, objects):
+    try:
+        return client.delete_objects(Bucket=bucket,
+                Delete={'Objects': objects, 'Quiet': True},
+                BypassGovernanceRetention=True)
+    except ClientError as e:
+        # Some backends don't support BypassGovernanceRetention unless
+        # Object Lock is enabled on the bucket. Repeat without the flag
+        # when the service rejects it (InvalidArgument) to allow cleanup.
+        # This is a fallback, not a retry: the same request would fail again.
+        if e.response.get('Error', {}).get('Code', '') != 'InvalidArgument':
+            raise
+        return client.delete_objects(Bucket=bucket,
+                Delete={'Objects': objects, 'Quiet': True})
+
 def nuke_bucket(client, bucket):
     batch_size = 128
     max_retain_date = None
 
     # list and delete objects in batches
     for objects in list_versions(client, bucket, batch_size):
-        try:
-            delete = client.delete_objects(Bucket=bucket,
-                    Delete={'Objects': objects, 'Quiet': True},
-                    BypassGovernanceRetention=True)
-        except ClientError as e:
-            # Some backends don't support BypassGovernanceRetention unless
-            # Object Lock is enabled on the bucket. Retry without the flag
-            # when the service rejects it (InvalidArgument) to allow cleanup.
-            err_code = e.response.get('Error', {}).get('Code', '')
-            if err_code in ('InvalidArgument',):
-                delete = client.delete_objects(Bucket=bucket,
-                        Delete={'Objects': objects, 'Quiet': True})
-            else:
-                raise
+        delete = _delete_objects(client, bucket, objects)
 
         # check for object locks on 403 AccessDenied errors
         for err in delete.get('Errors', []):
@@ -143,17 +148,7 @@ bucket cleanup'.format(bucket, delta.total_seconds()))
             time.sleep(delta.total_seconds())
 
         for objects in list_versions(client, bucket, batch_size):
-            try:
-                client.delete_objects(Bucket=bucket,
-                        Delete={'Objects': objects, 'Quiet': True},
-                        BypassGovernanceRetention=True)
-            except ClientError as e:
-                err_code = e.response.get('Error', {}).get('Code', '')
-                if err_code in ('InvalidArgument',):
-                    client.delete_objects(Bucket=bucket,
-                            Delete={'Objects': objects, 'Quiet': True})
-                else:
-                    raise
+            _delete_objects(client, bucket, objects)
 
     client.delete_bucket(Bucket=bucket)
 
@@ -193,8 +188,11 @@ def configured_storage_classes():
 
     return sc
 
-def configure():
-    cfg = configparser.RawConfigParser()
+def read_config():
+    """
+    Return the RawConfigParser of $S3TEST_CONF, parsed once per process and
+    again only when the file changes. Callers must not modify it.
+    """
     try:
         path = os.environ['S3TEST_CONF']
     except KeyError:
@@ -202,7 +200,11 @@ def configure():
             'To run tests, point environment '
             + 'variable S3TEST_CONF to a config file.',
             )
-    cfg.read(path)
+    # a missing file parses as empty; configure() reports what's missing
+    return conf.load(path)
+
+def configure():
+    cfg = read_config()
 
     if not cfg.defaults():
         raise RuntimeError('Your config file is missing the DEFAULT section!')
@@ -215,28 +217,12 @@ def configure():
 
     global prefix
 
-    defaults = cfg.defaults()
-
-    # vars from the DEFAULT section
-    config.default_host = defaults.get("host")
-
-    # read is_secure first (fall back to False) so we can pick a sensible
-    # default port when the port entry is missing from the config file.
-    try:
-        config.default_is_secure = cfg.getboolean('DEFAULT', "is_secure")
-    except (configparser.NoOptionError, configparser.NoSectionError):
-        config.default_is_secure = False
-
-    port_str = defaults.get("port")
-    if port_str is None:
-        # config comment suggests default port is 80; when TLS is enabled,
-        # prefer 443 as the conventional HTTPS port.
-        config.default_port = 443 if config.default_is_secure else 80
-    else:
-        config.default_port = int(port_str)
-
-    proto = 'https' if config.default_is_secure else 'http'
-    config.default_endpoint = "%s://%s:%d" % (proto, config.default_host, config.default_port)
+    # vars from the DEFAULT section; a missing port defaults to 443 with TLS, else 80
+    endpoint = conf.endpoint(cfg)
+    config.default_host = endpoint.host
+    config.default_is_secure = endpoint.is_secure
+    config.default_port = endpoint.port
+    config.default_endpoint = endpoint.url
 
     try:
         config.default_ssl_verify = cfg.getboolean('DEFAULT', "ssl_verify")
@@ -248,8 +234,7 @@ def configure():
         urllib3.disable_warnings()
 
     # vars from the main section
-    config.main_access_key = cfg.get('s3 main',"access_key")
-    config.main_secret_key = cfg.get('s3 main',"secret_key")
+    config.main_access_key, config.main_secret_key = conf.credentials(cfg, 's3 main')
     config.main_display_name = cfg.get('s3 main',"display_name")
     config.main_user_id = cfg.get('s3 main',"user_id")
     config.main_email = cfg.get('s3 main',"email")
@@ -290,42 +275,73 @@ def configure():
     except (configparser.NoSectionError, configparser.NoOptionError):
         config.rgw_restore_processor_period = 100
 
-    config.alt_access_key = cfg.get('s3 alt',"access_key")
-    config.alt_secret_key = cfg.get('s3 alt',"secret_key")
+    config.alt_access_key, config.alt_secret_key = conf.credentials(cfg, 's3 alt')
     config.alt_display_name = cfg.get('s3 alt',"display_name")
     config.alt_user_id = cfg.get('s3 alt',"user_id")
     config.alt_email = cfg.get('s3 alt',"email")
 
-    config.tenant_access_key = cfg.get('s3 tenant',"access_key")
-    config.tenant_secret_key = cfg.get('s3 tenant',"secret_key")
+    config.tenant_access_key, config.tenant_secret_key = conf.credentials(cfg, 's3 tenant')
     config.tenant_display_name = cfg.get('s3 tenant',"display_name")
     config.tenant_user_id = cfg.get('s3 tenant',"user_id")
     config.tenant_email = cfg.get('s3 tenant',"email")
     config.tenant_name = cfg.get('s3 tenant',"tenant")
 
-    config.iam_access_key = cfg.get('iam',"access_key")
-    config.iam_secret_key = cfg.get('iam',"secret_key")
+    config.iam_access_key, config.iam_secret_key = conf.credentials(cfg, 'iam')
     config.iam_display_name = cfg.get('iam',"display_name")
     config.iam_user_id = cfg.get('iam',"user_id")
     config.iam_email = cfg.get('iam',"email")
 
-    config.iam_root_access_key = cfg.get('iam root',"access_key")
-    config.iam_root_secret_key = cfg.get('iam root',"secret_key")
+    config.iam_root_access_key, config.iam_root_secret_key = conf.credentials(cfg, 'iam root')
     config.iam_root_user_id = cfg.get('iam root',"user_id")
     config.iam_root_email = cfg.get('iam root',"email")
 
-    config.iam_alt_root_access_key = cfg.get('iam alt root',"access_key")
-    config.iam_alt_root_secret_key = cfg.get('iam alt root',"secret_key")
+    config.iam_alt_root_access_key, config.iam_alt_root_secret_key = conf.credentials(cfg, 'iam alt root')
     config.iam_alt_root_user_id = cfg.get('iam alt root',"user_id")
     config.iam_alt_root_email = cfg.get('iam alt root',"email")
 
-    # vars from the fixtures section
+    # vars from the fixtures section; each shard of a sharded run gets its own prefixes
+    # (imported here so that `python -m s3tests.functional.sharding` finds it unimported)
+    from .sharding import SHARD_ENV, shard_template
+    config.shard = os.environ.get(SHARD_ENV)
     template = cfg.get('fixtures', "bucket prefix", fallback='test-{random}-')
-    prefix = choose_bucket_prefix(template=template)
+    prefix = choose_bucket_prefix(template=shard_template(template, config.shard))
     template = cfg.get('fixtures', "iam name prefix", fallback="s3-tests-")
-    config.iam_name_prefix = choose_bucket_prefix(template=template)
+    config.iam_name_prefix = choose_bucket_prefix(template=shard_template(template, config.shard))
     template = cfg.get('fixtures', "iam path prefix", fallback="/s3-tests/")
-    config.iam_path_prefix = choose_bucket_prefix(template=template)
+    config.iam_path_prefix = choose_bucket_prefix(template=shard_template(template, config.shard))
+
+    # vars from the (optional) retries section, applied by the get_*_client factories;
+    # without it clients keep botocore's default (legacy) retries
+    config.retries = None
+    if cfg.has_section('retries'):
+        config.retries = {'mode': cfg.get('retries', "mode", fallback='standard'),
+                          'total_max_attempts': cfg.getint('retries', "max attempts", fallback=5)}
+
+    # vars from the (optional) benchmark section
+    config.benchmark_listing_keys = cfg.getint('benchmark', "listing keys", fallback=20000)
+    config.benchmark_workers = cfg.getint('benchmark', "workers", fallback=32)
+    config.benchmark_s3select_sizes_mb = [int(n) for n in
+                                          cfg.get('benchmark', "s3select sizes mb", fallback='1,16,64').split(',')
+                                          if n.strip()]
+    config.benchmark_iterations = cfg.getint('benchmark', "iterations", fallback=1)
+    config.benchmark_results_dir = cfg.get('benchmark', "results dir", fallback='')
+    config.benchmark_notification_rates = [int(n) for n in
+                                           cfg.get('benchmark', "notification rates", fallback='10,50,200').split(',')
+                                           if n.strip()]
+    config.benchmark_notification_objects = cfg.getint('benchmark', "notification objects", fallback=100)
+    config.benchmark_logging_objects = cfg.getint('benchmark', "logging objects", fallback=200)
+    config.benchmark_logging_concurrency = [int(n) for n in
+                                            cfg.get('benchmark', "logging concurrency", fallback='1,8,32').split(',')
+                                            if n.strip()]
+    config.benchmark_version_depths = [int(n) for n in
+                                       cfg.get('benchmark', "version depths", fallback='10,100,1000,10000').split(',')
+                                       if n.strip()]
+    config.benchmark_versioned_keys = cfg.getint('benchmark', "versioned keys", fallback=4)
+
+    # vars from the (optional) notifications section: where the store can reach this host
+    config.notification_receiver_host = cfg.get('notifications', "receiver host", fallback='127.0.0.1')
+    config.notification_receiver_port = cfg.getint('notifications', "receiver port", fallback=0)
+    config.notification_timeout = cfg.getfloat('notifications', "timeout", fallback=30.0)
 
     if cfg.has_section("s3 cloud"):
         get_cloud_config(cfg)
@@ -347,7 +363,8 @@ def teardown():
     nuke_prefixed_buckets(prefix=prefix, client=tenant_client)
     try:
         iam_client = get_iam_client()
-        list_roles_resp = iam_client.list_roles()
+        # a shard only removes its own roles, the others may still be using theirs
+        list_roles_resp = iam_client.list_roles(**({'PathPrefix': config.iam_path_prefix} if config.shard else {}))
         for role in list_roles_resp['Roles']:
             list_policies_resp = iam_client.list_role_policies(RoleName=role['RoleName'])
             for policy in list_policies_resp['PolicyNames']:
@@ -376,15 +393,7 @@ def setup_teardown(configfile):
     teardown()
 
 def check_webidentity():
-    cfg = configparser.RawConfigParser()
-    try:
-        path = os.environ['S3TEST_CONF']
-    except KeyError:
-        raise RuntimeError(
-            'To run tests, point environment '
-            + 'variable S3TEST_CONF to a config file.',
-            )
-    cfg.read(path)
+    cfg = read_config()
     if not cfg.has_section("webidentity"):
         raise RuntimeError('Your config file is missing the "webidentity" section!')
 
@@ -404,8 +413,7 @@ def get_cloud_config(cfg):
     proto = 'https' if config.cloud_is_secure else 'http'
     config.cloud_endpoint = "%s://%s:%d" % (proto, config.cloud_host, config.cloud_port)
 
-    config.cloud_access_key = cfg.get('s3 cloud',"access_key")
-    config.cloud_secret_key = cfg.get('s3 cloud',"secret_key")
+    config.cloud_access_key, config.cloud_secret_key = conf.credentials(cfg, 's3 cloud')
 
     try:
         config.cloud_storage_class = cfg.get('s3 cloud', "cloud_storage_class")
@@ -443,6 +451,10 @@ def get_cloud_config(cfg):
         config.read_through_restore_days = 10
 
 
+def _client_config(client_config=None):
+    """client_config with the [retries] settings, if the config has that section."""
+    return retry.botocore_config(config.retries, client_config)
+
 def get_client(client_config=None):
     if client_config == None:
         client_config = Config(signature_version='s3v4')
@@ -453,7 +465,7 @@ def get_client(client_config=None):
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=client_config)
+                        config=_client_config(client_config))
     return client
 
 def get_v2_client():
@@ -463,14 +475,14 @@ def get_v2_client():
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=Config(signature_version='s3'))
+                        config=_client_config(Config(signature_version='s3')))
     return client
 
 def get_sts_client(**kwargs):
     kwargs.setdefault('region_name', '')
     kwargs.setdefault('aws_access_key_id', config.alt_access_key)
     kwargs.setdefault('aws_secret_access_key', config.alt_secret_key)
-    kwargs.setdefault('config', Config(signature_version='s3v4'))
+    kwargs['config'] = _client_config(kwargs.get('config', Config(signature_version='s3v4')))
 
     client = boto3.client(service_name='sts',
                           endpoint_url=config.default_endpoint,
@@ -483,6 +495,7 @@ def get_iam_client(**kwargs):
     kwargs.setdefault('region_name', '')
     kwargs.setdefault('aws_access_key_id', config.iam_access_key)
     kwargs.setdefault('aws_secret_access_key', config.iam_secret_key)
+    kwargs['config'] = _client_config(kwargs.get('config'))
 
     client = boto3.client(service_name='iam',
                         endpoint_url=config.default_endpoint,
@@ -494,7 +507,7 @@ def get_iam_client(**kwargs):
 def get_iam_s3client(**kwargs):
     kwargs.setdefault('aws_access_key_id', config.iam_access_key)
     kwargs.setdefault('aws_secret_access_key', config.iam_secret_key)
-    kwargs.setdefault('config', Config(signature_version='s3v4'))
+    kwargs['config'] = _client_config(kwargs.get('config', Config(signature_version='s3v4')))
 
     client = boto3.client(service_name='s3',
                           endpoint_url=config.default_endpoint,
@@ -506,7 +519,7 @@ def get_iam_s3client(**kwargs):
 def get_iam_root_s3client(**kwargs):
     kwargs.setdefault('aws_access_key_id', config.iam_root_access_key)
     kwargs.setdefault('aws_secret_access_key', config.iam_root_secret_key)
-    kwargs.setdefault('config', Config(signature_version='s3v4'))
+    kwargs['config'] = _client_config(kwargs.get('config', Config(signature_version='s3v4')))
 
     client = boto3.client(service_name='s3',
                           endpoint_url=config.default_endpoint,
@@ -520,6 +533,7 @@ def get_iam_root_client(**kwargs):
     kwargs.setdefault('region_name', '')
     kwargs.setdefault('aws_access_key_id', config.iam_root_access_key)
     kwargs.setdefault('aws_secret_access_key', config.iam_root_secret_key)
+    kwargs['config'] = _client_config(kwargs.get('config'))
 
     return boto3.client(endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
@@ -531,6 +545,7 @@ def get_iam_alt_root_client(**kwargs):
     kwargs.setdefault('region_name', '')
     kwargs.setdefault('aws_access_key_id', config.iam_alt_root_access_key)
     kwargs.setdefault('aws_secret_access_key', config.iam_alt_root_secret_key)
+    kwargs['config'] = _client_config(kwargs.get('config'))
 
     return boto3.client(endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
@@ -547,7 +562,7 @@ def get_alt_client(client_config=None):
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=client_config)
+                        config=_client_config(client_config))
     return client
 
 def get_cloud_client(client_config=None):
@@ -559,7 +574,7 @@ def get_cloud_client(client_config=None):
                         aws_secret_access_key=config.cloud_secret_key,
                         endpoint_url=config.cloud_endpoint,
                         use_ssl=config.cloud_is_secure,
-                        config=client_config)
+                        config=_client_config(client_config))
     return client
 
 def get_tenant_client(client_config=None):
@@ -572,7 +587,7 @@ def get_tenant_client(client_config=None):
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=client_config)
+                        config=_client_config(client_config))
     return client
 
 def get_v2_tenant_client():
@@ -583,7 +598,7 @@ def get_v2_tenant_client():
                           endpoint_url=config.default_endpoint,
                           use_ssl=config.default_is_secure,
                           verify=config.default_ssl_verify,
-                          config=client_config)
+                          config=_client_config(client_config))
     return client
 
 def get_tenant_iam_client():
@@ -594,7 +609,8 @@ def get_tenant_iam_client():
                           aws_secret_access_key=config.tenant_secret_key,
                           endpoint_url=config.default_endpoint,
                           verify=config.default_ssl_verify,
-                          use_ssl=config.default_is_secure)
+                          use_ssl=config.default_is_secure,
+                          config=_client_config())
     return client
 
 def get_alt_iam_client():
@@ -605,7 +621,8 @@ def get_alt_iam_client():
                           aws_secret_access_key=config.alt_secret_key,
                           endpoint_url=config.default_endpoint,
                           verify=config.default_ssl_verify,
-                          use_ssl=config.default_is_secure)
+                          use_ssl=config.default_is_secure,
+                          config=_client_config())
     return client
 
 def get_unauthenticated_client():
@@ -615,7 +632,7 @@ def get_unauthenticated_client():
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=Config(signature_version=UNSIGNED))
+                        config=_client_config(Config(signature_version=UNSIGNED)))
     return client
 
 def get_bad_auth_client(aws_access_key_id='badauth'):
@@ -625,7 +642,7 @@ def get_bad_auth_client(aws_access_key_id='badauth'):
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=Config(signature_version='s3v4'))
+                        config=_client_config(Config(signature_version='s3v4')))
     return client
 
 def get_svc_client(client_config=None, svc='s3'):
@@ -638,7 +655,7 @@ def get_svc_client(client_config=None, svc='s3'):
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
                         verify=config.default_ssl_verify,
-                        config=client_config)
+                        config=_client_config(client_config))
     return client
 
 bucket_counter = itertools.count(1)
@@ -669,7 +686,8 @@ def get_new_bucket_resource(name=None):
                         aws_secret_access_key=config.main_secret_key,
                         endpoint_url=config.default_endpoint,
                         use_ssl=config.default_is_secure,
-                        verify=config.default_ssl_verify)
+                        verify=config.default_ssl_verify,
+                        config=_client_config())
     if name is None:
         name = get_new_bucket_name()
     bucket = s3.Bucket(name)
@@ -857,6 +875,45 @@ def get_restore_processor_period():
 def get_read_through_days():
     return config.read_through_restore_days
 
+def get_benchmark_listing_keys():
+    return config.benchmark_listing_keys
+
+def get_benchmark_workers():
+    return config.benchmark_workers
+
+def get_benchmark_s3select_sizes_mb():
+    return config.benchmark_s3select_sizes_mb
+
+def get_benchmark_iterations():
+    return config.benchmark_iterations
+
+def get_benchmark_results_dir():
+    return config.benchmark_results_dir
+
+def get_benchmark_notification_rates():
+    return config.benchmark_notification_rates
+
+def get_benchmark_notification_objects():
+    return config.benchmark_notification_objects
+
+def get_benchmark_logging_objects():
+    return config.benchmark_logging_objects
+
+def get_benchmark_logging_concurrency():
+    return config.benchmark_logging_concurrency
+
+def get_benchmark_version_depths():
+    return config.benchmark_version_depths
+
+def get_benchmark_versioned_keys():
+    return config.benchmark_versioned_keys
+
+def get_notification_receiver_address():
+    return config.notification_receiver_host, config.notification_receiver_port
+
+def get_notification_timeout():
+    return config.notification_timeout
+
 def create_iam_user_s3client(client):
     prefix = get_iam_path_prefix()
 
@@ -1,33 +1,133 @@
+import contextlib
 import os
-import pytest
-
-# Path to the generated list of tests to skip for Splunk (populated from upstream diff)
-HERE = os.path.dirname(__file__)
-SKIP_LIST_FILE = os.path.join(HERE, 'skip_for_splunk_tests.txt')
-COMPLIANCE_LIST_FILE = os.path.join(HERE, 'splunk_compliance_tests.txt')
+import time
 
-def _load_skip_list():
-    if not os.path.exists(SKIP_LIST_FILE):
-        return set()
-    with open(SKIP_LIST_FILE, 'r') as f:
-        return set(line.strip() for line in f if line.strip())
+import pytest
 
-_SKIP_TESTS = _load_skip_list()
-def _load_compliance_list():
-    if not os.path.exists(COMPLIANCE_LIST_FILE):
-        return set()
-    with open(COMPLIANCE_LIST_FILE, 'r') as f:
-        return set(line.strip() for line in f if line.strip())
+from . import read_config
+from . import retry
+from . import selection
+from . import sharding
+from . import tracing
 
-_COMPLIANCE_TESTS = _load_compliance_list()
+def _benchmarks_requested(config, wanted):
+    """Benchmarks are opt-in: -m names them, the profile selects them or the config has [benchmark]."""
+    if 'benchmark' in (config.getoption('markexpr') or '') or wanted == 'benchmark':
+        return True
+    try:
+        return read_config().has_section('benchmark')
+    except RuntimeError:
+        return False  # no S3TEST_CONF: only the harness unit tests can run
 
 def pytest_collection_modifyitems(config, items):
-    if not _SKIP_TESTS:
-        return
+    index = selection.SelectionIndex(getattr(config, 'cache', None))
+    wanted = os.environ.get(selection.PROFILE_ENV)
+    if wanted and wanted not in selection.PROFILES:
+        raise pytest.UsageError('{}={} is not one of {}'.format(
+            selection.PROFILE_ENV, wanted, ', '.join(selection.PROFILES)))
+    benchmarks = _benchmarks_requested(config, wanted)
+    # the node ids of this process when it is one shard of a sharded run
+    shard_file = os.environ.get(sharding.SHARD_FILE_ENV)
+    shard = sharding.load_shard(shard_file) if shard_file else None
+    selected, deselected = [], []
     for item in items:
-        # item.name is the test function name (e.g., test_foo)
-        if item.name in _SKIP_TESTS:
+        profiles = index.profiles_of(item)
+        if 'skip' in profiles:
             item.add_marker(pytest.mark.skip(reason='skipped_for_splunk (upstream)'))
         # mark compliance tests so they can be selected easily
-        if item.name in _COMPLIANCE_TESTS:
+        if 'compliance' in profiles:
             item.add_marker(pytest.mark.splunk_compliance_test)
+        if 'benchmark' in profiles and not benchmarks:
+            item.add_marker(pytest.mark.skip(
+                reason='benchmark: add a [benchmark] section to the config or run with -m benchmark'))
+        if (wanted and wanted not in profiles) or (shard is not None and item.nodeid not in shard):
+            deselected.append(item)
+        else:
+            selected.append(item)
+    index.save()
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+# tests listed in the S3TEST_TRACE/S3TEST_TIMING summaries, slowest first
+TRACE_SUMMARY_TESTS = 10
+
+_timings = None
+_real_sleep = time.sleep
+
+def pytest_configure(config):
+    global _timings
+    # before any client exists, so every client of the session is traced
+    tracer = tracing.install_from_env()
+    if os.environ.get(tracing.TIMING_ENV):
+        _timings = tracing.PhaseTimings(tracer)
+        time.sleep = _timings.wrap_sleep(_real_sleep)
+        retry.on_retry.append(_timings.count_wait)
+
+def pytest_unconfigure(config):
+    time.sleep = _real_sleep
+    if _timings is not None:
+        retry.on_retry.remove(_timings.count_wait)
+        _timings.write(os.environ[tracing.TIMING_ENV])
+    if tracing.tracer is not None:
+        tracing.tracer.close()
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    # setup and teardown (bucket nuking) calls count towards the test too
+    if tracing.tracer is not None:
+        tracing.tracer.current_test = item.nodeid
+    yield
+    if _timings is not None:
+        _timings.finish(item.nodeid)
+    if tracing.tracer is not None:
+        tracing.tracer.current_test = None
+
+def _timed_phase(item, when):
+    if _timings is None:
+        return contextlib.nullcontext()
+    return _timings.phase(item.nodeid, when)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    with _timed_phase(item, 'setup'):
+        yield
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    with _timed_phase(item, 'call'):
+        yield
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    with _timed_phase(item, 'teardown'):
+        yield
+
+def pytest_runtest_logreport(report):
+    if _timings is not None:
+        _timings.outcome(report.nodeid, report.when, report.outcome)
+
+def pytest_terminal_summary(terminalreporter):
+    tr = terminalreporter
+    tracer = tracing.tracer
+    if tracer is not None and tracer.path and tracer.records:
+        tr.write_sep('-', 'slowest S3 operations per test ({}={})'.format(tracing.TRACE_ENV, tracer.path))
+        for test, calls in list(tracer.slowest_by_test().items())[:TRACE_SUMMARY_TESTS]:
+            totals = tracer.totals(test)
+            tr.write_line('{}: {} calls, {} retries, {:.2f}s in calls'.format(
+                test or '(outside tests)', totals['calls'], totals['retries'], totals['seconds']))
+            for r in calls:
+                target = '/'.join(p for p in (r['bucket'], r['key']) if p)
+                tr.write_line('  {:9.1f}ms  {}  status={} retries={} sent={} received={}'.format(
+                    r['latency'] * 1000, ' '.join(p for p in (r['operation'], target) if p),
+                    r['status'], r['retries'], r['bytes_sent'], r['bytes_received']))
+    if _timings is not None and _timings.rows:
+        totals = _timings.phase_totals()
+        tr.write_sep('-', 'test time by phase ({}={})'.format(tracing.TIMING_ENV, os.environ[tracing.TIMING_ENV]))
+        tr.write_line('{:.1f}s total: setup {:.1f}s, body {:.1f}s, sleep {:.1f}s, teardown {:.1f}s, '
+                      '{} requests, {} retries, {} backoff waits'.format(
+            totals['total'], totals['setup'], totals['body'], totals['sleep'], totals['teardown'],
+            totals['requests'], totals['retries'], totals['waits']))
+        for row in _timings.slowest(TRACE_SUMMARY_TESTS):
+            tr.write_line('  {:8.2f}s  setup {:.2f}s body {:.2f}s sleep {:.2f}s teardown {:.2f}s  {} requests  {}'.format(
+                row['total'], row['setup'], row['body'], row['sleep'], row['teardown'], row['requests'], row['test']))
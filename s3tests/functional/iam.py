@@ -1,3 +1,7 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from botocore.exceptions import ClientError
 import pytest
 
@@ -11,159 +15,179 @@ from . import (
     get_iam_alt_root_email,
     get_iam_path_prefix,
 )
-
-def nuke_user_keys(client, name):
-    p = client.get_paginator('list_access_keys')
-    for response in p.paginate(UserName=name):
-        for key in response['AccessKeyMetadata']:
-            try:
-                client.delete_access_key(UserName=name, AccessKeyId=key['AccessKeyId'])
-            except:
-                pass
-
-def nuke_user_policies(client, name):
-    p = client.get_paginator('list_user_policies')
-    for response in p.paginate(UserName=name):
-        for policy in response['PolicyNames']:
-            try:
-                client.delete_user_policy(UserName=name, PolicyName=policy)
-            except:
-                pass
-
-def nuke_attached_user_policies(client, name):
-    p = client.get_paginator('list_attached_user_policies')
-    for response in p.paginate(UserName=name):
-        for policy in response['AttachedPolicies']:
-            try:
-                client.detach_user_policy(UserName=name, PolicyArn=policy['PolicyArn'])
-            except:
-                pass
-
-def nuke_user(client, name):
-    # delete access keys, user policies, etc
-    try:
-        nuke_user_keys(client, name)
-    except:
-        pass
-    try:
-        nuke_user_policies(client, name)
-    except:
-        pass
-    try:
-        nuke_attached_user_policies(client, name)
-    except:
-        pass
-    client.delete_user(UserName=name)
-
-def nuke_users(client, **kwargs):
-    p = client.get_paginator('list_users')
-    for response in p.paginate(**kwargs):
-        for user in response['Users']:
-            try:
-                nuke_user(client, user['UserName'])
-            except:
-                pass
-
-def nuke_group_policies(client, name):
-    p = client.get_paginator('list_group_policies')
-    for response in p.paginate(GroupName=name):
-        for policy in response['PolicyNames']:
-            try:
-                client.delete_group_policy(GroupName=name, PolicyName=policy)
-            except:
-                pass
-
-def nuke_attached_group_policies(client, name):
-    p = client.get_paginator('list_attached_group_policies')
-    for response in p.paginate(GroupName=name):
-        for policy in response['AttachedPolicies']:
-            try:
-                client.detach_group_policy(GroupName=name, PolicyArn=policy['PolicyArn'])
-            except:
-                pass
-
-def nuke_group_users(client, name):
-    p = client.get_paginator('get_group')
-    for response in p.paginate(GroupName=name):
-        for user in response['Users']:
-            try:
-                client.remove_user_from_group(GroupName=name, UserName=user['UserName'])
-            except:
-                pass
-
-def nuke_group(client, name):
-    # delete group policies and remove all users
-    try:
-        nuke_group_policies(client, name)
-    except:
-        pass
-    try:
-        nuke_attached_group_policies(client, name)
-    except:
-        pass
-    try:
-        nuke_group_users(client, name)
-    except:
-        pass
-    client.delete_group(GroupName=name)
-
-def nuke_groups(client, **kwargs):
-    p = client.get_paginator('list_groups')
-    for response in p.paginate(**kwargs):
-        for user in response['Groups']:
-            try:
-                nuke_group(client, user['GroupName'])
-            except:
-                pass
-
-def nuke_role_policies(client, name):
-    p = client.get_paginator('list_role_policies')
-    for response in p.paginate(RoleName=name):
-        for policy in response['PolicyNames']:
-            try:
-                client.delete_role_policy(RoleName=name, PolicyName=policy)
-            except:
-                pass
-
-def nuke_attached_role_policies(client, name):
-    p = client.get_paginator('list_attached_role_policies')
-    for response in p.paginate(RoleName=name):
-        for policy in response['AttachedPolicies']:
-            try:
-                client.detach_role_policy(RoleName=name, PolicyArn=policy['PolicyArn'])
-            except:
-                pass
-
-def nuke_role(client, name):
-    # delete role policies, etc
-    try:
-        nuke_role_policies(client, name)
-    except:
-        pass
-    try:
-        nuke_attached_role_policies(client, name)
-    except:
-        pass
-    client.delete_role(RoleName=name)
-
-def nuke_roles(client, **kwargs):
-    p = client.get_paginator('list_roles')
-    for response in p.paginate(**kwargs):
-        for role in response['Roles']:
-            try:
-                nuke_role(client, role['RoleName'])
-            except:
-                pass
-
-def nuke_oidc_providers(client, prefix):
-    result = client.list_open_id_connect_providers()
-    for provider in result['OpenIDConnectProviderList']:
-        arn = provider['Arn']
-        if f':oidc-provider{prefix}' in arn:
-            try:
-                client.delete_open_id_connect_provider(OpenIDConnectProviderArn=arn)
-            except:
-                pass
+from .utils import start_concurrent
+
+IAM_CLEANUP_WORKERS = 16
+
+def _paginate(client, operation, key, **kwargs):
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        yield from page[key]
+
+class IamCleanup:
+    """
+    Removes the IAM users, groups, roles and OIDC providers under a path prefix.
+
+    discover() lists the principals and everything that blocks their deletion,
+    building a dependency graph: access keys, inline and attached policies and
+    group memberships before a user; members and policies before a group;
+    policies before a role. run() deletes it on up to max_workers threads, each
+    node as soon as the nodes it waits for are done. Anything that could not be
+    listed or removed ends up in failures as (name, exception) rather than being
+    ignored; NoSuchEntity counts as removed.
+    """
+
+    def __init__(self, client, path_prefix, max_workers=IAM_CLEANUP_WORKERS):
+        self.client = client
+        self.path_prefix = path_prefix
+        self.max_workers = max_workers
+        self.actions = {}
+        self.after = defaultdict(set)
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def add(self, name, action, after=()):
+        """Add a deletion node that runs once all nodes in after are done."""
+        with self._lock:
+            self.actions[name] = action
+            self.after[name].update(after)
+        return name
+
+    def _before(self, node, name, action):
+        """Add a node that has to be deleted before node."""
+        self.add(name, action)
+        with self._lock:
+            self.after[node].add(name)
+
+    def _fail(self, name, exception):
+        with self._lock:
+            self.failures.append((name, exception))
+
+    def _concurrently(self, calls):
+        """Run (label, func, *args) calls; return their results chained, record failures under label."""
+        handle = start_concurrent(lambda label, func, *args: func(*args), calls,
+                                  self.max_workers, sync_start=False).wait()
+        for result in handle.results:
+            if result.exception is not None:
+                self._fail(calls[result.index][0], result.exception)
+        return [value for result in handle.results if result.exception is None
+                for value in result.value or ()]
+
+    def discover(self, users=True, groups=True, roles=True, oidc_providers=True):
+        """Build the graph for the selected kinds of resources."""
+        listings = [('list ' + kind, self._list, kind) for kind, wanted in (
+            ('users', users), ('groups', groups), ('roles', roles)) if wanted]
+        if oidc_providers:
+            listings.append(('list oidc providers', self._list_oidc_providers))
+        # the principals first, then what each of them still has
+        self._concurrently(self._concurrently(listings))
+        return self
+
+    def _list(self, kind):
+        discover = {'users': self._discover_user, 'groups': self._discover_group,
+                    'roles': self._discover_role}[kind]
+        key = kind.capitalize()
+        name = key[:-1] + 'Name'
+        return [('list {} {}'.format(kind, entry[name]), discover, entry[name])
+                for entry in _paginate(self.client, 'list_' + kind, key, PathPrefix=self.path_prefix)]
+
+    def _list_oidc_providers(self):
+        client = self.client
+        for provider in client.list_open_id_connect_providers()['OpenIDConnectProviderList']:
+            arn = provider['Arn']
+            if f':oidc-provider{self.path_prefix}' in arn:
+                self.add('oidc-provider ' + arn,
+                         lambda arn=arn: client.delete_open_id_connect_provider(OpenIDConnectProviderArn=arn))
+        return []
+
+    # the principal's node goes in first, so it is still tried if listing its dependents fails
+
+    def _discover_user(self, name):
+        client = self.client
+        node = self.add('user ' + name, lambda: client.delete_user(UserName=name))
+        for key in _paginate(client, 'list_access_keys', 'AccessKeyMetadata', UserName=name):
+            key_id = key['AccessKeyId']
+            self._before(node, '{} key {}'.format(node, key_id),
+                         lambda key_id=key_id: client.delete_access_key(UserName=name, AccessKeyId=key_id))
+        for policy in _paginate(client, 'list_user_policies', 'PolicyNames', UserName=name):
+            self._before(node, '{} policy {}'.format(node, policy),
+                         lambda policy=policy: client.delete_user_policy(UserName=name, PolicyName=policy))
+        for policy in _paginate(client, 'list_attached_user_policies', 'AttachedPolicies', UserName=name):
+            arn = policy['PolicyArn']
+            self._before(node, '{} attached {}'.format(node, arn),
+                         lambda arn=arn: client.detach_user_policy(UserName=name, PolicyArn=arn))
+
+    def _discover_group(self, name):
+        client = self.client
+        node = self.add('group ' + name, lambda: client.delete_group(GroupName=name))
+        for policy in _paginate(client, 'list_group_policies', 'PolicyNames', GroupName=name):
+            self._before(node, '{} policy {}'.format(node, policy),
+                         lambda policy=policy: client.delete_group_policy(GroupName=name, PolicyName=policy))
+        for policy in _paginate(client, 'list_attached_group_policies', 'AttachedPolicies', GroupName=name):
+            arn = policy['PolicyArn']
+            self._before(node, '{} attached {}'.format(node, arn),
+                         lambda arn=arn: client.detach_group_policy(GroupName=name, PolicyArn=arn))
+        for user in _paginate(client, 'get_group', 'Users', GroupName=name):
+            user_name = user['UserName']
+            member = '{} member {}'.format(node, user_name)
+            self._before(node, member,
+                         lambda user_name=user_name: client.remove_user_from_group(GroupName=name,
+                                                                                   UserName=user_name))
+            # the user can only be deleted once it has left the group
+            with self._lock:
+                self.after['user ' + user_name].add(member)
+
+    def _discover_role(self, name):
+        client = self.client
+        node = self.add('role ' + name, lambda: client.delete_role(RoleName=name))
+        for policy in _paginate(client, 'list_role_policies', 'PolicyNames', RoleName=name):
+            self._before(node, '{} policy {}'.format(node, policy),
+                         lambda policy=policy: client.delete_role_policy(RoleName=name, PolicyName=policy))
+        for policy in _paginate(client, 'list_attached_role_policies', 'AttachedPolicies', RoleName=name):
+            arn = policy['PolicyArn']
+            self._before(node, '{} attached {}'.format(node, arn),
+                         lambda arn=arn: client.detach_role_policy(RoleName=name, PolicyArn=arn))
+
+    def _delete(self, name):
+        try:
+            self.actions[name]()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'NoSuchEntity':
+                self._fail(name, e)
+        except Exception as e:
+            self._fail(name, e)
+
+    def run(self):
+        """Delete the discovered graph; return the failures."""
+        waiting = {name: {n for n in self.after[name] if n in self.actions} for name in self.actions}
+        dependents = defaultdict(list)
+        for name, after in waiting.items():
+            for prerequisite in after:
+                dependents[prerequisite].append(name)
+        # a node whose prerequisite failed is still tried, so the server's reason
+        # (usually DeleteConflict) is reported for it as well
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while waiting or running:
+                for name in [name for name, after in waiting.items() if not after]:
+                    del waiting[name]
+                    running[executor.submit(self._delete, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    for dependent in dependents[name]:
+                        waiting[dependent].discard(name)
+        return self.failures
+
+def nuke_iam(client, path_prefix, max_workers=IAM_CLEANUP_WORKERS, **kinds):
+    """
+    Remove the IAM resources under path_prefix (see IamCleanup; kinds selects
+    users/groups/roles/oidc_providers). Raises RuntimeError listing whatever was
+    left behind, after trying everything else.
+    """
+    failures = IamCleanup(client, path_prefix, max_workers).discover(**kinds).run()
+    if failures:
+        raise RuntimeError('IAM cleanup under {} left {} item(s) behind:\n{}'.format(
+            path_prefix, len(failures), '\n'.join('  {}: {}'.format(name, e) for name, e in failures)))
 
 
 # fixture for iam account root user
@@ -178,10 +202,7 @@ def iam_root(configfile):
         pytest.skip('[iam root] user does not belong to an account')
 
     yield client
-    nuke_users(client, PathPrefix=get_iam_path_prefix())
-    nuke_groups(client, PathPrefix=get_iam_path_prefix())
-    nuke_roles(client, PathPrefix=get_iam_path_prefix())
-    nuke_oidc_providers(client, get_iam_path_prefix())
+    nuke_iam(client, get_iam_path_prefix())
 
 # fixture for iam alt account root user
 @pytest.fixture
@@ -195,5 +216,4 @@ def iam_alt_root(configfile):
         pytest.skip('[iam alt root] user does not belong to an account')
 
     yield client
-    nuke_users(client, PathPrefix=get_iam_path_prefix())
-    nuke_roles(client, PathPrefix=get_iam_path_prefix())
+    nuke_iam(client, get_iam_path_prefix(), groups=False, oidc_providers=False)
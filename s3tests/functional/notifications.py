@@ -0,0 +1,160 @@
+"""
+Bucket notification delivery measurement.
+
+NotificationReceiver is a local HTTP endpoint for the store to push bucket
+notifications to (a topic whose push-endpoint is receiver.endpoint). It records
+the arrival time of every event record, and DeliveryTracker matches them with the
+PUT/DELETE requests that caused them: events the store never delivered (lost),
+delivered more than once (duplicates), and the latency from the start of the
+request to the event's arrival (end to end: stores that notify before they
+respond deliver events before the response arrives). Both sides use this host's
+clock, so the store's clock doesn't need to be in sync.
+
+The receiver must be reachable from the store: set the [notifications] receiver
+host (and port, if a firewall needs a fixed one) in the config when the store
+runs on another machine.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote_plus
+
+from .utils import latency_stats
+
+def event_family(event_name):
+    """'ObjectCreated' for s3:ObjectCreated:Put, ObjectCreated:Copy etc."""
+    name = event_name[3:] if event_name.startswith('s3:') else event_name
+    return name.split(':', 1)[0]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.receiver.receive(body)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NotificationReceiver:
+    """Collects the notification records POSTed to it; usable as a context manager."""
+
+    def __init__(self, host='127.0.0.1', port=0, clock=time.perf_counter):
+        self.clock = clock
+        self.events = []  # (arrival time, bucket, key, event family)
+        self.requests = 0
+        self.malformed = 0
+        self._cond = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.receiver = self
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def receive(self, body):
+        now = self.clock()
+        try:
+            records = json.loads(body)['Records']
+        except (ValueError, KeyError, TypeError):
+            with self._cond:
+                self.requests += 1
+                self.malformed += 1
+            return
+        with self._cond:
+            self.requests += 1
+            for record in records:
+                s3 = record.get('s3', {})
+                self.events.append((now, s3.get('bucket', {}).get('name'),
+                                    unquote_plus(s3.get('object', {}).get('key', '')),
+                                    event_family(record.get('eventName', ''))))
+            self._cond.notify_all()
+
+    def wait_until(self, predicate, timeout):
+        """Wait until predicate(events) holds or timeout seconds passed; return whether it holds."""
+        with self._cond:
+            return self._cond.wait_for(lambda: predicate(self.events), timeout)
+
+    def received(self):
+        with self._cond:
+            return list(self.events)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='notification-receiver',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class DeliveryTracker:
+    """
+    Requests sent, by (bucket, key, event family), and their delivery by a receiver;
+    only events for keys starting with `prefix` are considered, so one receiver can
+    serve several trackers.
+    """
+
+    def __init__(self, receiver, prefix=''):
+        self.receiver = receiver
+        self.prefix = prefix
+        self.sent = {}
+        self._lock = threading.Lock()
+
+    def clock(self):
+        return self.receiver.clock()
+
+    def sent_event(self, bucket, key, family, start):
+        """Record that a request started at clock() `start` succeeded and should produce a `family` event."""
+        with self._lock:
+            self.sent[(bucket, key, family)] = start
+
+    def _delivered(self, events):
+        with self._lock:
+            sent = set(self.sent)
+        return sent <= set((bucket, key, family) for _, bucket, key, family in events)
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for every sent event; return whether all arrived."""
+        return self.receiver.wait_until(self._delivered, timeout)
+
+    def stats(self):
+        """
+        sent, delivered, lost, duplicates, unexpected (events for nothing sent), and
+        the latency_stats() and mean latency of the first delivery of each event, in seconds.
+        """
+        with self._lock:
+            sent = dict(self.sent)
+        latencies, seen, duplicates, unexpected = [], set(), 0, 0
+        for arrival, bucket, key, family in self.receiver.received():
+            if not key.startswith(self.prefix):
+                continue
+            event = (bucket, key, family)
+            if event not in sent:
+                unexpected += 1
+            elif event in seen:
+                duplicates += 1
+            else:
+                seen.add(event)
+                latencies.append(max(0.0, arrival - sent[event]))
+        return {'sent': len(sent), 'delivered': len(seen), 'lost': len(sent) - len(seen),
+                'duplicates': duplicates, 'unexpected': unexpected, 'latency': latency_stats(latencies),
+                'mean_latency': sum(latencies) / len(latencies) if latencies else 0.0}
@@ -0,0 +1,113 @@
+"""
+The suite's retry policy.
+
+Transient errors on a single request (throttling, 5xx, connection resets) are
+retried by botocore itself. With a [retries] section in the config (see the
+sample), the get_*_client factories build their clients with that retry mode and
+attempt budget through botocore_config(); without it, clients keep botocore's
+defaults.
+
+RetryPolicy covers what botocore can't know is transient: eventual consistency,
+e.g. a freshly created IAM user's key that STS doesn't accept yet, or a
+versioning status that isn't visible yet. It waits with full-jitter exponential
+backoff between attempts, within an attempt limit and a deadline, and only for
+the error codes it is given. Each wait is reported to the callbacks in
+on_retry, which the test timing report counts per test (see conftest.py).
+"""
+
+import itertools
+import random
+import time
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# callbacks called as callback(code, delay) before each backoff wait
+on_retry = []
+
+def botocore_config(retries, client_config=None):
+    """
+    client_config (a botocore Config, or None) with the retries settings (a botocore
+    retries dict, or None for botocore's defaults); retries client_config sets itself win.
+    """
+    if not retries:
+        return client_config
+    config = Config(retries=dict(retries))
+    return config if client_config is None else config.merge(client_config)
+
+
+class RetryPolicy:
+    """
+    attempts: most calls in total (codes may be one code, a sequence of them or a
+    {code: attempts} dict, which also limits the calls failing with each code);
+    base_delay/max_delay: the backoff before retry n is uniform in
+    [0, min(max_delay, base_delay * 2**n)]; deadline: seconds from the first call
+    after which no further wait is started.
+    """
+
+    def __init__(self, attempts=10, base_delay=0.1, max_delay=5.0, deadline=30.0,
+                 rng=None, clock=time.monotonic):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.rng = rng or random.Random()
+        self.clock = clock
+
+    def backoff(self, retry):
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def _wait(self, start, retry, code):
+        """Sleep before the next attempt; False if the deadline doesn't allow it."""
+        delay = self.backoff(retry)
+        if self.clock() - start + delay > self.deadline:
+            return False
+        for callback in on_retry:
+            callback(code, delay)
+        time.sleep(delay)
+        return True
+
+    def call(self, codes, func, *args, **kwargs):
+        """
+        Return func(*args, **kwargs), retrying while it raises a ClientError whose
+        code is one of codes (compared exactly); any other error, or the last one,
+        is raised.
+        """
+        if isinstance(codes, str):
+            codes = (codes,)
+        limits = codes if isinstance(codes, dict) else dict.fromkeys(codes, self.attempts)
+        start = self.clock()
+        tries = {}
+        for retry in itertools.count():
+            try:
+                return func(*args, **kwargs)
+            except ClientError as e:
+                code = e.response['Error']['Code']
+                tries[code] = tries.get(code, 0) + 1
+                if (retry + 1 >= self.attempts or tries[code] >= limits.get(code, 0)
+                        or not self._wait(start, retry, code)):
+                    raise
+
+    def poll(self, func, done, label='poll'):
+        """
+        Call func() until done(result) holds or the budget runs out; return the
+        last result either way, for the caller to assert on.
+        """
+        start = self.clock()
+        for retry in range(self.attempts):
+            result = func()
+            if done(result) or retry + 1 == self.attempts or not self._wait(start, retry, label):
+                return result
+
+
+# retry_on()'s budget for IAM/STS propagation: over 10 calls the waits add up to
+# ~37s on average (the linear 0..8s sleeps it replaced took 36s), and at most 45s
+RETRY_ON_BASE_DELAY = 1.0
+RETRY_ON_MAX_DELAY = 12.0
+RETRY_ON_DEADLINE = 45.0
+
+def retry_on(codes, tries, func, *args, **kwargs):
+    """func(*args, **kwargs), called at most tries times while it fails with one of codes."""
+    policy = RetryPolicy(attempts=tries, base_delay=RETRY_ON_BASE_DELAY, max_delay=RETRY_ON_MAX_DELAY,
+                         deadline=RETRY_ON_DEADLINE)
+    return policy.call(codes, func, *args, **kwargs)
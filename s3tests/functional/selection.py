@@ -0,0 +1,114 @@
+"""
+Selection profiles of the functional tests, applied by conftest.py in one pass
+over the collected items.
+
+Each test gets a set of profiles:
+
+- core: what run_core_s3_tests.sh runs, i.e. every test without a marker in
+  CORE_EXCLUDED_MARKERS, whose name doesn't contain one of CORE_EXCLUDED_NAMES
+  and whose module::test id doesn't start with an entry of
+  core_deselect_tests.txt (prefixes, as with --deselect);
+- compliance: listed in splunk_compliance_tests.txt (also marked
+  splunk_compliance_test);
+- skip: listed in skip_for_splunk_tests.txt (also marked skip);
+- benchmark: marked benchmark. These populate large buckets, so they are
+  skipped unless the config has a [benchmark] section or -m names them (or
+  S3TEST_PROFILE=benchmark selects them).
+
+S3TEST_PROFILE=<profile> deselects every test outside that profile, which
+replaces the -m/-k expressions and the --deselect argument per test that pytest
+would otherwise match against every item. The index (node id -> profiles) is
+kept in pytest's cache (.pytest_cache, key s3tests/selection) together with a
+fingerprint of the test modules and lists, so later runs only look it up.
+"""
+
+import hashlib
+import os
+
+HERE = os.path.dirname(__file__)
+SKIP_LIST_FILE = os.path.join(HERE, 'skip_for_splunk_tests.txt')
+COMPLIANCE_LIST_FILE = os.path.join(HERE, 'splunk_compliance_tests.txt')
+CORE_DESELECT_FILE = os.path.join(HERE, 'core_deselect_tests.txt')
+
+PROFILE_ENV = 'S3TEST_PROFILE'
+CACHE_KEY = 's3tests/selection'
+PROFILES = ('core', 'compliance', 'skip', 'benchmark')
+
+CORE_EXCLUDED_MARKERS = frozenset((
+    'iam_account', 'iam_cross_account', 'iam_role', 'iam_user', 'iam_tenant',
+    'bucket_policy', 'user_policy', 'role_policy', 'session_policy', 'group_policy', 'auth_common',
+    'object_lock', 'sse_s3', 'encryption', 'bucket_encryption', 'cors', 'acl', 'acl_required',
+    'webidentity', 'sts', 'iam', 's3select', 'checksum', 'logging', 'policy', 'fails_on_aws', 'benchmark',
+))
+
+# matched like -k: case-insensitive substrings of the test name
+CORE_EXCLUDED_NAMES = (
+    'test_lifecycle_expiration_header_put',
+    'test_lifecycle_expiration_header_head',
+    'test_lifecycle_expiration_header_tags_head',
+    'test_object_checksum_sha256',
+    'test_versioning_concurrent_multi_object_delete',
+)
+
+def _load_list(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r') as f:
+        return set(line.split('#', 1)[0].strip() for line in f) - {''}
+
+
+class SelectionIndex:
+    """Profiles of the collected tests, computed from the rules above or read from the cache."""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.skip_tests = _load_list(SKIP_LIST_FILE)
+        self.compliance_tests = _load_list(COMPLIANCE_LIST_FILE)
+        # prefixes of module::test ids, like --deselect (which matches node id prefixes)
+        self.core_deselected = tuple(sorted(_load_list(CORE_DESELECT_FILE)))
+        self.fingerprint = self._fingerprint()
+        self.profiles = {}
+        if cache is not None:
+            cached = cache.get(CACHE_KEY, None)
+            if cached and cached.get('fingerprint') == self.fingerprint:
+                self.profiles = cached['profiles']
+        self._changed = False
+
+    @staticmethod
+    def _fingerprint():
+        """Changes whenever a test module, a list or these rules do."""
+        digest = hashlib.sha1()
+        for name in sorted(os.listdir(HERE)):
+            if name.endswith(('.py', '.txt')):
+                st = os.stat(os.path.join(HERE, name))
+                digest.update('{}:{}:{};'.format(name, st.st_mtime_ns, st.st_size).encode())
+        return digest.hexdigest()
+
+    def classify(self, item):
+        """The profiles of one collected item."""
+        module_id = '{}::{}'.format(os.path.basename(str(item.fspath)), item.name)
+        profiles = []
+        lowered = item.name.lower()
+        if (not module_id.startswith(self.core_deselected)
+                and not any(m.name in CORE_EXCLUDED_MARKERS for m in item.iter_markers())
+                and not any(n.lower() in lowered for n in CORE_EXCLUDED_NAMES)):
+            profiles.append('core')
+        if item.name in self.compliance_tests:
+            profiles.append('compliance')
+        if item.name in self.skip_tests:
+            profiles.append('skip')
+        if item.get_closest_marker('benchmark') is not None:
+            profiles.append('benchmark')
+        return profiles
+
+    def profiles_of(self, item):
+        profiles = self.profiles.get(item.nodeid)
+        if profiles is None:
+            profiles = self.profiles[item.nodeid] = self.classify(item)
+            self._changed = True
+        return profiles
+
+    def save(self):
+        if self.cache is not None and self._changed:
+            self.cache.set(CACHE_KEY, {'fingerprint': self.fingerprint, 'profiles': self.profiles})
+            self._changed = False
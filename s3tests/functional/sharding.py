@@ -0,0 +1,213 @@
+"""
+Sharded runs of the functional tests, balanced by measured duration.
+
+test_s3.py alone mixes tests of a few milliseconds with lifecycle, logging and
+multipart tests of minutes, so splitting it by count balances poorly. Instead,
+per-test durations are read from previous JUnit reports (junit-*.xml in the
+report directory, the last DURATION_RUNS of them), the selected tests are
+partitioned into N shards by longest-first greedy assignment to the least
+loaded shard, and the shards run as concurrent pytest processes against the same
+endpoint. Tests without a recorded duration count as the median one.
+
+Each shard process gets S3TEST_SHARD=<index>, which gives it its own bucket and
+IAM name/path prefixes (see shard_template() and configure()), and
+S3TEST_SHARD_FILE, the node ids it runs; conftest.py deselects the rest. The
+shards' JUnit XML, logs and S3TEST_TIMING CSVs are merged into the usual
+junit-<timestamp>.xml, pytest-<timestamp>.log and timing file, so wall time is
+that of the longest shard instead of the sum::
+
+  python -m s3tests.functional.sharding --shards 4 --report-dir s3tests/reports -- s3tests/functional
+"""
+
+import argparse
+import csv
+import glob
+import heapq
+import os
+import statistics
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from . import tracing
+
+SHARD_ENV = 'S3TEST_SHARD'
+SHARD_FILE_ENV = 'S3TEST_SHARD_FILE'
+
+# how many of the latest JUnit reports durations are averaged over
+DURATION_RUNS = 5
+
+def shard_template(template, shard):
+    """
+    A bucket/IAM prefix template unique to one shard: names get an s<shard>-
+    prefix, paths (starting with /) a shard<shard>/ component.
+    """
+    if not shard:
+        return template
+    if template.startswith('/'):
+        return '{}shard{}/'.format(template.rstrip('/') + '/', shard)
+    return 's{}-{}'.format(shard, template)
+
+def _junit_key(nodeid):
+    """The (classname, name) pytest's JUnit report uses for a node id."""
+    path, *names = nodeid.split('::')
+    classname = '.'.join([path[:-3].replace('/', '.')] + names[:-1])
+    return classname, names[-1]
+
+def load_durations(report_dir, runs=DURATION_RUNS):
+    """{(classname, name): mean seconds} over the latest `runs` junit-*.xml reports."""
+    reports = sorted(glob.glob(os.path.join(report_dir, 'junit-*.xml')), key=os.path.getmtime)
+    samples = {}
+    for path in reports[-runs:] if runs else reports:
+        try:
+            root = ET.parse(path).getroot()
+        except ET.ParseError:
+            continue  # a run that was interrupted while writing its report
+        for case in root.iter('testcase'):
+            key = (case.get('classname', ''), case.get('name', ''))
+            samples.setdefault(key, []).append(float(case.get('time') or 0))
+    return {key: sum(times) / len(times) for key, times in samples.items()}
+
+def partition(nodeids, durations, shards):
+    """
+    Split nodeids into `shards` lists of about equal expected duration; return
+    (shards, expected seconds per shard). Each shard keeps collection order.
+    """
+    known = [durations[_junit_key(n)] for n in nodeids if _junit_key(n) in durations]
+    default = statistics.median(known) if known else 1.0
+    expected = {n: durations.get(_junit_key(n), default) for n in nodeids}
+    loads = [(0.0, i) for i in range(shards)]
+    assigned = {}
+    for nodeid in sorted(nodeids, key=lambda n: -expected[n]):
+        load, i = heapq.heappop(loads)
+        assigned[nodeid] = i
+        heapq.heappush(loads, (load + expected[nodeid], i))
+    result = [[] for _ in range(shards)]
+    for nodeid in nodeids:
+        result[assigned[nodeid]].append(nodeid)
+    totals = [sum(expected[n] for n in shard) for shard in result]
+    return result, totals
+
+def load_shard(path):
+    """The node ids listed in a shard file."""
+    with open(path, 'r') as f:
+        return set(line.strip() for line in f if line.strip())
+
+def merge_junit(paths, out):
+    """Write the shards' test suites as one <testsuites> report."""
+    merged = ET.Element('testsuites')
+    totals = dict.fromkeys(('tests', 'errors', 'failures', 'skipped'), 0)
+    wall = 0.0
+    for i, path in enumerate(paths):
+        try:
+            root = ET.parse(path).getroot()
+        except (OSError, ET.ParseError):
+            continue
+        for suite in root.iter('testsuite'):
+            suite.set('name', '{}-shard{}'.format(suite.get('name', 'pytest'), i))
+            for field in totals:
+                totals[field] += int(suite.get(field) or 0)
+            wall = max(wall, float(suite.get('time') or 0))
+            merged.append(suite)
+    for field, value in totals.items():
+        merged.set(field, str(value))
+    merged.set('time', '{:.3f}'.format(wall))
+    ET.ElementTree(merged).write(out, encoding='utf-8', xml_declaration=True)
+
+def merge_timing(paths, out):
+    """Merge the shards' S3TEST_TIMING CSVs, slowest first."""
+    fieldnames, rows = None, []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = fieldnames or reader.fieldnames
+            rows.extend(reader)
+    if fieldnames is None:
+        return
+    rows.sort(key=lambda row: -float(row['total'] or 0))
+    with open(out, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def collect(pytest_args, env):
+    """The node ids pytest selects for pytest_args."""
+    # verbosity flags change the --collect-only output
+    args = [a for a in pytest_args if a not in ('--quiet', '--verbose') and not
+            (a.startswith('-') and not a.startswith('--') and set(a[1:]) <= set('qv'))]
+    env = {k: v for k, v in env.items() if k not in (tracing.TIMING_ENV, tracing.TRACE_ENV)}
+    output = subprocess.run([sys.executable, '-m', 'pytest', '--collect-only', '-q'] + args,
+                            env=env, stdout=subprocess.PIPE, universal_newlines=True, check=False).stdout
+    return [line.strip() for line in output.splitlines() if '::' in line]
+
+def run(pytest_args, shards, report_dir, timestamp):
+    """Run pytest_args in `shards` balanced processes; return the worst exit status."""
+    env = dict(os.environ)
+    nodeids = collect(pytest_args, env)
+    if not nodeids:
+        print('no tests selected', flush=True)
+        return 5  # pytest's "no tests collected"
+    shards = max(1, min(shards, len(nodeids)))
+    parts, expected = partition(nodeids, load_durations(report_dir), shards)
+    timing = env.get(tracing.TIMING_ENV)
+
+    procs, lists, xmls, logs, timings = [], [], [], [], []
+    started = time.monotonic()
+    for i, part in enumerate(parts):
+        base = os.path.join(report_dir, 'shard{}-{}'.format(i, timestamp))
+        with open(base + '.txt', 'w') as f:
+            f.write('\n'.join(part) + '\n')
+        shard_env = dict(env, **{SHARD_ENV: str(i), SHARD_FILE_ENV: base + '.txt'})
+        if timing:
+            shard_env[tracing.TIMING_ENV] = base + '.csv'
+            timings.append(base + '.csv')
+        lists.append(base + '.txt')
+        xmls.append(base + '.xml')
+        logs.append(base + '.log')
+        print('shard {}: {} tests, ~{:.0f}s expected'.format(i, len(part), expected[i]), flush=True)
+        with open(base + '.log', 'w') as log:
+            procs.append(subprocess.Popen(
+                [sys.executable, '-m', 'pytest'] + list(pytest_args) + ['--junitxml', base + '.xml'],
+                env=shard_env, stdout=log, stderr=subprocess.STDOUT))
+
+    statuses = []
+    for i, proc in enumerate(procs):
+        statuses.append(proc.wait())
+        print('shard {}: exit status {} after {:.0f}s'.format(i, statuses[-1], time.monotonic() - started),
+              flush=True)
+
+    merge_junit(xmls, os.path.join(report_dir, 'junit-{}.xml'.format(timestamp)))
+    with open(os.path.join(report_dir, 'pytest-{}.log'.format(timestamp)), 'w') as out:
+        for i, path in enumerate(logs):
+            out.write('===== shard {} of {} =====\n'.format(i, shards))
+            with open(path) as log:
+                out.write(log.read())
+    if timing:
+        merge_timing(timings, timing)
+    for path in lists + xmls + logs + timings:
+        if os.path.exists(path):
+            os.remove(path)
+    # any failure wins over "no tests" (5) from a shard that had only deselected tests
+    failed = [s for s in statuses if s not in (0, 5)]
+    return max(failed) if failed else (0 if 0 in statuses else 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the functional tests in shards balanced by duration')
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--report-dir', default=os.path.join('s3tests', 'reports'),
+                        help='where junit-*.xml durations are read and merged reports are written')
+    parser.add_argument('--timestamp', default=time.strftime('%Y%m%d-%H%M%S'),
+                        help='suffix of the merged junit-/pytest- files')
+    parser.add_argument('pytest_args', nargs=argparse.REMAINDER, help='after --: the pytest arguments')
+    args = parser.parse_args()
+    pytest_args = args.pytest_args[1:] if args.pytest_args[:1] == ['--'] else args.pytest_args
+    os.makedirs(args.report_dir, exist_ok=True)
+    sys.exit(run(pytest_args, args.shards, args.report_dir, args.timestamp))
+
+
+if __name__ == '__main__':
+    main()
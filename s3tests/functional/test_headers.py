@@ -1,12 +1,20 @@
 import boto3
+import logging
+import time
 import pytest
 import botocore.config
 from botocore.exceptions import ClientError
+from collections import namedtuple
 from email.utils import formatdate
 
 from .utils import assert_raises
 from .utils import _get_status_and_error_code
 from .utils import _get_status
+from .utils import append_benchmark_results
+from .utils import benchmark_result
+from .utils import header_mutation
+from .utils import latency_stats
+from .utils import run_concurrent
 
 from . import (
     configfile,
@@ -15,8 +23,13 @@ from . import (
     get_v2_client,
     get_new_bucket,
     get_new_bucket_name,
+    get_config_host,
+    get_benchmark_iterations,
+    get_benchmark_results_dir,
     )
 
+log = logging.getLogger(__name__)
+
 def _add_header_create_object(headers, client=None):
     """ Create a new bucket, add an object w/header customizations
     """
@@ -26,9 +39,8 @@ def _add_header_create_object(headers, client=None):
     key_name = 'foo'
 
     # pass in custom headers before PutObject call
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.PutObject', add_headers)
-    client.put_object(Bucket=bucket_name, Key=key_name)
+    with header_mutation(client, 'PutObject', add=headers):
+        client.put_object(Bucket=bucket_name, Key=key_name)
 
     return bucket_name, key_name
 
@@ -42,9 +54,8 @@ def _add_header_create_bad_object(headers, client=None):
     key_name = 'foo'
 
     # pass in custom headers before PutObject call
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.PutObject', add_headers)
-    e = assert_raises(ClientError, client.put_object, Bucket=bucket_name, Key=key_name, Body='bar')
+    with header_mutation(client, 'PutObject', add=headers):
+        e = assert_raises(ClientError, client.put_object, Bucket=bucket_name, Key=key_name, Body='bar')
 
     return e
 
@@ -58,12 +69,8 @@ def _remove_header_create_object(remove, client=None):
     key_name = 'foo'
 
     # remove custom headers before PutObject call
-    def remove_header(**kwargs):
-        if (remove in kwargs['params']['headers']):
-            del kwargs['params']['headers'][remove]
-
-    client.meta.events.register('before-call.s3.PutObject', remove_header)
-    client.put_object(Bucket=bucket_name, Key=key_name)
+    with header_mutation(client, 'PutObject', remove=remove):
+        client.put_object(Bucket=bucket_name, Key=key_name)
 
     return bucket_name, key_name
 
@@ -76,12 +83,8 @@ def _remove_header_create_bad_object(remove, client=None):
     key_name = 'foo'
 
     # remove custom headers before PutObject call
-    def remove_header(**kwargs):
-        if (remove in kwargs['params']['headers']):
-            del kwargs['params']['headers'][remove]
-
-    client.meta.events.register('before-call.s3.PutObject', remove_header)
-    e = assert_raises(ClientError, client.put_object, Bucket=bucket_name, Key=key_name, Body='bar')
+    with header_mutation(client, 'PutObject', remove=remove):
+        e = assert_raises(ClientError, client.put_object, Bucket=bucket_name, Key=key_name, Body='bar')
 
     return e
 
@@ -93,10 +96,9 @@ def _add_header_create_bucket(headers, client=None):
     if client == None:
         client = get_client()
 
-    # pass in custom headers before PutObject call
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.CreateBucket', add_headers)
-    client.create_bucket(Bucket=bucket_name)
+    # pass in custom headers before CreateBucket call
+    with header_mutation(client, 'CreateBucket', add=headers):
+        client.create_bucket(Bucket=bucket_name)
 
     return bucket_name
 
@@ -108,10 +110,9 @@ def _add_header_create_bad_bucket(headers=None, client=None):
     if client == None:
         client = get_client()
 
-    # pass in custom headers before PutObject call
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.CreateBucket', add_headers)
-    e = assert_raises(ClientError, client.create_bucket, Bucket=bucket_name)
+    # pass in custom headers before CreateBucket call
+    with header_mutation(client, 'CreateBucket', add=headers):
+        e = assert_raises(ClientError, client.create_bucket, Bucket=bucket_name)
 
     return e
 
@@ -123,13 +124,9 @@ def _remove_header_create_bucket(remove, client=None):
     if client == None:
         client = get_client()
 
-    # remove custom headers before PutObject call
-    def remove_header(**kwargs):
-        if (remove in kwargs['params']['headers']):
-            del kwargs['params']['headers'][remove]
-
-    client.meta.events.register('before-call.s3.CreateBucket', remove_header)
-    client.create_bucket(Bucket=bucket_name)
+    # remove custom headers before CreateBucket call
+    with header_mutation(client, 'CreateBucket', remove=remove):
+        client.create_bucket(Bucket=bucket_name)
 
     return bucket_name
 
@@ -140,40 +137,90 @@ def _remove_header_create_bad_bucket(remove, client=None):
     if client == None:
         client = get_client()
 
-    # remove custom headers before PutObject call
-    def remove_header(**kwargs):
-        if (remove in kwargs['params']['headers']):
-            del kwargs['params']['headers'][remove]
-
-    client.meta.events.register('before-call.s3.CreateBucket', remove_header)
-    e = assert_raises(ClientError, client.create_bucket, Bucket=bucket_name)
+    # remove custom headers before CreateBucket call
+    with header_mutation(client, 'CreateBucket', remove=remove):
+        e = assert_raises(ClientError, client.create_bucket, Bucket=bucket_name)
 
     return e
 
+# One case of a header table: the PutObject (of `body` into the table's bucket) or
+# CreateBucket (of a new bucket) request to send with headers added and/or removed,
+# and the expected status and error code (None: any, or none on success).
+HeaderCase = namedtuple('HeaderCase', ['name', 'operation', 'add', 'remove', 'body', 'status', 'error_code'],
+                        defaults=(None, (), '', 200, None))
+
+def _run_header_case(client, bucket_name, case):
+    with header_mutation(client, case.operation, add=case.add, remove=case.remove):
+        try:
+            if case.operation == 'PutObject':
+                response = client.put_object(Bucket=bucket_name, Key=case.name, Body=case.body)
+            else:
+                response = client.create_bucket(Bucket=get_new_bucket_name())
+        except ClientError as e:
+            return _get_status_and_error_code(e.response)
+    return _get_status(response), None
+
+def _header_cases_client(cases):
+    # one pooled connection per case, so the cases run concurrently instead of
+    # queueing for botocore's default pool of 10
+    return get_client(botocore.config.Config(signature_version='s3v4', max_pool_connections=len(cases)))
+
+def _run_header_cases(cases, client=None, max_workers=None):
+    """
+    Send every case of a header table concurrently, objects into one bucket and from
+    one client; return {case name: (status, error code, latency in seconds)} and the
+    wall-clock seconds the whole table took.
+    """
+    if client == None:
+        client = _header_cases_client(cases)
+    bucket_name = get_new_bucket(client)
+    start = time.perf_counter()
+    calls = run_concurrent(_run_header_case, [(client, bucket_name, case) for case in cases],
+                           max_workers=max_workers, sync_start=False)
+    calls.values()  # re-raises anything other than the ClientError a case expects
+    seconds = time.perf_counter() - start
+    outcomes = {}
+    for case, result in zip(cases, calls.results):
+        status, error_code = result.value
+        outcomes[case.name] = (status, error_code, result.latency)
+    return outcomes, seconds
+
+def _header_case_mismatch(case, status, error_code):
+    if status != case.status or (case.error_code is not None and error_code != case.error_code):
+        return '{}: got {} {}, expected {} {}'.format(case.name, status, error_code, case.status, case.error_code)
+    return None
+
 #
 # common tests
 #
 
-@pytest.mark.auth_common
-def test_object_create_bad_md5_invalid_short():
-    e = _add_header_create_bad_object({'Content-MD5':'YWJyYWNhZGFicmE='})
-    status, error_code = _get_status_and_error_code(e.response)
-    assert status == 400
-    assert error_code == 'InvalidDigest'
+# The header cases that behave the same on every backend (no fails_on_* or
+# skip_for_splunk marker). They are sent in one batch, from one client into one
+# bucket, and each case is checked as its own test; the cases that need a marker
+# are the individual tests below.
+HEADER_CASES = [
+    HeaderCase('md5_invalid_short', 'PutObject', add={'Content-MD5': 'YWJyYWNhZGFicmE='}, body='bar',
+               status=400, error_code='InvalidDigest'),
+    HeaderCase('md5_bad', 'PutObject', add={'Content-MD5': 'rL0Y20xC+Fzt72VPzMSk2A=='}, body='bar',
+               status=400, error_code='BadDigest'),
+    HeaderCase('md5_empty', 'PutObject', add={'Content-MD5': ''}, body='bar',
+               status=400, error_code='InvalidDigest'),
+    HeaderCase('expect_mismatch', 'PutObject', add={'Expect': 200}),
+    HeaderCase('contenttype_invalid', 'PutObject', add={'Content-Type': 'text/plain'}),
+    HeaderCase('bucket_expect_mismatch', 'CreateBucket', add={'Expect': 200}),
+]
+
+@pytest.fixture(scope='module')
+def header_case_outcomes(configfile):
+    outcomes, _ = _run_header_cases(HEADER_CASES)
+    return outcomes
 
 @pytest.mark.auth_common
-def test_object_create_bad_md5_bad():
-    e = _add_header_create_bad_object({'Content-MD5':'rL0Y20xC+Fzt72VPzMSk2A=='})
-    status, error_code = _get_status_and_error_code(e.response)
-    assert status == 400
-    assert error_code == 'BadDigest'
-
-@pytest.mark.auth_common
-def test_object_create_bad_md5_empty():
-    e = _add_header_create_bad_object({'Content-MD5':''})
-    status, error_code = _get_status_and_error_code(e.response)
-    assert status == 400
-    assert error_code == 'InvalidDigest'
+@pytest.mark.parametrize('case', HEADER_CASES, ids=[case.name for case in HEADER_CASES])
+def test_header_case(header_case_outcomes, case):
+    status, error_code, _ = header_case_outcomes[case.name]
+    mismatch = _header_case_mismatch(case, status, error_code)
+    assert mismatch is None, mismatch
 
 @pytest.mark.auth_common
 @pytest.mark.skip_for_splunk
@@ -182,12 +229,6 @@ def test_object_create_bad_md5_none():
     client = get_client()
     client.put_object(Bucket=bucket_name, Key=key_name, Body='bar')
 
-@pytest.mark.auth_common
-def test_object_create_bad_expect_mismatch():
-    bucket_name, key_name = _add_header_create_object({'Expect': 200})
-    client = get_client()
-    client.put_object(Bucket=bucket_name, Key=key_name, Body='bar')
-
 @pytest.mark.auth_common
 @pytest.mark.skip_for_splunk
 def test_object_create_bad_expect_empty():
@@ -233,12 +274,6 @@ def test_object_create_bad_contentlength_none():
     assert status == 411
     assert error_code == 'MissingContentLength'
 
-@pytest.mark.auth_common
-def test_object_create_bad_contenttype_invalid():
-    bucket_name, key_name = _add_header_create_object({'Content-Type': 'text/plain'})
-    client = get_client()
-    client.put_object(Bucket=bucket_name, Key=key_name, Body='bar')
-
 @pytest.mark.auth_common
 def test_object_create_bad_contenttype_empty():
     client = get_client()
@@ -305,13 +340,8 @@ def test_object_acl_create_contentlength_none():
     client = get_client()
     client.put_object(Bucket=bucket_name, Key='foo', Body='bar')
 
-    remove = 'Content-Length'
-    def remove_header(**kwargs):
-        if (remove in kwargs['params']['headers']):
-            del kwargs['params']['headers'][remove]
-
-    client.meta.events.register('before-call.s3.PutObjectAcl', remove_header)
-    client.put_object_acl(Bucket=bucket_name, Key='foo', ACL='public-read')
+    with header_mutation(client, 'PutObjectAcl', remove='Content-Length'):
+        client.put_object_acl(Bucket=bucket_name, Key='foo', ACL='public-read')
 
 @pytest.mark.auth_common
 @pytest.mark.skip_for_splunk
@@ -320,23 +350,11 @@ def test_bucket_put_bad_canned_acl():
     client = get_client()
 
     headers = {'x-amz-acl': 'public-ready'}
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.PutBucketAcl', add_headers)
-
-    e = assert_raises(ClientError, client.put_bucket_acl, Bucket=bucket_name, ACL='public-read')
+    with header_mutation(client, 'PutBucketAcl', add=headers):
+        e = assert_raises(ClientError, client.put_bucket_acl, Bucket=bucket_name, ACL='public-read')
     status = _get_status(e.response)
     assert status == 400
 
-@pytest.mark.auth_common
-def test_bucket_create_bad_expect_mismatch():
-    bucket_name = get_new_bucket_name()
-    client = get_client()
-
-    headers = {'Expect': 200}
-    add_headers = (lambda **kwargs: kwargs['params']['headers'].update(headers))
-    client.meta.events.register('before-call.s3.CreateBucket', add_headers)
-    client.create_bucket(Bucket=bucket_name)
-
 @pytest.mark.auth_common
 @pytest.mark.skip_for_splunk
 def test_bucket_create_bad_expect_empty():
@@ -585,3 +603,31 @@ def test_bucket_create_bad_date_before_epoch_aws2():
     status, error_code = _get_status_and_error_code(e.response)
     assert status == 403
     assert error_code == 'AccessDenied'
+
+@pytest.mark.auth_common
+@pytest.mark.benchmark
+def test_benchmark_header_parsing():
+    # every case is a request the store has to parse and (mostly) reject, so the
+    # latency of the batch is mostly request-parsing and signature-checking overhead
+    client = _header_cases_client(HEADER_CASES)
+    workers = len(HEADER_CASES)
+    results = []
+    for iteration in range(1, get_benchmark_iterations() + 1):
+        outcomes, seconds = _run_header_cases(HEADER_CASES, client, max_workers=workers)
+        mismatches = [_header_case_mismatch(case, *outcomes[case.name][:2]) for case in HEADER_CASES]
+        assert not any(mismatches), '\n'.join(m for m in mismatches if m)
+        for name, (status, error_code, latency) in sorted(outcomes.items(), key=lambda item: -item[1][2]):
+            log.info('header case %s: %s %s in %.1fms', name, status, error_code or '', latency * 1000)
+        latencies = [latency for _, _, latency in outcomes.values()]
+        stats = latency_stats(latencies)
+        # the cases run concurrently: throughput is over the batch's wall time
+        results.append(benchmark_result(
+            get_config_host(), "header-cases", "0", iteration, seconds, 0, concurrency=workers,
+            cases=len(HEADER_CASES), total_operations=stats['count'], ops_per_sec=stats['count'] / seconds,
+            avg_latency_ms=sum(latencies) / stats['count'] * 1000, p50_latency_ms=stats['p50'] * 1000,
+            p90_latency_ms=stats['p90'] * 1000, p99_latency_ms=stats['p99'] * 1000,
+            case_latency_ms={name: outcome[2] * 1000 for name, outcome in outcomes.items()}))
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "headers", results)
+        log.info('Header benchmark results appended to %s', path)
@@ -27,6 +27,7 @@ from . import (
 )
 from .utils import _get_status, _get_status_and_error_code
 from .iam import iam_root, iam_alt_root
+from .retry import retry_on
 
 
 @pytest.mark.user_policy
@@ -1243,19 +1244,6 @@ def test_account_user_access_key_list(iam_root):
     assert keys == sorted(user_list_key_ids(iam_root, UserName=name))
     assert keys == sorted(user_list_key_ids(iam_root, UserName=name, PaginationConfig={'PageSize': 1}))
 
-def retry_on(code, tries, func, *args, **kwargs):
-    for i in range(tries):
-        try:
-            return func(*args, **kwargs)
-        except ClientError as e:
-            err = e.response['Error']['Code']
-            if i + 1 < tries and err in code:
-                print(f'Got {err}, retrying in {i}s..')
-                time.sleep(i)
-                continue
-            raise
-
-
 @pytest.mark.iam_account
 @pytest.mark.iam_user
 def test_account_user_bucket_policy_allow(iam_root):
@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+from . import iam
+
+class _FakeIamClient:
+    """IAM principals in memory; deleting one that still has dependents is a DeleteConflict."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = {'u1': {'keys': {'k1', 'k2'}, 'policies': {'p'}, 'attached': {'arn:a'}},
+                      'u2': {'keys': set(), 'policies': set(), 'attached': set()}}
+        self.groups = {'g1': {'members': {'u1', 'u2'}, 'policies': {'gp'}, 'attached': set()}}
+        self.roles = {'r1': {'policies': {'rp'}, 'attached': {'arn:b'}},
+                      'stuck': {'policies': set(), 'attached': set()}}
+        self.oidc = ['arn:aws:iam::1:oidc-provider/t/a', 'arn:aws:iam::1:oidc-provider/other/b']
+        self.calls = []
+
+    def _error(self, code, op):
+        return ClientError({'Error': {'Code': code, 'Message': code}}, op)
+
+    def get_paginator(self, op):
+        client = self
+        class Paginator:
+            def paginate(self, **kwargs):
+                yield getattr(client, '_' + op)(**kwargs)
+        return Paginator()
+
+    def _list_users(self, PathPrefix):
+        return {'Users': [{'UserName': u} for u in self.users]}
+    def _list_groups(self, PathPrefix):
+        return {'Groups': [{'GroupName': g} for g in self.groups]}
+    def _list_roles(self, PathPrefix):
+        return {'Roles': [{'RoleName': r} for r in self.roles]}
+    def _list_access_keys(self, UserName):
+        return {'AccessKeyMetadata': [{'AccessKeyId': k} for k in self.users[UserName]['keys']]}
+    def _list_user_policies(self, UserName):
+        return {'PolicyNames': list(self.users[UserName]['policies'])}
+    def _list_attached_user_policies(self, UserName):
+        return {'AttachedPolicies': [{'PolicyArn': a} for a in self.users[UserName]['attached']]}
+    def _get_group(self, GroupName):
+        return {'Users': [{'UserName': u} for u in self.groups[GroupName]['members']]}
+    def _list_group_policies(self, GroupName):
+        return {'PolicyNames': list(self.groups[GroupName]['policies'])}
+    def _list_attached_group_policies(self, GroupName):
+        return {'AttachedPolicies': [{'PolicyArn': a} for a in self.groups[GroupName]['attached']]}
+    def _list_role_policies(self, RoleName):
+        return {'PolicyNames': list(self.roles[RoleName]['policies'])}
+    def _list_attached_role_policies(self, RoleName):
+        return {'AttachedPolicies': [{'PolicyArn': a} for a in self.roles[RoleName]['attached']]}
+    def list_open_id_connect_providers(self):
+        return {'OpenIDConnectProviderList': [{'Arn': a} for a in self.oidc]}
+
+    def _remove(self, op, collection, name, field=None, value=None):
+        with self.lock:
+            self.calls.append(op)
+            if name not in collection:
+                raise self._error('NoSuchEntity', op)
+            if field is not None:
+                collection[name][field].remove(value)
+            elif any(collection[name].values()) or (
+                    collection is self.users and any(name in g['members'] for g in self.groups.values())):
+                raise self._error('DeleteConflict', op)
+            else:
+                del collection[name]
+
+    def delete_access_key(self, UserName, AccessKeyId):
+        self._remove('DeleteAccessKey', self.users, UserName, 'keys', AccessKeyId)
+    def delete_user_policy(self, UserName, PolicyName):
+        self._remove('DeleteUserPolicy', self.users, UserName, 'policies', PolicyName)
+    def detach_user_policy(self, UserName, PolicyArn):
+        self._remove('DetachUserPolicy', self.users, UserName, 'attached', PolicyArn)
+    def remove_user_from_group(self, GroupName, UserName):
+        self._remove('RemoveUserFromGroup', self.groups, GroupName, 'members', UserName)
+    def delete_group_policy(self, GroupName, PolicyName):
+        self._remove('DeleteGroupPolicy', self.groups, GroupName, 'policies', PolicyName)
+    def delete_role_policy(self, RoleName, PolicyName):
+        self._remove('DeleteRolePolicy', self.roles, RoleName, 'policies', PolicyName)
+    def detach_role_policy(self, RoleName, PolicyArn):
+        self._remove('DetachRolePolicy', self.roles, RoleName, 'attached', PolicyArn)
+    def delete_user(self, UserName):
+        self._remove('DeleteUser', self.users, UserName)
+    def delete_group(self, GroupName):
+        self._remove('DeleteGroup', self.groups, GroupName)
+    def delete_role(self, RoleName):
+        if RoleName == 'stuck':
+            raise self._error('AccessDenied', 'DeleteRole')
+        self._remove('DeleteRole', self.roles, RoleName)
+    def delete_open_id_connect_provider(self, OpenIDConnectProviderArn):
+        with self.lock:
+            self.oidc.remove(OpenIDConnectProviderArn)
+
+def test_iam_cleanup_orders_dependents_and_reports_failures():
+    client = _FakeIamClient()
+    cleanup = iam.IamCleanup(client, '/t/', max_workers=4).discover()
+    assert cleanup.after['user u1'] == {'user u1 key k1', 'user u1 key k2', 'user u1 policy p',
+                                        'user u1 attached arn:a', 'group g1 member u1'}
+    failures = cleanup.run()
+
+    # everything went in one pass, without a single DeleteConflict
+    assert client.users == {} and client.groups == {} and list(client.roles) == ['stuck']
+    assert client.oidc == ['arn:aws:iam::1:oidc-provider/other/b']
+    assert [(name, e.response['Error']['Code']) for name, e in failures] == [('role stuck', 'AccessDenied')]
+    assert client.calls.index('DeleteUser') > client.calls.index('RemoveUserFromGroup')
+
+    with pytest.raises(RuntimeError, match='role stuck'):
+        iam.nuke_iam(client, '/t/')
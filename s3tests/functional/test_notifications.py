@@ -0,0 +1,34 @@
+import json
+import urllib.request
+
+from . import notifications
+
+def _post_records(endpoint, *records):
+    body = json.dumps({'Records': [{'eventName': name, 's3': {'bucket': {'name': bucket}, 'object': {'key': key}}}
+                                   for bucket, key, name in records]}).encode()
+    urllib.request.urlopen(urllib.request.Request(endpoint, data=body, method='POST')).read()
+
+def test_notification_delivery_tracking():
+    with notifications.NotificationReceiver() as receiver:
+        tracker = notifications.DeliveryTracker(receiver, prefix='step/')
+        start = tracker.clock()
+        for key in ('step/a', 'step/b', 'step/c'):
+            tracker.sent_event('bkt', key, 'ObjectCreated', start)
+        tracker.sent_event('bkt', 'step/a', 'ObjectRemoved', start)
+
+        _post_records(receiver.endpoint, ('bkt', 'step/a', 'ObjectCreated:Put'), ('bkt', 'step/b', 's3:ObjectCreated:Copy'))
+        _post_records(receiver.endpoint, ('bkt', 'step/a', 'ObjectCreated:Put'),      # delivered twice
+                      ('bkt', 'step%2Fd', 'ObjectCreated:Put'),                        # never sent
+                      ('bkt', 'other/a', 'ObjectRemoved:Delete'))                      # another tracker's
+        assert not tracker.wait(0.2)
+        _post_records(receiver.endpoint, ('bkt', 'step/a', 'ObjectRemoved:Delete'))
+        assert receiver.malformed == 0 and receiver.requests == 3
+
+        stats = tracker.stats()
+        assert (stats['sent'], stats['delivered'], stats['lost']) == (4, 3, 1)
+        assert (stats['duplicates'], stats['unexpected']) == (1, 1)
+        assert stats['latency']['count'] == 3 and stats['mean_latency'] > 0
+
+        _post_records(receiver.endpoint, ('bkt', 'step/c', 'ObjectCreated:Post'))
+        assert tracker.wait(5)
+        assert tracker.stats()['lost'] == 0
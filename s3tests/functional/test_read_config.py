@@ -0,0 +1,29 @@
+import pytest
+
+from .. import conf
+from . import read_config
+
+def test_read_config_parses_once_per_change(tmp_path, monkeypatch):
+    path = tmp_path / 's3tests.conf'
+    path.write_text('[DEFAULT]\nhost = localhost\n')
+    monkeypatch.setenv('S3TEST_CONF', str(path))
+    cfg = read_config()
+    assert read_config() is cfg and cfg.defaults()['host'] == 'localhost'
+
+    path.write_text('[DEFAULT]\nhost = s3.example.com\n')
+    changed = read_config()
+    assert changed is not cfg and changed.defaults()['host'] == 's3.example.com'
+
+    monkeypatch.delenv('S3TEST_CONF')
+    with pytest.raises(RuntimeError):
+        read_config()
+
+def test_conf_endpoint_defaults(tmp_path):
+    path = tmp_path / 's3tests.conf'
+    path.write_text('[DEFAULT]\nhost = s3.example.com\nis_secure = yes\n[s3 main]\naccess_key = a\nsecret_key = s\n')
+    cfg = conf.load(str(path))
+    assert conf.endpoint(cfg) == ('s3.example.com', 443, True, 'https://s3.example.com:443')
+    assert conf.credentials(cfg, 's3 main') == ('a', 's')
+
+    path.write_text('[DEFAULT]\nhost = localhost\nport = 8000\n')
+    assert conf.endpoint(conf.load(str(path))).url == 'http://localhost:8000'
@@ -0,0 +1,93 @@
+import random
+import time
+
+import botocore.config
+import pytest
+from botocore.exceptions import ClientError
+
+from . import retry
+
+def _client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'Op')
+
+def test_retry_policy(monkeypatch):
+    slept = []
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    waits = []
+    monkeypatch.setattr(retry, 'on_retry', [lambda code, delay: waits.append(code)])
+    policy = retry.RetryPolicy(attempts=4, base_delay=1, max_delay=3, deadline=100,
+                               rng=random.Random(1), clock=lambda: 0)
+
+    outcomes = iter([_client_error('AccessDenied'), _client_error('InvalidClientTokenId'), 'ok'])
+    def flaky():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    assert policy.call(('AccessDenied', 'InvalidClientTokenId'), flaky) == 'ok'
+    assert waits == ['AccessDenied', 'InvalidClientTokenId']
+    # full jitter under the exponential cap
+    assert 0 <= slept[0] <= 1 and 0 <= slept[1] <= 2
+
+    calls = []
+    def denied():
+        calls.append(1)
+        raise _client_error('AccessDenied')
+    with pytest.raises(ClientError):
+        policy.call('AccessDenied', denied)
+    assert len(calls) == 4
+    calls.clear()
+    with pytest.raises(ClientError):
+        policy.call({'AccessDenied': 2}, denied)
+    assert len(calls) == 2
+    calls.clear()
+    with pytest.raises(ClientError):
+        policy.call('NoSuchKey', denied)
+    assert len(calls) == 1
+    # the attempt limit is shared by all the codes, not granted to each
+    codes = iter(['AccessDenied', 'InvalidClientTokenId'] * 4)
+    def alternating():
+        calls.append(1)
+        raise _client_error(next(codes))
+    calls.clear()
+    with pytest.raises(ClientError):
+        policy.call(('AccessDenied', 'InvalidClientTokenId'), alternating)
+    assert len(calls) == 4
+
+    # no wait is started that would end past the deadline
+    now = [0.0]
+    def advance(seconds):
+        now[0] += seconds
+    monkeypatch.setattr(time, 'sleep', advance)
+    late = retry.RetryPolicy(attempts=100, base_delay=1, max_delay=2, deadline=5,
+                             rng=random.Random(2), clock=lambda: now[0])
+    calls.clear()
+    with pytest.raises(ClientError):
+        late.call('AccessDenied', denied)
+    assert now[0] <= 5 and 2 < len(calls) < 100
+
+    statuses = iter([None, 'Suspended', 'Enabled', 'Enabled'])
+    assert policy.poll(lambda: next(statuses), lambda s: s == 'Enabled') == 'Enabled'
+    assert policy.poll(lambda: None, lambda s: s == 'Enabled') is None
+
+    # retry_on() waits for IAM/STS propagation about as long as the linear 0..8s sleeps
+    # (36s over 10 calls) it replaced
+    slept = []
+    monkeypatch.setattr(time, 'sleep', slept.append)
+    for _ in range(200):
+        calls.clear()
+        with pytest.raises(ClientError):
+            retry.retry_on('AccessDenied', 10, denied)
+        assert len(calls) == 10
+    assert sum(slept) / 200 > 35 and max(slept) <= retry.RETRY_ON_MAX_DELAY
+
+def test_botocore_config_retries():
+    assert retry.botocore_config(None) is None
+    own = botocore.config.Config(signature_version='s3v4')
+    assert retry.botocore_config(None, own) is own
+    merged = retry.botocore_config({'mode': 'standard', 'total_max_attempts': 3}, own)
+    assert merged.retries == {'mode': 'standard', 'total_max_attempts': 3}
+    assert merged.signature_version == 's3v4'
+    # a client's own retries settings win
+    own = botocore.config.Config(retries={'max_attempts': 0})
+    assert retry.botocore_config({'mode': 'standard'}, own).retries == {'max_attempts': 0}
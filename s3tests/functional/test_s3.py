@@ -19,6 +19,7 @@ import hashlib
 import xml.etree.ElementTree as ET
 import time
 import operator
+import itertools
 import pytest
 import os
 import string
@@ -35,10 +36,18 @@ from .utils import assert_raises
 from .utils import generate_random
 from .utils import _get_status_and_error_code
 from .utils import _get_status
+from .utils import expected_listing
+from .utils import run_concurrent
+from .utils import smartstore_keys
+from .utils import walk_listing
+from .utils import start_concurrent
+from .utils import benchmark_result
+from .utils import append_benchmark_results
 
 from .policy import Policy, Statement, make_json_policy
 
 from .iam import iam_root
+from .retry import RetryPolicy
 
 from . import (
     configfile,
@@ -51,6 +60,14 @@ from . import (
     get_new_bucket,
     get_new_bucket_name,
     get_new_bucket_resource,
+    get_benchmark_listing_keys,
+    get_benchmark_workers,
+    get_benchmark_iterations,
+    get_benchmark_results_dir,
+    get_benchmark_logging_objects,
+    get_benchmark_logging_concurrency,
+    get_benchmark_version_depths,
+    get_benchmark_versioned_keys,
     get_config_is_secure,
     get_config_host,
     get_config_port,
@@ -133,6 +150,27 @@ def _create_objects(bucket=None, bucket_name=None, keys=[], put_object_args={}):
 
     return bucket_name
 
+def _put_objects(client, bucket_name, keys, body):
+    for key in keys:
+        client.put_object(Bucket=bucket_name, Key=key, Body=key if body is None else body)
+
+def _create_objects_bulk(bucket_name=None, keys=(), workers=32, batch_size=100, body=None):
+    """
+    Populate a (specified or new) bucket with many objects (thousands to millions),
+    uploaded concurrently in batches through one client whose connection pool has a
+    connection per worker. Contents are the key names unless body is given.
+    """
+    if bucket_name is None:
+        bucket_name = get_new_bucket()
+    client = get_client(botocore.config.Config(signature_version='s3v4', max_pool_connections=workers))
+
+    keys = iter(keys)
+    batches = iter(lambda: list(itertools.islice(keys, batch_size)), [])
+    calls = run_concurrent(_put_objects, [(client, bucket_name, batch, body) for batch in batches],
+                           max_workers=workers, sync_start=False)
+    calls.values()
+    return bucket_name
+
 def _get_keys(response):
     """
     return lists of strings that are the keys from a client.list_objects() response
@@ -188,6 +226,76 @@ def test_bucket_listv2_many():
     assert response['IsTruncated'] == False
     assert keys == ['foo']
 
+@pytest.mark.list_objects_v2
+def test_bucket_listv2_smartstore_layout_paginated():
+    keys = list(smartstore_keys(250))
+    bucket_name = _create_objects_bulk(keys=keys)
+    client = get_client()
+
+    listed = []
+    page_sizes = []
+    params = dict(Bucket=bucket_name, MaxKeys=100)
+    while True:
+        response = client.list_objects_v2(**params)
+        page_keys = _get_keys(response)
+        assert response['KeyCount'] == len(page_keys)
+        listed.extend(page_keys)
+        page_sizes.append(len(page_keys))
+        if not response['IsTruncated']:
+            break
+        params['ContinuationToken'] = response['NextContinuationToken']
+    assert page_sizes == [100, 100, 50]
+    assert listed == sorted(keys)
+
+    # hash directories under one index come back as common prefixes
+    prefix = 'main/db/'
+    expected = sorted({'/'.join(k.split('/')[:3]) + '/' for k in keys if k.startswith(prefix)})
+    response = client.list_objects_v2(Bucket=bucket_name, Prefix=prefix, Delimiter='/')
+    assert _get_keys(response) == []
+    assert _get_prefixes(response) == expected
+
+def _listing_walks(keys):
+    """
+    (prefix, delimiter) pairs at increasing depth of a SmartStore key hierarchy.
+    """
+    index, db, h1, h2 = keys[0].split('/')[:4]
+    walks = []
+    for prefix in ('', index + '/', '%s/%s/' % (index, db), '%s/%s/%s/%s/' % (index, db, h1, h2)):
+        walks.append((prefix, ''))
+        walks.append((prefix, '/'))
+    return walks
+
+def _benchmark_listing(bucket_name, keys, versions):
+    client = get_client()
+    sorted_keys = sorted(keys)
+    api = 'ListObjectVersions' if versions else 'ListObjectsV2'
+    for max_keys in (100, 1000):
+        for prefix, delimiter in _listing_walks(keys):
+            stats = walk_listing(client, bucket_name, prefix=prefix, delimiter=delimiter, max_keys=max_keys,
+                                 versions=versions,
+                                 expected=expected_listing(sorted_keys, prefix, delimiter))
+            logger.info('%s max_keys=%d prefix=%r delimiter=%r: %d pages, %d keys, %d prefixes, '
+                        '%.0f entries/s, page latency p50 %.1fms p99 %.1fms max %.1fms',
+                        api, max_keys, prefix, delimiter, stats['pages'], stats['keys'], stats['prefixes'],
+                        stats['keys_per_sec'], stats['page_p50'] * 1000, stats['page_p99'] * 1000,
+                        stats['page_max'] * 1000)
+
+@pytest.mark.benchmark
+@pytest.mark.list_objects_v2
+def test_benchmark_listv2_smartstore_hierarchy():
+    keys = list(smartstore_keys(get_benchmark_listing_keys()))
+    bucket_name = _create_objects_bulk(keys=keys, workers=get_benchmark_workers())
+    _benchmark_listing(bucket_name, keys, versions=False)
+
+@pytest.mark.benchmark
+@pytest.mark.versioning
+def test_benchmark_list_versions_smartstore_hierarchy():
+    bucket_name = get_new_bucket()
+    check_configure_versioning_retry(bucket_name, "Enabled", "Enabled")
+    keys = list(smartstore_keys(get_benchmark_listing_keys()))
+    _create_objects_bulk(bucket_name=bucket_name, keys=keys, workers=get_benchmark_workers())
+    _benchmark_listing(bucket_name, keys, versions=True)
+
 @pytest.mark.list_objects_v2
 def test_basic_key_count():
     client = get_client()
@@ -1540,20 +1648,11 @@ def test_bucket_delete_nonempty():
     assert status == 409
     assert error_code == 'BucketNotEmpty'
 
-def _do_set_bucket_canned_acl(client, bucket_name, canned_acl, i, results):
-    try:
-        client.put_bucket_acl(ACL=canned_acl, Bucket=bucket_name)
-        results[i] = True
-    except:
-        results[i] = False
+def _do_set_bucket_canned_acl(client, bucket_name, canned_acl):
+    client.put_bucket_acl(ACL=canned_acl, Bucket=bucket_name)
 
-def _do_set_bucket_canned_acl_concurrent(client, bucket_name, canned_acl, num, results):
-    t = []
-    for i in range(num):
-        thr = threading.Thread(target = _do_set_bucket_canned_acl, args=(client, bucket_name, canned_acl, i, results))
-        thr.start()
-        t.append(thr)
-    return t
+def _do_set_bucket_canned_acl_concurrent(client, bucket_name, canned_acl, num):
+    return start_concurrent(_do_set_bucket_canned_acl, [(client, bucket_name, canned_acl)] * num)
 
 def _do_wait_completion(t):
     for thr in t:
@@ -1562,18 +1661,15 @@ def _do_wait_completion(t):
 @pytest.mark.skip_for_splunk
 def test_bucket_concurrent_set_canned_acl():
     bucket_name = get_new_bucket()
-    client = get_client()
 
     num_threads = 50 # boto2 retry defaults to 5 so we need a thread to fail at least 5 times
                      # this seems like a large enough number to get through retry (if bug
                      # exists)
-    results = [None] * num_threads
-
-    t = _do_set_bucket_canned_acl_concurrent(client, bucket_name, 'public-read', num_threads, results)
-    _do_wait_completion(t)
-
-    for r in results:
-        assert r == True
+    # a connection per thread, so the requests really run at once
+    client = get_client(botocore.config.Config(signature_version='s3v4', max_pool_connections=num_threads))
+    calls = _do_set_bucket_canned_acl_concurrent(client, bucket_name, 'public-read', num_threads)
+    calls.values()
+    calls.log_latency('concurrent put_bucket_acl')
 
 def test_object_write_to_nonexist_bucket():
     key_names = ['foo']
@@ -1669,19 +1765,14 @@ def test_versioning_concurrent_multi_object_delete():
     versions = client.list_object_versions(Bucket=bucket_name)['Versions']
     assert len(versions) == total_num_objects_in_the_bucket
     objs_dict = {'Objects': [dict((k, v[k]) for k in ["Key", "VersionId"]) for v in versions]}
-    results = [None] * num_threads
 
-    def do_request(n):
-        results[n] = client.delete_objects(Bucket=bucket_name, Delete=objs_dict)
+    def do_request():
+        return client.delete_objects(Bucket=bucket_name, Delete=objs_dict)
 
-    t = []
-    for i in range(num_threads):
-        thr = threading.Thread(target = do_request, args=[i])
-        thr.start()
-        t.append(thr)
-    _do_wait_completion(t)
+    calls = run_concurrent(do_request, [()] * num_threads)
+    calls.log_latency('concurrent delete_objects')
 
-    for response in results:
+    for response in calls.values():
         assert len(response['Deleted']) == total_num_objects_in_the_bucket
         assert 'Errors' not in response
 
@@ -6243,19 +6334,9 @@ def check_configure_versioning_retry(bucket_name, status, expected_string):
     client = get_client()
     client.put_bucket_versioning(Bucket=bucket_name, VersioningConfiguration={'Status': status})
 
-    read_status = None
-
-    for i in range(5):
-        try:
-            response = client.get_bucket_versioning(Bucket=bucket_name)
-            read_status = response['Status']
-        except KeyError:
-            read_status = None
-
-        if (expected_string == read_status):
-            break
-
-        time.sleep(1)
+    read_status = RetryPolicy(attempts=8, deadline=5).poll(
+        lambda: client.get_bucket_versioning(Bucket=bucket_name).get('Status'),
+        lambda status: status == expected_string, label='versioning status')
 
     assert expected_string == read_status
 
@@ -8007,6 +8088,121 @@ def test_versioning_obj_create_versions_remove_special_names():
         assert len(version_ids) == 0
         assert len(version_ids) == len(contents)
 
+# version-specific GETs sampled per depth, and versions per DeleteObjects request
+VERSIONING_BENCHMARK_GETS = 200
+VERSIONING_BENCHMARK_DELETE_BATCH = 1000
+
+def _create_versions_bulk(client, bucket_name, keys, depth, workers):
+    """
+    Put `depth` versions of every key with create_multiple_versions(), splitting each
+    key's versions over the workers as well, so that a few deep keys still build in
+    parallel. Return ([(key, version id, body)], the ConcurrentCalls).
+    """
+    per_call = max(1, min(depth, -(-depth * len(keys) // workers)))
+    calls = [(client, bucket_name, key, min(per_call, depth - start))
+             for key in keys for start in range(0, depth, per_call)]
+    done = run_concurrent(create_multiple_versions, calls, max_workers=workers, sync_start=False)
+    versions = []
+    for call, (version_ids, contents) in zip(calls, done.values()):
+        versions.extend((call[2], version_id, body) for version_id, body in zip(version_ids, contents))
+    return versions, done
+
+def _get_version(client, bucket_name, key, version_id, body):
+    response = client.get_object(Bucket=bucket_name, Key=key, VersionId=version_id)
+    assert _get_body(response) == body
+    return len(body)
+
+def _delete_versions(client, bucket_name, versions):
+    objects = [{'Key': key, 'VersionId': version_id} for key, version_id, _ in versions]
+    response = client.delete_objects(Bucket=bucket_name, Delete={'Objects': objects, 'Quiet': True})
+    assert not response.get('Errors'), response['Errors'][:5]
+
+@pytest.mark.benchmark
+@pytest.mark.versioning
+def test_benchmark_versioning_depth():
+    workers = get_benchmark_workers()
+    client = get_client(botocore.config.Config(signature_version='s3v4', max_pool_connections=workers))
+    keys = ['versioned/key-{}'.format(j) for j in range(get_benchmark_versioned_keys())]
+    rand = random.Random(0)
+    results = []
+    for depth in get_benchmark_version_depths():
+        total = depth * len(keys)
+        # the depth is part of the operation so that report.py keeps the steps apart
+        operations = {name: 'versions-{}-depth{}'.format(name, depth)
+                      for name in ('put', 'list', 'listv2', 'get', 'delete')}
+        step = dict(concurrency=workers, version_depth=depth, versioned_keys=len(keys))
+        for iteration in range(1, get_benchmark_iterations() + 1):
+            bucket_name = get_new_bucket()
+            check_configure_versioning_retry(bucket_name, "Enabled", "Enabled")
+
+            start = time.perf_counter()
+            versions, calls = _create_versions_bulk(client, bucket_name, keys, depth, workers)
+            seconds = time.perf_counter() - start
+            assert len(versions) == total
+            logger.info('versions x%d: %d versions of %d keys put in %.1fs (%.0f versions/s)',
+                        depth, total, len(keys), seconds, total / seconds)
+            nbytes = sum(len(body) for _, _, body in versions)
+            # the mean version size, the same in every iteration so their results aggregate
+            version_size = str(nbytes // total)
+            results.append(benchmark_result(
+                get_config_host(), operations['put'], version_size, iteration, seconds,
+                nbytes, total_operations=total, ops_per_sec=total / seconds,
+                avg_latency_ms=sum(r.latency for r in calls.results) / total * 1000, **step))
+
+            # every version, then only the current ones, which have to skip the noncurrent
+            for operation, with_versions in ((operations['list'], True), (operations['listv2'], False)):
+                stats = walk_listing(client, bucket_name, versions=with_versions,
+                                     expected=sorted(keys))
+                assert stats['keys'] == (total if with_versions else len(keys))
+                logger.info('versions x%d, %s: %d pages, %.0f entries/s, page latency p50 %.1fms p99 %.1fms',
+                            depth, 'ListObjectVersions' if with_versions else 'ListObjectsV2', stats['pages'],
+                            stats['keys_per_sec'], stats['page_p50'] * 1000, stats['page_p99'] * 1000)
+                results.append(benchmark_result(
+                    get_config_host(), operation, None, iteration, stats['seconds'], 0,
+                    total_operations=stats['pages'], ops_per_sec=stats['pages'] / stats['seconds'],
+                    entries_per_sec=stats['keys_per_sec'], avg_latency_ms=stats['seconds'] / stats['pages'] * 1000,
+                    p50_latency_ms=stats['page_p50'] * 1000, p90_latency_ms=stats['page_p90'] * 1000,
+                    p99_latency_ms=stats['page_p99'] * 1000, **step))
+
+            # GETs of versions anywhere in the history, the oldest included
+            sample = rand.sample(versions, min(len(versions), VERSIONING_BENCHMARK_GETS))
+            start = time.perf_counter()
+            calls = run_concurrent(_get_version, [(client, bucket_name) + version for version in sample],
+                                   max_workers=workers)
+            seconds = time.perf_counter() - start
+            stats = calls.latency_stats()
+            logger.info('versions x%d: %d version GETs, latency p50 %.1fms p99 %.1fms',
+                        depth, len(sample), stats['p50'] * 1000, stats['p99'] * 1000)
+            results.append(benchmark_result(
+                get_config_host(), operations['get'], version_size, iteration, seconds, sum(calls.values()),
+                total_operations=len(sample), ops_per_sec=len(sample) / seconds,
+                avg_latency_ms=sum(r.latency for r in calls.results) / len(sample) * 1000,
+                p50_latency_ms=stats['p50'] * 1000, p90_latency_ms=stats['p90'] * 1000,
+                p99_latency_ms=stats['p99'] * 1000, **step))
+
+            batches = [versions[i:i + VERSIONING_BENCHMARK_DELETE_BATCH]
+                       for i in range(0, total, VERSIONING_BENCHMARK_DELETE_BATCH)]
+            start = time.perf_counter()
+            calls = run_concurrent(_delete_versions, [(client, bucket_name, batch) for batch in batches],
+                                   max_workers=workers, sync_start=False)
+            calls.values()
+            seconds = time.perf_counter() - start
+            stats = calls.latency_stats()
+            logger.info('versions x%d: %d versions deleted in %d DeleteObjects in %.1fs (%.0f versions/s)',
+                        depth, total, len(batches), seconds, total / seconds)
+            results.append(benchmark_result(
+                get_config_host(), operations['delete'], None, iteration, seconds, 0,
+                total_operations=total, ops_per_sec=total / seconds, delete_requests=len(batches),
+                avg_latency_ms=sum(r.latency for r in calls.results) / len(batches) * 1000,
+                p50_latency_ms=stats['p50'] * 1000, p90_latency_ms=stats['p90'] * 1000,
+                p99_latency_ms=stats['p99'] * 1000, **step))
+            response = client.list_object_versions(Bucket=bucket_name)
+            assert 'Versions' not in response and 'DeleteMarkers' not in response
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "versioning", results)
+        logger.info('Versioning benchmark results appended to %s', path)
+
 @pytest.mark.fails_on_dbstore
 def test_versioning_obj_create_overwrite_multipart():
     bucket_name = get_new_bucket()
@@ -8347,21 +8543,12 @@ def _do_remove_ver(client, bucket_name, key, version_id):
     client.delete_object(Bucket=bucket_name, Key=key, VersionId=version_id)
 
 def _do_create_versioned_obj_concurrent(client, bucket_name, key, num):
-    t = []
-    for i in range(num):
-        thr = threading.Thread(target = _do_create_object, args=(client, bucket_name, key, i))
-        thr.start()
-        t.append(thr)
-    return t
+    return start_concurrent(_do_create_object, [(client, bucket_name, key, i) for i in range(num)])
 
 def _do_clear_versioned_bucket_concurrent(client, bucket_name):
-    t = []
     response = client.list_object_versions(Bucket=bucket_name)
-    for version in response.get('Versions', []):
-        thr = threading.Thread(target = _do_remove_ver, args=(client, bucket_name, version['Key'], version['VersionId']))
-        thr.start()
-        t.append(thr)
-    return t
+    return start_concurrent(_do_remove_ver, [(client, bucket_name, version['Key'], version['VersionId'])
+                                             for version in response.get('Versions', [])])
 
 def test_versioned_concurrent_object_create_concurrent_remove():
     bucket_name = get_new_bucket()
@@ -8373,44 +8560,45 @@ def test_versioned_concurrent_object_create_concurrent_remove():
     num_versions = 5
 
     for i in range(5):
-        t = _do_create_versioned_obj_concurrent(client, bucket_name, key, num_versions)
-        _do_wait_completion(t)
+        calls = _do_create_versioned_obj_concurrent(client, bucket_name, key, num_versions)
+        calls.values()
+        calls.log_latency('concurrent versioned put_object')
 
         response = client.list_object_versions(Bucket=bucket_name)
         versions = response['Versions']
 
         assert len(versions) == num_versions
 
-        t = _do_clear_versioned_bucket_concurrent(client, bucket_name)
-        _do_wait_completion(t)
+        calls = _do_clear_versioned_bucket_concurrent(client, bucket_name)
+        calls.values()
+        calls.log_latency('concurrent versioned delete_object')
 
         response = client.list_object_versions(Bucket=bucket_name)
         assert not 'Versions' in response
 
 def test_versioned_concurrent_object_create_and_remove():
     bucket_name = get_new_bucket()
-    client = get_client()
 
     check_configure_versioning_retry(bucket_name, "Enabled", "Enabled")
 
     key = 'myobj'
     num_versions = 3
+    # all 3 rounds of creates and removes overlap: a connection for each call in flight
+    client = get_client(botocore.config.Config(signature_version='s3v4',
+                                               max_pool_connections=3 * (num_versions + 3 * num_versions)))
 
-    all_threads = []
+    all_calls = []
 
     for i in range(3):
 
-        t = _do_create_versioned_obj_concurrent(client, bucket_name, key, num_versions)
-        all_threads.append(t)
+        all_calls.append(_do_create_versioned_obj_concurrent(client, bucket_name, key, num_versions))
 
-        t = _do_clear_versioned_bucket_concurrent(client, bucket_name)
-        all_threads.append(t)
+        all_calls.append(_do_clear_versioned_bucket_concurrent(client, bucket_name))
 
-    for t in all_threads:
-        _do_wait_completion(t)
+    for calls in all_calls:
+        calls.values()
 
-    t = _do_clear_versioned_bucket_concurrent(client, bucket_name)
-    _do_wait_completion(t)
+    _do_clear_versioned_bucket_concurrent(client, bucket_name).values()
 
     response = client.list_object_versions(Bucket=bucket_name)
     assert not 'Versions' in response
@@ -15881,6 +16069,113 @@ def test_bucket_logging_concurrent_flush_s_single():
     _bucket_logging_flush('Standard', True, True, 100)
 
 
+# size of the objects PUT and GET by the bucket logging benchmark
+BUCKET_LOGGING_BENCHMARK_SIZE = 4096
+
+def _bucket_logging_benchmark_ops(client, bucket_name, keys, concurrency, body):
+    """PUT, then GET, every key with `concurrency` workers; return {operation: (seconds, calls)}."""
+    results = {}
+    for operation, func in (('put', lambda key: client.put_object(Bucket=bucket_name, Key=key, Body=body)),
+                            ('get', lambda key: client.get_object(Bucket=bucket_name, Key=key)['Body'].read())):
+        start = time.perf_counter()
+        calls = run_concurrent(func, [(key,) for key in keys], max_workers=concurrency)
+        seconds = time.perf_counter() - start
+        calls.values()
+        results[operation] = (seconds, calls)
+    return results
+
+
+def _bucket_logging_flush_latency(client, src_bucket_name, log_bucket_name, log_prefix, has_extension):
+    """
+    Seconds from asking for a flush until a new log object is listed under log_prefix.
+    Without the extension the request that rolls the log object, sent once the roll
+    time has passed, stands in for the flush; the wait for the roll time is not counted.
+    """
+    def log_keys():
+        return _get_keys(client.list_objects_v2(Bucket=log_bucket_name, Prefix=log_prefix))
+    before = len(log_keys())
+    if has_extension:
+        start = time.perf_counter()
+        result = client.post_bucket_logging(Bucket=src_bucket_name)
+        assert result['ResponseMetadata']['HTTPStatusCode'] == 200
+    else:
+        time.sleep(expected_object_roll_time*1.1)
+        start = time.perf_counter()
+        client.put_object(Bucket=src_bucket_name, Key='dummy', Body='dummy')
+    keys = RetryPolicy(attempts=1000, base_delay=0.05, max_delay=0.2, deadline=expected_object_roll_time*10).poll(
+        log_keys, lambda keys: len(keys) > before, 'bucket log flush')
+    assert len(keys) > before, 'no new log object under {} after flushing {}'.format(log_prefix, src_bucket_name)
+    return time.perf_counter() - start
+
+
+@pytest.mark.bucket_logging
+@pytest.mark.benchmark
+def test_benchmark_bucket_logging_overhead():
+    has_extension = _has_bucket_logging_extension()
+    # Journal (like ObjectRollTime and the explicit flush) is a ceph extension
+    modes = ['off', 'Standard'] + (['Journal'] if has_extension else [])
+    client = get_client()
+    log_bucket_name = get_new_bucket_name()
+    get_new_bucket_resource(name=log_bucket_name)
+    count = get_benchmark_logging_objects()
+    body = 'x' * BUCKET_LOGGING_BENCHMARK_SIZE
+    keys = ['myobject' + str(j) for j in range(count)]
+
+    # a source bucket per mode and concurrency, each logging under its own prefix;
+    # 'off' comes first, so every logged step has its baseline
+    steps = [(mode, concurrency) for mode in modes for concurrency in get_benchmark_logging_concurrency()]
+    src_buckets = {}
+    for step in steps:
+        src_buckets[step] = get_new_bucket_name()
+        get_new_bucket_resource(name=src_buckets[step])
+    logged = [step for step in steps if step[0] != 'off']
+    _set_log_bucket_policy(client, log_bucket_name, [src_buckets[step] for step in logged],
+                           [src_buckets[step] + '/' for step in logged])
+    for step in logged:
+        logging_enabled = {'TargetBucket': log_bucket_name, 'TargetPrefix': src_buckets[step] + '/'}
+        if has_extension:
+            # no time-based rolls during the run: the flush below is what gets measured
+            logging_enabled.update(LoggingType=step[0], ObjectRollTime=expected_object_roll_time*10)
+        response = client.put_bucket_logging(Bucket=src_buckets[step], BucketLoggingStatus={
+            'LoggingEnabled': logging_enabled,
+        })
+        assert response['ResponseMetadata']['HTTPStatusCode'] == 200
+
+    results = []
+    for iteration in range(1, get_benchmark_iterations() + 1):
+        baseline = {}
+        for mode, concurrency in steps:
+            src_bucket_name = src_buckets[(mode, concurrency)]
+            ops = _bucket_logging_benchmark_ops(client, src_bucket_name, keys, concurrency, body)
+            for operation, (seconds, calls) in ops.items():
+                stats = calls.latency_stats()
+                ops_per_sec = count / seconds
+                if mode == 'off':
+                    baseline[(operation, concurrency)] = ops_per_sec
+                overhead = 100.0 * (1 - ops_per_sec / baseline[(operation, concurrency)])
+                logger.info('logging %s, %s x%d: %.0f ops/s (%+.1f%% vs off), latency p50 %.1fms p99 %.1fms',
+                            mode, operation, concurrency, ops_per_sec, -overhead,
+                            stats['p50'] * 1000, stats['p99'] * 1000)
+                results.append(benchmark_result(
+                    get_config_host(), "logging-{}-{}".format(mode.lower(), operation),
+                    str(BUCKET_LOGGING_BENCHMARK_SIZE), iteration, seconds, count * BUCKET_LOGGING_BENCHMARK_SIZE,
+                    concurrency=concurrency, total_operations=count, ops_per_sec=ops_per_sec,
+                    avg_latency_ms=sum(r.latency for r in calls.results) / count * 1000,
+                    p50_latency_ms=stats['p50'] * 1000, p90_latency_ms=stats['p90'] * 1000,
+                    p99_latency_ms=stats['p99'] * 1000, logging_type=mode, overhead_pct=overhead))
+            if mode != 'off':
+                flush = _bucket_logging_flush_latency(client, src_bucket_name, log_bucket_name, src_bucket_name + '/',
+                                                      has_extension)
+                logger.info('logging %s x%d: log records flushed in %.1fms', mode, concurrency, flush * 1000)
+                results.append(benchmark_result(
+                    get_config_host(), "logging-{}-flush".format(mode.lower()), None, iteration, flush, 0,
+                    concurrency=concurrency, logging_type=mode))
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "bucket_logging", results)
+        logger.info('Bucket logging benchmark results appended to %s', path)
+
+
 @pytest.mark.bucket_logging
 @pytest.mark.fails_on_aws
 def test_bucket_logging_put_and_flush():
@@ -1,3 +1,4 @@
+import itertools
 import pytest
 import random
 import string
@@ -14,7 +15,20 @@ from . import (
     configfile,
     setup_teardown,
     get_client,
-    get_new_bucket_name
+    get_new_bucket_name,
+    get_config_host,
+    get_benchmark_s3select_sizes_mb,
+    get_benchmark_iterations,
+    get_benchmark_results_dir,
+    )
+from .utils import (
+    ColumnStats,
+    RandomIntTable,
+    append_benchmark_results,
+    benchmark_result,
+    iter_records,
+    measure_select,
+    upload_chunks,
     )
 
 import logging
@@ -33,8 +47,8 @@ def random_expr(depth):
     return '(' + random_expr(depth-1) + random.choice(['+','-','*','/']) + random_expr(depth-1) + ')'
 
 
-def generate_s3select_where_clause(bucket_name,obj_name):
-
+def random_where_clause():
+    # (a, comparison, b) of two random arithmetical expressions; None when one divides by zero
     a=random_expr(4)
     b=random_expr(4)
     s=random.choice([ '<','>','=','<=','>=','!=' ])
@@ -43,7 +57,16 @@ def generate_s3select_where_clause(bucket_name,obj_name):
         eval( a )
         eval( b )
     except ZeroDivisionError:
+        return None
+
+    return a, s, b
+
+def generate_s3select_where_clause(bucket_name,obj_name):
+
+    clause = random_where_clause()
+    if clause is None:
         return
+    a, s, b = clause
 
     # generate s3select statement using generated randome expression
     # upon count(0)>0 it means true for the where clause expression
@@ -147,17 +170,9 @@ def create_csv_object_for_datetime(rows,columns):
         return result
 
 def create_random_csv_object(rows,columns,col_delim=",",record_delim="\n",csv_schema=""):
-        result = ""
-        if len(csv_schema)>0 :
-            result = csv_schema + record_delim
-
-        for _ in range(rows):
-            row = ""
-            for _ in range(columns):
-                row = row + "{}{}".format(random.randint(0,1000),col_delim)
-            result += row + record_delim
-
-        return result
+        # seeded from the global random state, so random.seed() still reproduces the object
+        table = RandomIntTable(rows,columns,seed=random.getrandbits(32))
+        return table.csv(col_delim=col_delim,record_delim=record_delim,csv_schema=csv_schema).decode('utf-8')
 
 def create_random_csv_object_string(rows,columns,col_delim=",",record_delim="\n",csv_schema=""):
         result = ""
@@ -230,54 +245,32 @@ def create_random_csv_object_null(rows,columns,col_delim=",",record_delim="\n",c
         return result
 
 def create_random_json_object(rows,columns,col_delim=",",record_delim="\n",csv_schema=""):
-        result = "{\"root\" : ["
-        result += record_delim
+        table = RandomIntTable(rows,columns,seed=random.getrandbits(32))
+        result = table.json(col_delim=col_delim,record_delim=record_delim).decode('utf-8')
         if len(csv_schema)>0 :
-            result = csv_schema + record_delim
-
-        for _ in range(rows):
-            row = ""
-            num = 0
-            row += "{"
-            for _ in range(columns):
-                num += 1
-                row = row + "\"c" + str(num) + "\"" + ": " "{}{}".format(random.randint(0,1000),col_delim)
-            row = row[:-1]
-            row += "}"
-            row += ","
-            result += row + record_delim
-        
-        result = result[:-2]  
-        result += record_delim
-        result += "]" + "}"
+            result = csv_schema + record_delim + result[len("{\"root\" : [" + record_delim):]
 
         return result
 
 def csv_to_json(obj, field_split=",",row_split="\n",csv_schema=""):
-    result = "{\"root\" : ["
-    result += row_split
+    head = "{\"root\" : [" + row_split
     if len(csv_schema)>0 :
-        result = csv_schema + row_split
-    
+        head = csv_schema + row_split
+
+    rows = []
     for rec in obj.split(row_split):
-        row = ""
-        num = 0
-        row += "{"
-        for col in rec.split(field_split):
-            if col == "":
-                break
-            num += 1
-            row = row + "\"c" + str(num) + "\"" + ": " "{}{}".format(col,field_split)
-        row = row[:-1]
-        row += "}"
-        row += ","
-        result += row + row_split
-        
-    result = result[:-5]  
-    result += row_split
-    result += "]" + "}"
+        if rec == "":
+            continue
+        cols = itertools.takewhile(lambda col: col != "", rec.split(field_split))
+        rows.append("{" + field_split.join("\"c{}\": {}".format(num,col) for num,col in enumerate(cols,1)) + "}")
 
-    return result
+    return head + ("," + row_split).join(rows) + row_split + "]" + "}"
+
+def upload_generated_object(bucket_name,new_key,chunks):
+    # streams a RandomIntTable (or any chunk iterator) into the object, multipart when large
+    client = get_client()
+    client.create_bucket(Bucket=bucket_name)
+    return upload_chunks(client,bucket_name,new_key,chunks)
 
 def upload_object(bucket_name,new_key,obj):
 
@@ -290,6 +283,26 @@ def upload_object(bucket_name,new_key,obj):
         response = c2.get_object(Bucket=bucket_name, Key=new_key)
         assert response['Body'].read().decode('utf-8') == obj, 's3select error[ downloaded object not equal to uploaded objecy'
 
+def s3select_payloads(response):
+    # raw bytes of the Records events, as they arrive
+    for event in response['Payload']:
+        if 'Records' in event:
+            yield event['Records']['Payload']
+
+def stream_s3select(bucket,key,query,column_delim=",",row_delim="\n",quot_char='"',esc_char='\\',csv_header_info="NONE"):
+    # yields the result records one by one, never holding the whole result (large objects)
+    s3 = get_client()
+
+    r = s3.select_object_content(
+        Bucket=bucket,
+        Key=key,
+        ExpressionType='SQL',
+        InputSerialization = {"CSV": {"RecordDelimiter" : row_delim, "FieldDelimiter" : column_delim,"QuoteEscapeCharacter": esc_char, "QuoteCharacter": quot_char, "FileHeaderInfo": csv_header_info}, "CompressionType": "NONE"},
+        OutputSerialization = {"CSV": {}},
+        Expression=query,)
+
+    return iter_records(s3select_payloads(r))
+
 def run_s3select(bucket,key,query,column_delim=",",row_delim="\n",quot_char='"',esc_char='\\',csv_header_info="NONE", progress = False):
 
     s3 = get_client()
@@ -313,10 +326,8 @@ def run_s3select(bucket,key,query,column_delim=",",row_delim="\n",quot_char='"',
     if progress == False:
 
         try:
-            for event in r['Payload']:
-                if 'Records' in event:
-                    records = event['Records']['Payload'].decode('utf-8')
-                    result += records
+            # join once at the end; appending to a str per event is quadratic on large results
+            result = b''.join(s3select_payloads(r)).decode('utf-8')
 
         except EventStreamError as c:
             result = str(c)
@@ -357,11 +368,7 @@ def run_s3select_output(bucket,key,query, quot_field, op_column_delim = ",", op_
         OutputSerialization = {"CSV": {"RecordDelimiter" : op_row_delim, "FieldDelimiter" : op_column_delim, "QuoteCharacter" : op_quot_char, "QuoteEscapeCharacter" : op_esc_char, "QuoteFields" : quot_field}},
         Expression=query,)
     
-    result = ""
-    for event in r['Payload']:
-        if 'Records' in event:
-            records = event['Records']['Payload'].decode('utf-8')
-            result += records
+    result = b''.join(s3select_payloads(r)).decode('utf-8')
     
     return result
 
@@ -378,20 +385,12 @@ def run_s3select_json(bucket,key,query, op_row_delim = "\n"):
         Expression=query,)
     #Record delimiter optional in output serialization
     
-    result = ""
-    for event in r['Payload']:
-        if 'Records' in event:
-            records = event['Records']['Payload'].decode('utf-8')
-            result += records
+    result = b''.join(s3select_payloads(r)).decode('utf-8')
     
     return result
 
 def remove_xml_tags_from_result(obj):
-    result = ""
-    for rec in obj.split("\n"):
-        if(rec.find("Payload")>0 or rec.find("Records")>0):
-            continue
-        result += rec + "\n" # remove by split
+    result = "".join(rec + "\n" for rec in obj.split("\n") if not (rec.find("Payload")>0 or rec.find("Records")>0))
 
     result_strip= result.strip()
     x = bool(re.search("^failure.*$", result_strip))
@@ -401,19 +400,118 @@ def remove_xml_tags_from_result(obj):
 
     return result
 
-def create_list_of_int(column_pos,obj,field_split=",",row_split="\n"):
-    
-    list_of_int = [] 
-    for rec in obj.split(row_split):
-        col_num = 1
+def iter_int_column(column_pos,records,field_split=","):
+    # records: any iterable of records, e.g. stream_s3select() or str.split()
+    for rec in records:
         if ( len(rec) == 0):
             continue
-        for col in rec.split(field_split):
-            if (col_num == column_pos):
-                list_of_int.append(int(col))
-            col_num+=1
+        cols = rec.split(field_split)
+        if column_pos <= len(cols):
+            yield int(cols[column_pos-1])
+
+def create_list_of_int(column_pos,obj,field_split=",",row_split="\n"):
+    
+    records = obj.split(row_split) if isinstance(obj, str) else obj
+    return list(iter_int_column(column_pos,records,field_split))
 
-    return list_of_int
+@pytest.mark.s3select
+def test_streaming_aggregates():
+    csv_obj_name = get_random_string()
+    bucket_name = get_new_bucket_name()
+    num_of_rows = 20000
+    obj_to_load = create_random_csv_object(num_of_rows,10)
+    upload_object(bucket_name,csv_obj_name,obj_to_load)
+
+    # expected values and the returned rows are both aggregated record by record
+    expected = ColumnStats([1,4]).update(obj_to_load.split("\n"))
+    streamed = ColumnStats([1,2]).update(stream_s3select(bucket_name,csv_obj_name,"select _1,_4 from s3object;"))
+
+    s3select_assert_result( num_of_rows, streamed.count )
+    s3select_assert_result( expected.sum[1], streamed.sum[1] )
+    s3select_assert_result( expected.sum[4], streamed.sum[2] )
+    s3select_assert_result( expected.min[4], streamed.min[2] )
+    s3select_assert_result( expected.max[1], streamed.max[1] )
+
+    res = remove_xml_tags_from_result( run_s3select(bucket_name,csv_obj_name,"select count(0),sum(int(_1)),min(int(_4)),max(int(_1)) from s3object;") ).strip()
+    s3select_assert_result( res, "{},{},{},{}".format(num_of_rows, expected.sum[1], expected.min[4], expected.max[1]) )
+
+@pytest.mark.s3select
+def test_generated_object_aggregates():
+    # ~12MB per object, uploaded in parts straight from the generator
+    table = RandomIntTable(300000,10,seed=random.getrandbits(32))
+    expected = table.stats
+    bucket_name = get_new_bucket_name()
+
+    csv_obj_name = get_random_string()
+    upload_generated_object(bucket_name,csv_obj_name,table.csv_chunks())
+    res = remove_xml_tags_from_result( run_s3select(bucket_name,csv_obj_name,"select count(0),sum(int(_1)),min(int(_4)),max(int(_10)) from s3object;") ).strip()
+    s3select_assert_result( res, "{},{},{},{}".format(expected.count, expected.sum[1], expected.min[4], expected.max[10]) )
+
+    json_obj_name = get_random_string()
+    upload_generated_object(bucket_name,json_obj_name,table.json_chunks())
+    res = remove_xml_tags_from_result( run_s3select_json(bucket_name,json_obj_name,"select sum(_1.c7) from s3object[*].root;") ).replace(",","")
+    s3select_assert_result( int(res), expected.sum[7] )
+
+# scan-throughput benchmark: query name -> statement (a callable is called per run)
+def _where_clause_query():
+    clause = None
+    while clause is None:
+        clause = random_where_clause()
+    return "select count(0) from s3object where " + "".join(clause) + ";"
+
+S3SELECT_BENCHMARK_QUERIES = (
+    ("count", "select count(0) from s3object;"),
+    ("projection", "select _1,_3,_5 from s3object;"),
+    ("where", _where_clause_query),
+    ("aggregates", "select sum(int(_1)),min(int(_2)),max(int(_3)),avg(int(_4)) from s3object;"),
+    ("like", 'select count(0) from s3object where _1 like "%1%";'),
+    ("cast", "select cast(_1 as int)+cast(_2 as int) from s3object where cast(_3 as int)>500;"),
+)
+
+# bytes per generated CSV row of 10 columns of 0..1000 (~3 digits and a delimiter each)
+S3SELECT_BENCHMARK_ROW_BYTES = 40
+
+def run_s3select_measured(bucket,key,query):
+    s3 = get_client()
+    r = s3.select_object_content(
+        Bucket=bucket,
+        Key=key,
+        ExpressionType='SQL',
+        InputSerialization = {"CSV": {"RecordDelimiter" : "\n", "FieldDelimiter" : ",", "FileHeaderInfo": "NONE"}, "CompressionType": "NONE"},
+        OutputSerialization = {"CSV": {}},
+        Expression=query,
+        RequestProgress = {"Enabled": True})
+    return measure_select(r['Payload'])
+
+@pytest.mark.benchmark
+@pytest.mark.s3select
+def test_benchmark_s3select_scan():
+    bucket_name = get_new_bucket_name()
+    results = []
+    for size_mb in get_benchmark_s3select_sizes_mb():
+        object_size = "{}MiB".format(size_mb)
+        table = RandomIntTable(size_mb * 1024 * 1024 // S3SELECT_BENCHMARK_ROW_BYTES, 10, seed=size_mb)
+        obj_name = "s3select-bench-" + object_size
+        obj_bytes = upload_generated_object(bucket_name,obj_name,table.csv_chunks())
+
+        for name, query in S3SELECT_BENCHMARK_QUERIES:
+            for iteration in range(1, get_benchmark_iterations() + 1):
+                stmt = query() if callable(query) else query
+                m = run_s3select_measured(bucket_name,obj_name,stmt)
+                # stores that report no Stats/Progress have scanned the whole object
+                scanned = m['bytes_scanned'] or obj_bytes
+                ttfr = m['first_record_seconds']
+                logging.info('s3select %s %s #%d: %.3fs, %.1f MB/s scanned, first record after %s, %d bytes returned',
+                             name, object_size, iteration, m['seconds'], scanned / 1048576.0 / m['seconds'],
+                             '%.1fms' % (ttfr * 1000) if ttfr is not None else 'n/a', m['records_bytes'])
+                results.append(benchmark_result(
+                    get_config_host(), "s3select-" + name, object_size, iteration, m['seconds'], scanned,
+                    bytes_scanned=scanned, bytes_returned=m['bytes_returned'] or m['records_bytes'],
+                    ttfr_ms=ttfr * 1000 if ttfr is not None else None))
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "s3select", results)
+        logging.info('s3select benchmark results appended to %s', path)
 
 @pytest.mark.s3select
 def test_count_operation():
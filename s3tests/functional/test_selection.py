@@ -0,0 +1,53 @@
+import json
+import types
+
+from . import selection
+
+class _FakeItem:
+    def __init__(self, name, markers=(), module='test_s3.py'):
+        self.name = name
+        self.fspath = '/src/s3tests/functional/' + module
+        self.nodeid = 's3tests/functional/{}::{}'.format(module, name)
+        self._markers = [types.SimpleNamespace(name=m) for m in markers]
+
+    def iter_markers(self):
+        return iter(self._markers)
+
+    def get_closest_marker(self, name):
+        return next((m for m in self._markers if m.name == name), None)
+
+class _FakeCache(dict):
+    def get(self, key, default):
+        return dict.get(self, key, default)
+
+    def set(self, key, value):
+        self[key] = json.loads(json.dumps(value))
+
+def test_selection_index_profiles_and_cache():
+    cache = _FakeCache()
+    index = selection.SelectionIndex(cache)
+    index.core_deselected = ('test_iam.py', 'test_s3.py::test_bucket_listv2_objects_anonymous')
+    index.compliance_tests = {'test_multipart_upload'}
+    index.skip_tests = {'test_bucket_list_empty'}
+
+    assert index.classify(_FakeItem('test_multipart_upload')) == ['core', 'compliance']
+    assert index.classify(_FakeItem('test_bucket_list_empty')) == ['core', 'skip']
+    assert index.classify(_FakeItem('test_cors_origin_response', markers=['cors'])) == []
+    assert index.classify(_FakeItem('test_object_checksum_sha256')) == []
+    assert index.classify(_FakeItem('test_benchmark_versioning_depth', markers=['benchmark'])) == ['benchmark']
+    # entries of the deselect list are node id prefixes, like --deselect
+    assert index.classify(_FakeItem('test_bucket_listv2_objects_anonymous_fail')) == []
+    assert index.classify(_FakeItem('test_create_user', module='test_iam.py')) == []
+
+    item = _FakeItem('test_multipart_upload')
+    assert index.profiles_of(item) == ['core', 'compliance']
+    index.save()
+    assert cache[selection.CACHE_KEY]['profiles'] == {item.nodeid: ['core', 'compliance']}
+
+    # a fresh index with the same fingerprint answers from the cache alone
+    cached = selection.SelectionIndex(cache)
+    cached.classify = None
+    assert cached.profiles_of(item) == ['core', 'compliance']
+
+    cache[selection.CACHE_KEY]['fingerprint'] = 'stale'
+    assert selection.SelectionIndex(cache).profiles == {}
@@ -0,0 +1,34 @@
+from . import sharding
+
+def test_sharding_balances_by_recorded_duration(tmp_path):
+    (tmp_path / 'junit-1.xml').write_text(
+        '<testsuites><testsuite name="pytest">'
+        '<testcase classname="s3tests.functional.test_s3" name="test_lifecycle" time="100"/>'
+        '<testcase classname="s3tests.functional.test_s3" name="test_multipart" time="60"/>'
+        '<testcase classname="s3tests.functional.test_s3" name="test_logging" time="40"/>'
+        '<testcase classname="s3tests.functional.test_s3" name="test_get" time="2"/>'
+        '</testsuite></testsuites>')
+    (tmp_path / 'junit-2.xml').write_text('<testsuites><testsuite')  # interrupted run
+    durations = sharding.load_durations(str(tmp_path))
+    assert durations[('s3tests.functional.test_s3', 'test_lifecycle')] == 100
+
+    nodeids = ['s3tests/functional/test_s3.py::' + name for name in
+               ('test_get', 'test_multipart', 'test_put', 'test_lifecycle', 'test_logging')]
+    shards, expected = sharding.partition(nodeids, durations, 2)
+    # test_put has no duration and counts as the median one (50s)
+    assert shards == [[nodeids[3], nodeids[4]], [nodeids[0], nodeids[1], nodeids[2]]]
+    assert expected == [140, 112]
+
+    assert sharding.shard_template('test-{random}-', '3') == 's3-test-{random}-'
+    assert sharding.shard_template('/s3-tests/', '3') == '/s3-tests/shard3/'
+    assert sharding.shard_template('/s3-tests/', None) == '/s3-tests/'
+
+    for i in range(2):
+        (tmp_path / 'shard{}.xml'.format(i)).write_text(
+            '<testsuites><testsuite name="pytest" tests="2" failures="{}" errors="0" skipped="0" time="{}">'
+            '<testcase classname="c" name="t{}" time="1"/></testsuite></testsuites>'.format(i, 10 + i, i))
+    merged = tmp_path / 'junit-3.xml'
+    sharding.merge_junit([str(tmp_path / 'shard0.xml'), str(tmp_path / 'shard1.xml')], str(merged))
+    root = sharding.ET.parse(str(merged)).getroot()
+    assert (root.get('tests'), root.get('failures'), root.get('time')) == ('4', '1', '11.000')
+    assert [s.get('name') for s in root.iter('testsuite')] == ['pytest-shard0', 'pytest-shard1']
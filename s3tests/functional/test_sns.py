@@ -1,5 +1,8 @@
 import json
+import logging
+import time
 import pytest
+import botocore.config
 from botocore.exceptions import ClientError
 from . import (
     configfile,
@@ -8,9 +11,21 @@ from . import (
     get_new_bucket_name,
     get_prefix,
     nuke_prefixed_buckets,
+    get_config_host,
+    get_benchmark_iterations,
+    get_benchmark_results_dir,
+    get_benchmark_workers,
+    get_benchmark_notification_rates,
+    get_benchmark_notification_objects,
+    get_notification_receiver_address,
+    get_notification_timeout,
 )
 from .iam import iam_root, iam_alt_root
+from .notifications import DeliveryTracker, NotificationReceiver
 from .utils import assert_raises, _get_status_and_error_code
+from .utils import append_benchmark_results, benchmark_result, run_concurrent
+
+log = logging.getLogger(__name__)
 
 def get_new_topic_name():
     return get_new_bucket_name()
@@ -21,7 +36,7 @@ def nuke_topics(client, prefix):
         for topic in response['Topics']:
             arn = topic['TopicArn']
             if prefix not in arn:
-                pass
+                continue
             try:
                 client.delete_topic(TopicArn=arn)
             except:
@@ -161,3 +176,94 @@ def test_cross_account_topic_publish(sns, s3_alt, iam_alt_root):
 
     s3_alt.put_bucket_notification_configuration(
             Bucket=bucket, NotificationConfiguration=config)
+
+@pytest.fixture
+def receiver():
+    host, port = get_notification_receiver_address()
+    with NotificationReceiver(host, port) as receiver:
+        yield receiver
+
+def _notifying_bucket(sns, s3, receiver):
+    """A new bucket whose object creations and removals are pushed to receiver."""
+    topic_arn = sns.create_topic(Name=get_new_topic_name(),
+                                 Attributes={'push-endpoint': receiver.endpoint})['TopicArn']
+    bucket = get_new_bucket_name()
+    s3.create_bucket(Bucket=bucket)
+    config = {'TopicConfigurations': [{
+        'Id': 'delivery',
+        'TopicArn': topic_arn,
+        'Events': ['s3:ObjectCreated:*', 's3:ObjectRemoved:*'],
+        }]}
+    s3.put_bucket_notification_configuration(Bucket=bucket, NotificationConfiguration=config)
+    return bucket
+
+def _drive(tracker, bucket, keys, rate, request, family):
+    """
+    Call request(key) for every key, started at `rate` keys per second over the
+    benchmark workers, recording each success with tracker; return the seconds taken.
+    """
+    start = time.monotonic()
+    def call(i, key):
+        delay = start + i / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        sent = tracker.clock()
+        request(Bucket=bucket, Key=key)
+        tracker.sent_event(bucket, key, family, sent)
+    run_concurrent(call, list(enumerate(keys)), max_workers=get_benchmark_workers(), sync_start=False).values()
+    return time.monotonic() - start
+
+def _put_delete(s3, tracker, bucket, count, rate):
+    keys = ['{}{}'.format(tracker.prefix, i) for i in range(count)]
+    seconds = _drive(tracker, bucket, keys, rate, s3.put_object, 'ObjectCreated')
+    seconds += _drive(tracker, bucket, keys, rate, s3.delete_object, 'ObjectRemoved')
+    return seconds
+
+@pytest.mark.iam_account
+@pytest.mark.sns
+def test_notification_delivery(sns, s3, receiver):
+    bucket = _notifying_bucket(sns, s3, receiver)
+    tracker = DeliveryTracker(receiver, prefix='delivery/')
+    _put_delete(s3, tracker, bucket, 10, rate=100)
+
+    tracker.wait(get_notification_timeout())
+    stats = tracker.stats()
+    assert stats['sent'] == 20
+    assert stats['lost'] == 0
+    assert stats['unexpected'] == 0
+
+@pytest.mark.iam_account
+@pytest.mark.sns
+@pytest.mark.benchmark
+def test_benchmark_notification_delivery(sns, s3, receiver):
+    # one bucket and receiver for all steps; each step (rate) writes under its own key prefix.
+    # The s3 fixture still removes the bucket; this client has a connection per worker.
+    workers = get_benchmark_workers()
+    client = get_iam_root_client(service_name='s3', region_name=None,
+                                 config=botocore.config.Config(max_pool_connections=workers))
+    bucket = _notifying_bucket(sns, client, receiver)
+    count = get_benchmark_notification_objects()
+    results = []
+    for iteration in range(1, get_benchmark_iterations() + 1):
+        for rate in get_benchmark_notification_rates():
+            tracker = DeliveryTracker(receiver, prefix='{}-{}/'.format(iteration, rate))
+            seconds = _put_delete(client, tracker, bucket, count, rate)
+            tracker.wait(get_notification_timeout())
+            stats = tracker.stats()
+            latency = stats['latency']
+            log.info('notifications at %d objects/s: %d sent in %.1fs, %d delivered, %d lost, %d duplicates, '
+                     'latency p50 %.1fms p90 %.1fms p99 %.1fms max %.1fms', rate, stats['sent'], seconds,
+                     stats['delivered'], stats['lost'], stats['duplicates'],
+                     *(latency.get(k, 0) * 1000 for k in ('p50', 'p90', 'p99', 'max')))
+            # the rate is part of the operation so that report.py keeps the steps apart
+            results.append(benchmark_result(
+                get_config_host(), "notification-delivery-{}ps".format(rate), "0", iteration, seconds, 0,
+                concurrency=workers, total_operations=stats['sent'], ops_per_sec=stats['sent'] / seconds,
+                avg_latency_ms=stats['mean_latency'] * 1000, p50_latency_ms=latency.get('p50', 0) * 1000,
+                p90_latency_ms=latency.get('p90', 0) * 1000, p99_latency_ms=latency.get('p99', 0) * 1000,
+                errors=stats['lost'], error_rate=stats['lost'] / stats['sent'] if stats['sent'] else 0.0,
+                target_rate=rate, delivered=stats['delivered'], duplicates=stats['duplicates']))
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "notifications", results)
+        log.info('Notification benchmark results appended to %s', path)
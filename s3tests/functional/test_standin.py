@@ -0,0 +1,111 @@
+import time
+
+import boto3
+import pytest
+from botocore.client import Config
+from botocore.exceptions import ClientError
+
+from .. import standin
+from . import nuke_bucket
+from . import utils
+
+@pytest.fixture(scope='module')
+def server():
+    with standin.StandInServer() as server:
+        yield server
+
+def _client(server, **config):
+    return boto3.client('s3', endpoint_url=server.endpoint, region_name='us-east-1',
+                        aws_access_key_id='standin', aws_secret_access_key='standin',
+                        config=Config(signature_version='s3v4', **config))
+
+def _error_code(e):
+    return e.response['Error']['Code']
+
+def test_standin_objects(server):
+    client = _client(server)
+    client.create_bucket(Bucket='objects')
+    etag = client.put_object(Bucket='objects', Key='a/b', Body=b'0123456789',
+                             Metadata={'color': 'blue'}, ContentType='text/plain')['ETag']
+
+    response = client.get_object(Bucket='objects', Key='a/b')
+    assert response['Body'].read() == b'0123456789'
+    assert response['ETag'] == etag and response['Metadata'] == {'color': 'blue'}
+    assert response['ContentType'] == 'text/plain'
+
+    assert client.get_object(Bucket='objects', Key='a/b', Range='bytes=2-4')['Body'].read() == b'234'
+    assert client.get_object(Bucket='objects', Key='a/b', Range='bytes=-3')['Body'].read() == b'789'
+    assert client.get_object(Bucket='objects', Key='a/b', Range='bytes=8-')['ContentRange'] == 'bytes 8-9/10'
+    with pytest.raises(ClientError) as e:
+        client.get_object(Bucket='objects', Key='a/b', Range='bytes=10-')
+    assert _error_code(e.value) == 'InvalidRange'
+
+    assert client.head_object(Bucket='objects', Key='a/b')['ContentLength'] == 10
+    client.copy_object(Bucket='objects', Key='copy', CopySource={'Bucket': 'objects', 'Key': 'a/b'})
+    assert client.get_object(Bucket='objects', Key='copy')['Metadata'] == {'color': 'blue'}
+
+    client.delete_object(Bucket='objects', Key='a/b')
+    with pytest.raises(ClientError) as e:
+        client.get_object(Bucket='objects', Key='a/b')
+    assert _error_code(e.value) == 'NoSuchKey'
+    with pytest.raises(ClientError) as e:
+        client.delete_bucket(Bucket='objects')
+    assert _error_code(e.value) == 'BucketNotEmpty'
+    with pytest.raises(ClientError) as e:
+        client.put_object(Bucket='missing', Key='k', Body=b'')
+    assert _error_code(e.value) == 'NoSuchBucket'
+
+def test_standin_listings(server):
+    client = _client(server, max_pool_connections=16)
+    client.create_bucket(Bucket='listings')
+    keys = sorted(list(utils.smartstore_keys(400, seed=3)) + ['flat-1', 'flat-2'])
+    utils.run_concurrent(lambda key: client.put_object(Bucket='listings', Key=key, Body=b'x'),
+                         [(key,) for key in keys], max_workers=16).values()
+
+    for prefix, delimiter in (('', ''), ('', '/'), ('main/db/', '/'), ('_audit/', '')):
+        expected = list(utils.expected_listing(keys, prefix, delimiter))
+        for versions in (False, True):
+            stats = utils.walk_listing(client, 'listings', prefix=prefix, delimiter=delimiter, max_keys=7,
+                                       versions=versions, expected=expected)
+            assert stats['keys'] + stats['prefixes'] == len(expected)
+
+    v1 = client.get_paginator('list_objects').paginate(Bucket='listings', Delimiter='/',
+                                                       PaginationConfig={'PageSize': 2})
+    assert [p['Prefix'] for page in v1 for p in page.get('CommonPrefixes', [])] == ['_audit/', '_internal/', 'main/']
+    assert client.list_objects_v2(Bucket='listings', MaxKeys=0)['IsTruncated'] is False
+
+    # the suite's own cleanup (ListObjectVersions + DeleteObjects) empties and removes the bucket
+    nuke_bucket(client, 'listings')
+    assert 'listings' not in [b['Name'] for b in client.list_buckets()['Buckets']]
+
+def test_standin_multipart(server):
+    client = _client(server)
+    client.create_bucket(Bucket='multipart')
+    table = utils.RandomIntTable(160000, 10, seed=1)
+    data = table.csv()
+    assert utils.upload_chunks(client, 'multipart', 'table.csv', table.csv_chunks(),
+                               part_size=5 * 1024 * 1024) == len(data)
+    response = client.get_object(Bucket='multipart', Key='table.csv')
+    assert response['Body'].read() == data
+    assert response['ETag'].endswith('-{}"'.format(-(-len(data) // (5 * 1024 * 1024))))
+
+    upload_id = client.create_multipart_upload(Bucket='multipart', Key='small')['UploadId']
+    parts = [{'PartNumber': n, 'ETag': client.upload_part(Bucket='multipart', Key='small', UploadId=upload_id,
+                                                          PartNumber=n, Body=b'x' * 10)['ETag']}
+             for n in (1, 2)]
+    with pytest.raises(ClientError) as e:
+        client.complete_multipart_upload(Bucket='multipart', Key='small', UploadId=upload_id,
+                                         MultipartUpload={'Parts': parts})
+    assert _error_code(e.value) == 'EntityTooSmall'
+    client.abort_multipart_upload(Bucket='multipart', Key='small', UploadId=upload_id)
+    with pytest.raises(ClientError) as e:
+        client.upload_part(Bucket='multipart', Key='small', UploadId=upload_id, PartNumber=1, Body=b'')
+    assert _error_code(e.value) == 'NoSuchUpload'
+
+def test_standin_injected_latency():
+    with standin.StandInServer(latency=0.05) as server:
+        client = _client(server)
+        start = time.monotonic()
+        client.list_buckets()
+        client.list_buckets()
+        assert time.monotonic() - start >= 0.1
@@ -53,7 +53,16 @@ from . import(
     get_iam_secret_key,
     get_sub,
     get_azp,
-    get_user_token
+    get_user_token,
+    get_config_host,
+    get_benchmark_iterations,
+    get_benchmark_results_dir,
+    )
+from .retry import retry_on
+from .utils import (
+    append_benchmark_results,
+    benchmark_result,
+    latency_stats,
     )
 
 log = logging.getLogger(__name__)
@@ -93,19 +102,23 @@ def put_user_policy(iam_client,username,policyname,policy_document):
         role_err = e.response['Code']
     return (role_err,role_response,policyname)
 
-def get_s3_client_using_iam_creds():
-    iam_access_key = get_iam_access_key()
-    iam_secret_key = get_iam_secret_key()
-    default_endpoint = get_config_endpoint()
-
-    s3_client_iam_creds = boto3.client('s3',
-                              aws_access_key_id = iam_access_key,
-                              aws_secret_access_key = iam_secret_key,
-                              endpoint_url=default_endpoint,
-                              region_name='',
-                          )
+# the [iam] user's keys don't change during a run, so neither do the client and
+# resource built from them; keyed on the keys and endpoint in case the config does
+_iam_creds_s3 = {}
+
+def _cached_iam_creds_s3(factory):
+    key = (factory, get_iam_access_key(), get_iam_secret_key(), get_config_endpoint())
+    if key not in _iam_creds_s3:
+        _iam_creds_s3[key] = factory('s3',
+                                     aws_access_key_id = key[1],
+                                     aws_secret_access_key = key[2],
+                                     endpoint_url=key[3],
+                                     region_name='',
+                                     )
+    return _iam_creds_s3[key]
 
-    return s3_client_iam_creds
+def get_s3_client_using_iam_creds():
+    return _cached_iam_creds_s3(boto3.client)
 
 def create_oidc_provider(iam_client, url, clientidlist, thumbprintlist):
     oidc_arn = None
@@ -142,18 +155,7 @@ def create_oidc_provider(iam_client, url, clientidlist, thumbprintlist):
     return (oidc_arn, oidc_error)
 
 def get_s3_resource_using_iam_creds():
-    iam_access_key = get_iam_access_key()
-    iam_secret_key = get_iam_secret_key()
-    default_endpoint = get_config_endpoint()
-
-    s3_res_iam_creds = boto3.resource('s3',
-                              aws_access_key_id = iam_access_key,
-                              aws_secret_access_key = iam_secret_key,
-                              endpoint_url=default_endpoint,
-                              region_name='',
-                          )
-
-    return s3_res_iam_creds
+    return _cached_iam_creds_s3(boto3.resource)
 
 @pytest.mark.test_of_sts
 @pytest.mark.fails_on_dbstore
@@ -224,6 +226,58 @@ def test_assume_role_allow():
     bkt = s3_client.delete_bucket(Bucket=bucket_name)
     assert bkt['ResponseMetadata']['HTTPStatusCode'] == 204
 
+# AssumeRole calls per iteration of the latency benchmark
+STS_BENCHMARK_CALLS = 20
+
+@pytest.mark.test_of_sts
+@pytest.mark.benchmark
+@pytest.mark.fails_on_dbstore
+def test_benchmark_assume_role_latency():
+    iam_client=get_iam_client()
+    sts_client=get_sts_client()
+    sts_user_id=get_alt_user_id()
+
+    policy_document = "{\"Version\":\"2012-10-17\",\"Statement\":[{\"Effect\":\"Allow\",\"Principal\":{\"AWS\":[\"arn:aws:iam:::user/"+sts_user_id+"\"]},\"Action\":[\"sts:AssumeRole\"]}]}"
+    (role_error,role_response,general_role_name)=create_role(iam_client,'/',None,policy_document,None,None,None)
+    assert role_response, role_error
+    role_policy = "{\"Version\":\"2012-10-17\",\"Statement\":{\"Effect\":\"Allow\",\"Action\":\"s3:*\",\"Resource\":\"arn:aws:s3:::*\"}}"
+    (role_err,response)=put_role_policy(iam_client,general_role_name,None,role_policy)
+    assert response, role_err
+    role_arn = role_response['Role']['Arn']
+
+    results = []
+    for iteration in range(1, get_benchmark_iterations() + 1):
+        latencies = []
+        for _ in range(STS_BENCHMARK_CALLS):
+            start = time.perf_counter()
+            response = sts_client.assume_role(RoleArn=role_arn, RoleSessionName=get_parameter_name())
+            latencies.append(time.perf_counter() - start)
+            assert response['ResponseMetadata']['HTTPStatusCode'] == 200
+        stats = latency_stats(latencies)
+        # the last credentials issued have to work
+        credentials = response['Credentials']
+        s3_client = boto3.client('s3',
+                    aws_access_key_id = credentials['AccessKeyId'],
+                    aws_secret_access_key = credentials['SecretAccessKey'],
+                    aws_session_token = credentials['SessionToken'],
+                    endpoint_url=get_config_endpoint(),
+                    region_name='',
+                    )
+        s3_client.list_buckets()
+
+        log.info('AssumeRole #%d: %d calls, latency min %.1fms p50 %.1fms p90 %.1fms max %.1fms',
+                 iteration, stats['count'], *(stats[k] * 1000 for k in ('min', 'p50', 'p90', 'max')))
+        seconds = sum(latencies)
+        results.append(benchmark_result(
+            get_config_host(), "sts-assume-role", None, iteration, seconds, 0,
+            total_operations=stats['count'], ops_per_sec=stats['count'] / seconds,
+            avg_latency_ms=seconds / stats['count'] * 1000, p50_latency_ms=stats['p50'] * 1000,
+            p90_latency_ms=stats['p90'] * 1000, p99_latency_ms=stats['p99'] * 1000))
+
+    if get_benchmark_results_dir():
+        path = append_benchmark_results(get_benchmark_results_dir(), "sts", results)
+        log.info('STS benchmark results appended to %s', path)
+
 @pytest.mark.test_of_sts
 @pytest.mark.fails_on_dbstore
 def test_assume_role_deny():
@@ -2074,18 +2128,6 @@ def test_assume_role_with_web_identity_role_resource_tag():
     OpenIDConnectProviderArn=oidc_response["OpenIDConnectProviderArn"]
     )
 
-def retry_on(code, tries, func, *args, **kwargs):
-  for i in range(tries):
-    try:
-      return func(*args, **kwargs)
-    except ClientError as e:
-      err = e.response['Error']['Code']
-      if i + 1 < tries and err in code:
-        print(f'Got {err}, retrying in {i}s..')
-        time.sleep(i)
-        continue
-      raise
-
 @pytest.mark.test_of_sts
 @pytest.mark.fails_on_dbstore
 def test_get_caller_identity_root():
@@ -0,0 +1,109 @@
+import csv
+import json
+import time
+
+import boto3
+import pytest
+from botocore.client import Config
+from botocore.exceptions import ClientError
+
+from .. import standin
+from . import tracing
+
+def test_tracer_records_calls(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    tracer = tracing.RequestTracer(str(path))
+    with standin.StandInServer() as server:
+        client = boto3.client('s3', endpoint_url=server.endpoint, region_name='us-east-1',
+                              aws_access_key_id='standin', aws_secret_access_key='standin',
+                              config=Config(signature_version='s3v4'))
+        tracer.register(client.meta.events)
+        tracer.current_test = 'test_a'
+        client.create_bucket(Bucket='traced')
+        client.put_object(Bucket='traced', Key='k', Body=b'x' * 1000)
+        tracer.current_test = 'test_b'
+        client.get_object(Bucket='traced', Key='k')['Body'].read()
+        with pytest.raises(ClientError):
+            client.get_object(Bucket='traced', Key='missing')
+    tracer.close()
+
+    records = sorted((r for calls in tracer.records.values() for r in calls), key=lambda r: r['start'])
+    ops = [(r['test'], r['operation'], r['bucket'], r['key'], r['status']) for r in records]
+    assert ops == [('test_a', 'CreateBucket', 'traced', None, 200),
+                   ('test_a', 'PutObject', 'traced', 'k', 200),
+                   ('test_b', 'GetObject', 'traced', 'k', 200),
+                   ('test_b', 'GetObject', 'traced', 'missing', 404)]
+    put, get, missing = records[1:]
+    assert put['bytes_sent'] == 1000 and get['bytes_received'] == 1000
+    assert missing['error'] == 'NoSuchKey' and all(r['retries'] == 0 for r in records)
+    assert all(0 < r['ttfb'] <= r['latency'] for r in records)
+
+    assert tracer.totals('test_a')['calls'] == 2 and tracer.totals()['bytes_sent'] == 1000
+    slowest = tracer.slowest_by_test(per_test=1)
+    assert set(slowest) == {'test_a', 'test_b'} and all(len(calls) == 1 for calls in slowest.values())
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [s['name'] for s in spans] == ['s3.CreateBucket', 's3.PutObject', 's3.GetObject', 's3.GetObject']
+    assert spans[3]['status'] == {'code': 2} and spans[3]['attributes']['error.type'] == 'NoSuchKey'
+    assert spans[1]['attributes']['aws.s3.key'] == 'k' and spans[1]['endTimeUnixNano'] > spans[1]['startTimeUnixNano']
+
+def test_tracer_keeps_only_the_slowest_calls_per_test():
+    tracer = tracing.RequestTracer(keep_per_test=2)
+    for test, latencies in (('fast', (0.1, 0.2)), ('slow', (0.5, 3.0, 0.2, 1.0))):
+        for latency in latencies:
+            # a call that started `latency` seconds ago
+            trace = {'test': test, 'service': 's3', 'operation': 'PutObject', 'bucket': 'b', 'key': str(latency),
+                     'start': 0.0, 't0': time.perf_counter() - latency, 'attempts': 1, 'bytes_sent': 0}
+            tracer._finish(trace, status=200, error=None)
+    assert [r['key'] for r in tracer.records['slow']] == ['3.0', '1.0']
+    assert tracer.totals('slow')['calls'] == 4
+    slowest = tracer.slowest_by_test(per_test=1)
+    assert list(slowest) == ['slow', 'fast'] and [r['key'] for r in slowest['fast']] == ['0.2']
+
+def test_phase_timings():
+    now = [0.0]
+    def clock():
+        return now[0]
+    def sleep(seconds):
+        now[0] += seconds
+
+    tracer = tracing.RequestTracer()
+    tracer._totals['t1'] = {'calls': 5, 'retries': 1, 'bytes_sent': 10, 'bytes_received': 20, 'seconds': 1.0}
+    timings = tracing.PhaseTimings(tracer, clock=clock)
+    timed_sleep = timings.wrap_sleep(sleep)
+
+    for test, body, slept in (('t1', 2.0, 0.5), ('t2', 0.5, 3.0)):
+        with timings.phase(test, 'setup'):
+            now[0] += 1.0
+        timings.outcome(test, 'setup', 'passed')
+        with timings.phase(test, 'call'):
+            now[0] += body
+            timed_sleep(slept)
+        timings.outcome(test, 'call', 'failed' if test == 't2' else 'passed')
+        with timings.phase(test, 'teardown'):
+            now[0] += 0.25
+        timings.outcome(test, 'teardown', 'passed')
+        timings.finish(test)
+
+    t1, t2 = timings.rows['t1'], timings.rows['t2']
+    assert (t1['setup'], t1['body'], t1['sleep'], t1['teardown'], t1['total']) == (1.0, 2.0, 0.5, 0.25, 3.75)
+    assert (t1['outcome'], t1['requests'], t1['retries'], t1['bytes_received']) == ('passed', 5, 1, 20)
+    assert (t2['outcome'], t2['requests'], t2['total']) == ('failed', 0, 4.75)
+    assert timings.phase_totals()['sleep'] == 3.5
+
+    timings.outcome('t3', 'setup', 'failed')
+    timings.outcome('t3', 'teardown', 'passed')
+    assert timings.rows['t3']['outcome'] == 'error'
+
+def test_phase_timings_csv(tmp_path):
+    timings = tracing.PhaseTimings()
+    for test, seconds in (('fast', 0.1), ('slow', 2.0)):
+        with timings.phase(test, 'call'):
+            pass
+        timings.rows[test]['total'] = seconds
+    path = tmp_path / 'timing.csv'
+    timings.write(str(path))
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert [r['test'] for r in rows] == ['slow', 'fast']
+    assert list(rows[0]) == list(tracing.PhaseTimings.COLUMNS)
@@ -1,3 +1,12 @@
+import json
+import threading
+import time
+
+import boto3
+import pytest
+from botocore.client import Config
+
+from .. import standin
 from . import utils
 
 def test_generate():
@@ -7,3 +16,273 @@ def test_generate():
     assert len(''.join(utils.generate_random(FIVE_MB - 1))) == FIVE_MB - 1
     assert len(''.join(utils.generate_random(FIVE_MB))) == FIVE_MB
     assert len(''.join(utils.generate_random(FIVE_MB + 1))) == FIVE_MB + 1
+
+def test_run_concurrent_bounded_and_synchronized(monkeypatch):
+    lock = threading.Lock()
+    active = [0, 0]    # current, peak
+    events = []        # ('arrive', None) at the barrier, ('start', i) when a call begins
+
+    class RecordingBarrier(threading.Barrier):
+        def wait(self, timeout=None):
+            with lock:
+                events.append(('arrive', None))
+            return super().wait(timeout)
+    monkeypatch.setattr(utils.threading, 'Barrier', RecordingBarrier)
+
+    def call(i):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+            events.append(('start', i))
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return i * 2
+
+    calls = utils.run_concurrent(call, [(i,) for i in range(20)], max_workers=5)
+    assert calls.values() == [i * 2 for i in range(20)]
+    assert active[1] == 5
+    # the first wave waited at the barrier until all five of its workers were there
+    assert [kind for kind, _ in events[:5]] == ['arrive'] * 5
+    assert sum(kind == 'arrive' for kind, _ in events) == 5
+    stats = calls.latency_stats()
+    assert stats['count'] == 20 and 0.015 < stats['p50'] <= stats['max']
+
+def test_run_concurrent_propagates_errors():
+    def call(i):
+        if i == 3:
+            raise ValueError('boom %d' % i)
+        return i
+
+    calls = utils.start_concurrent(call, [(i,) for i in range(8)])
+    e = utils.assert_raises(ValueError, calls.values)
+    assert str(e) == 'boom 3'
+    assert [r.index for r in calls.errors()] == [3]
+    assert utils.run_concurrent(call, []).values() == []
+
+def test_smartstore_keys():
+    keys = list(utils.smartstore_keys(100))
+    assert len(keys) == 100 and len(set(keys)) == 100
+    assert keys == list(utils.smartstore_keys(100))
+    index, db, h1, h2, bucket_id, rest = keys[0].split('/', 5)
+    assert index == 'main' and db == 'db' and len(h1) == len(h2) == 2
+    assert bucket_id.startswith('0~') and rest == 'receipt.json'
+    assert {k.split('/')[0] for k in keys} == {'main', '_internal', '_audit'}
+    assert any(k.endswith('.tsidx') and '/guidSplunk-' in k for k in keys)
+
+class _FakeListingClient:
+    """
+    In-memory ListObjectsV2/ListObjectVersions over a key set (two versions per key).
+    """
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+
+    def _entries(self, Prefix, Delimiter, after):
+        return [e for e in utils.expected_listing(self.keys, Prefix, Delimiter) if after is None or e > after]
+
+    def list_objects_v2(self, Bucket, Prefix, Delimiter, MaxKeys, ContinuationToken=None):
+        entries = self._entries(Prefix, Delimiter, ContinuationToken)
+        page = entries[:MaxKeys]
+        response = {
+            'IsTruncated': len(entries) > MaxKeys,
+            'Contents': [{'Key': e} for e in page if not (Delimiter and e.endswith(Delimiter))],
+            'CommonPrefixes': [{'Prefix': e} for e in page if Delimiter and e.endswith(Delimiter)],
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def list_object_versions(self, Bucket, Prefix, Delimiter, MaxKeys, KeyMarker=None, VersionIdMarker=None):
+        rows = []
+        for e in self._entries(Prefix, Delimiter, None):
+            if Delimiter and e.endswith(Delimiter):
+                rows.append((e, None))
+            else:
+                rows.extend([(e, 'v2'), (e, 'v1')])
+        if KeyMarker is not None:
+            rows = rows[rows.index((KeyMarker, VersionIdMarker or None)) + 1:]
+        page = rows[:MaxKeys]
+        response = {
+            'IsTruncated': len(rows) > MaxKeys,
+            'Versions': [{'Key': k, 'VersionId': v} for k, v in page if v],
+            'CommonPrefixes': [{'Prefix': k} for k, v in page if not v],
+        }
+        if response['IsTruncated']:
+            response['NextKeyMarker'], response['NextVersionIdMarker'] = page[-1][0], page[-1][1] or ''
+        return response
+
+def test_walk_listing_streams_and_verifies():
+    keys = list(utils.smartstore_keys(300))
+    client = _FakeListingClient(keys)
+    sorted_keys = sorted(keys)
+
+    stats = utils.walk_listing(client, 'b', max_keys=7, expected=sorted_keys)
+    assert stats['keys'] == 300 and stats['pages'] == 43 and stats['page_max'] >= stats['page_p50']
+
+    stats = utils.walk_listing(client, 'b', prefix='main/db/', delimiter='/', max_keys=5,
+                               expected=utils.expected_listing(sorted_keys, 'main/db/', '/'))
+    assert stats['keys'] == 0 and stats['prefixes'] == len({k.split('/')[2] for k in keys if k.startswith('main/')})
+
+    # versions split across pages are listed once
+    stats = utils.walk_listing(client, 'b', versions=True, max_keys=3, expected=sorted_keys)
+    assert stats['keys'] == 600
+
+    e = utils.assert_raises(AssertionError, utils.walk_listing, client, 'b', expected=sorted_keys[:-1] + ['zzz'])
+    assert 'listing mismatch' in str(e)
+    e = utils.assert_raises(AssertionError, utils.walk_listing, client, 'b', expected=sorted_keys + ['zzz'])
+    assert 'incomplete' in str(e)
+
+class _ShuffledListingClient(_FakeListingClient):
+    """Returns each page with its first two keys swapped, or its first version repeated."""
+    def __init__(self, keys, repeat=False):
+        super().__init__(keys)
+        self.repeat = repeat
+
+    def list_objects_v2(self, **kwargs):
+        response = super().list_objects_v2(**kwargs)
+        contents = response['Contents']
+        contents[0], contents[1] = contents[1], contents[0]
+        return response
+
+    def list_object_versions(self, **kwargs):
+        response = super().list_object_versions(**kwargs)
+        versions = response['Versions']
+        if self.repeat:
+            versions[1] = versions[0]
+        else:
+            # the versions of a key come in pairs, so the first two keys are 0 and 2
+            versions[0], versions[2] = versions[2], versions[0]
+        return response
+
+def test_walk_listing_checks_order_within_a_page():
+    keys = list(utils.smartstore_keys(20))
+    e = utils.assert_raises(AssertionError, utils.walk_listing, _ShuffledListingClient(keys), 'b', max_keys=5)
+    assert 'keys out of order' in str(e)
+    e = utils.assert_raises(AssertionError, utils.walk_listing, _ShuffledListingClient(keys), 'b',
+                            max_keys=6, versions=True)
+    assert 'Versions out of order' in str(e)
+    e = utils.assert_raises(AssertionError, utils.walk_listing, _ShuffledListingClient(keys, repeat=True), 'b',
+                            max_keys=6, versions=True)
+    assert 'version listed twice' in str(e)
+
+def test_iter_records_across_chunk_boundaries():
+    text = 'a,1\nbé,2\r\nc,3\r\n' + 'd,4'
+    data = text.encode('utf-8')
+    for size in (1, 2, 3, 5, len(data)):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert list(utils.iter_records(chunks, '\r\n')) == ['a,1\nbé,2', 'c,3', 'd,4']
+        assert list(utils.iter_records(chunks)) == ['a,1', 'bé,2\r', 'c,3\r', 'd,4']
+    assert list(utils.iter_records([])) == []
+
+def test_column_stats():
+    stats = utils.ColumnStats([1, 3]).update(['5,x,-2', '', '7,y,10', '1,z,4'])
+    assert stats.count == 3
+    assert stats.sum == {1: 13, 3: 12}
+    assert stats.min == {1: 1, 3: -2} and stats.max == {1: 7, 3: 10}
+    assert stats.avg(1) == 13 / 3
+
+def test_random_int_table_is_seeded_and_chunked():
+    table = utils.RandomIntTable(25, 3, seed=7, rows_per_chunk=4)
+    csv = table.csv().decode()
+    assert csv == utils.RandomIntTable(25, 3, seed=7, rows_per_chunk=10).csv().decode()
+    assert csv != utils.RandomIntTable(25, 3, seed=8).csv().decode()
+    assert len(list(table.csv_chunks())) == 7
+    assert all(rec.endswith(',') for rec in csv.split('\n')[:-1]) and csv.endswith('\n')
+
+    stats = utils.ColumnStats([1, 2, 3]).update(rec[:-1] for rec in csv.split('\n'))
+    assert table.stats.count == stats.count == 25
+    assert (table.stats.sum, table.stats.min, table.stats.max) == (stats.sum, stats.min, stats.max)
+
+    doc = json.loads(table.json())
+    assert [row['c2'] for row in doc['root']] == [int(rec.split(',')[1]) for rec in csv.split('\n')[:-1]]
+    spaced = table.json(col_delim=', ').decode()
+    assert ', "c2": ' in spaced and json.loads(spaced) == doc
+
+    assert table.csv(col_delim='|', record_delim='\t', csv_schema='a|b|c').decode().startswith('a|b|c\t')
+
+class _FakeUploadClient:
+    def __init__(self, fail_part=None):
+        self.fail_part = fail_part
+        self.calls = []
+        self.parts = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append('put')
+        self.parts[0] = Body
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append('create')
+        return {'UploadId': 'u1'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber == self.fail_part:
+            raise RuntimeError('injected')
+        self.parts[PartNumber] = Body
+        return {'ETag': 'e%d' % PartNumber}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append(('complete', [p['PartNumber'] for p in MultipartUpload['Parts']]))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append('abort')
+
+def test_upload_chunks():
+    chunks = [b'abc', b'defgh', b'ij', b'k']
+    client = _FakeUploadClient()
+    assert utils.upload_chunks(client, 'b', 'k', chunks, part_size=100) == 11
+    assert client.calls == ['put'] and client.parts[0] == b'abcdefghijk'
+
+    client = _FakeUploadClient()
+    assert utils.upload_chunks(client, 'b', 'k', chunks, part_size=4) == 11
+    assert client.calls == ['create', ('complete', [1, 2, 3])]
+    assert [client.parts[n] for n in (1, 2, 3)] == [b'abcd', b'efgh', b'ijk']
+
+    client = _FakeUploadClient(fail_part=2)
+    with pytest.raises(RuntimeError):
+        utils.upload_chunks(client, 'b', 'k', chunks, part_size=4)
+    assert client.calls == ['create', 'abort']
+
+def test_measure_select():
+    ticks = iter([0.0, 0.25, 2.0])
+    events = [
+        {'Progress': {'Details': {'BytesScanned': 10, 'BytesProcessed': 10, 'BytesReturned': 0}}},
+        {'Records': {'Payload': b'1,2\n'}},
+        {'Records': {'Payload': b'3,4\n'}},
+        {'Stats': {'Details': {'BytesScanned': 100, 'BytesProcessed': 100, 'BytesReturned': 8}}},
+        {'End': {}},
+    ]
+    m = utils.measure_select(events, clock=lambda: next(ticks))
+    assert m == {'seconds': 2.0, 'first_record_seconds': 0.25, 'records_bytes': 8,
+                 'bytes_scanned': 100, 'bytes_processed': 100, 'bytes_returned': 8}
+
+def test_append_benchmark_results(tmp_path):
+    entry = utils.benchmark_result('host', 's3select-count', '16MiB', 1, 2.0, 32 * 1024 * 1024, ttfr_ms=5.0)
+    assert entry['throughput_mbps'] == 16.0 and entry['ops_per_sec'] == 0.5 and entry['ttfr_ms'] == 5.0
+    path = utils.append_benchmark_results(str(tmp_path / 'out'), 's3select', [entry])
+    utils.append_benchmark_results(str(tmp_path / 'out'), 's3select', [dict(entry, iteration=2)])
+    with open(path) as f:
+        assert [e['iteration'] for e in json.load(f)] == [1, 2]
+
+def test_header_mutation_is_scoped_per_request():
+    with standin.StandInServer() as server:
+        client = boto3.client('s3', endpoint_url=server.endpoint, region_name='us-east-1',
+                              aws_access_key_id='standin', aws_secret_access_key='standin',
+                              config=Config(signature_version='s3v4'))
+        client.create_bucket(Bucket='headers')
+
+        def put(i):
+            if i % 2:
+                with utils.header_mutation(client, 'PutObject', add={'x-amz-meta-case': str(i)}):
+                    client.put_object(Bucket='headers', Key=str(i), Body=b'x')
+            else:
+                client.put_object(Bucket='headers', Key=str(i), Body=b'x')
+        utils.run_concurrent(put, [(i,) for i in range(16)], max_workers=8).values()
+
+        for i in range(16):
+            metadata = client.head_object(Bucket='headers', Key=str(i))['Metadata']
+            assert metadata == ({'case': str(i)} if i % 2 else {})
+        # other operations inside the block are left alone
+        with utils.header_mutation(client, 'PutObject', remove='Content-Type'):
+            client.copy_object(Bucket='headers', Key='copy', CopySource='headers/1', ContentType='text/plain',
+                               MetadataDirective='REPLACE')
+        assert client.head_object(Bucket='headers', Key='copy')['ContentType'] == 'text/plain'
@@ -0,0 +1,339 @@
+"""
+Request-level tracing of the boto3 clients used by the suite.
+
+With S3TEST_TRACE=<file.jsonl> set, conftest.py installs a RequestTracer on the
+events of boto3's default session at session start, so every client created
+afterwards from it (the get_*_client factories and direct boto3.client()/resource()
+calls alike) reports each API call: operation, bucket, bytes sent/received, HTTP
+status, retries, time to first byte and total latency. Calls are appended to the
+file as one span per line, with OpenTelemetry attribute names; only the slowest
+calls of each test stay in memory, for the summary at session end (see conftest.py).
+
+S3TEST_TIMING=<file.csv> adds PhaseTimings: each test's wall time split into setup
+(bucket nuking), body, sleeps and teardown, with its request and byte counts,
+written as one CSV row per test, slowest first.
+
+Latency is measured from before-parameter-build to after-call; for streaming responses
+(GetObject) that is until the headers arrive, reading the body is not included.
+"""
+
+import contextlib
+import csv
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+import boto3
+
+TRACE_ENV = 'S3TEST_TRACE'
+TIMING_ENV = 'S3TEST_TIMING'
+
+TOTAL_FIELDS = ('calls', 'retries', 'bytes_sent', 'bytes_received', 'seconds')
+
+# calls of each test kept in memory for slowest_by_test(); the rest are only in the file
+KEEP_PER_TEST = 5
+
+def _body_length(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+class RequestTracer:
+    """
+    Collects one record per API call from botocore events. Records go to `path`
+    (JSONL, appended) when given; in memory, each test keeps its per-call totals
+    and its keep_per_test slowest records, so memory grows with tests, not calls.
+    """
+
+    def __init__(self, path=None, keep_per_test=KEEP_PER_TEST):
+        self.path = path
+        self.keep_per_test = keep_per_test
+        self.records = {}  # {test: its slowest records, slowest first}
+        self.current_test = None
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    # -- botocore event handlers -------------------------------------------------
+
+    def _before_parameter_build(self, model, params, context, **kwargs):
+        # before serialization: Bucket/Key are still plain parameters here
+        context['s3tests_trace'] = {
+            'operation': model.name,
+            'service': model.service_model.service_name,
+            'bucket': params.get('Bucket'),
+            'key': params.get('Key'),
+            'test': self.current_test,
+            'start': time.time(),
+            't0': time.perf_counter(),
+            'attempts': 0,
+            'bytes_sent': 0,
+        }
+
+    def _before_send(self, request, **kwargs):
+        trace = (request.context or {}).get('s3tests_trace')
+        if trace is None:
+            return
+        trace['attempts'] += 1
+        trace['sent_at'] = time.perf_counter()
+        length = request.headers.get('Content-Length')
+        trace['bytes_sent'] += int(length) if length else _body_length(request.body)
+
+    def _response_received(self, response_dict, context, **kwargs):
+        trace = context.get('s3tests_trace')
+        if trace is None or response_dict is None:
+            return
+        # first byte of the final attempt, relative to when that attempt was sent
+        trace['ttfb'] = time.perf_counter() - trace.get('sent_at', trace['t0'])
+        trace['status'] = response_dict.get('status_code')
+        length = response_dict.get('headers', {}).get('content-length')
+        trace['bytes_received'] = int(length) if length else 0
+
+    def _after_call(self, http_response, parsed, model, context, **kwargs):
+        trace = context.get('s3tests_trace')
+        if trace is None:
+            return
+        error = parsed.get('Error', {}).get('Code') if isinstance(parsed, dict) else None
+        self._finish(trace, status=getattr(http_response, 'status_code', None), error=error)
+
+    def _after_call_error(self, exception, context, **kwargs):
+        trace = context.get('s3tests_trace')
+        if trace is None:
+            return
+        self._finish(trace, status=trace.get('status'), error=type(exception).__name__)
+
+    # ------------------------------------------------------------------------------
+
+    def _finish(self, trace, status, error):
+        latency = time.perf_counter() - trace['t0']
+        record = {
+            'test': trace['test'],
+            'service': trace['service'],
+            'operation': trace['operation'],
+            'bucket': trace['bucket'],
+            'key': trace['key'],
+            'status': status or trace.get('status'),
+            'error': error,
+            'retries': max(0, trace['attempts'] - 1),
+            'bytes_sent': trace['bytes_sent'],
+            'bytes_received': trace.get('bytes_received', 0),
+            'ttfb': trace.get('ttfb'),
+            'latency': latency,
+            'start': trace['start'],
+        }
+        with self._lock:
+            slowest = self.records.setdefault(record['test'], [])
+            slowest.append(record)
+            slowest.sort(key=lambda r: -r['latency'])
+            del slowest[self.keep_per_test:]
+            totals = self._totals.get(record['test'])
+            if totals is None:
+                totals = self._totals[record['test']] = dict.fromkeys(TOTAL_FIELDS, 0)
+            totals['calls'] += 1
+            totals['retries'] += record['retries']
+            totals['bytes_sent'] += record['bytes_sent']
+            totals['bytes_received'] += record['bytes_received']
+            totals['seconds'] += latency
+            if self._file is not None:
+                self._file.write(json.dumps(self.span(record)) + '\n')
+                self._file.flush()
+
+    @staticmethod
+    def span(record):
+        """A record as an OpenTelemetry-style span (OTLP/JSON field names)."""
+        start_ns = int(record['start'] * 1e9)
+        attributes = {
+            'rpc.system': 'aws-api',
+            'rpc.service': record['service'],
+            'rpc.method': record['operation'],
+            'http.response.status_code': record['status'],
+            'aws.s3.bucket': record['bucket'],
+            'aws.s3.key': record['key'],
+            'http.request.body.size': record['bytes_sent'],
+            'http.response.body.size': record['bytes_received'],
+            'http.request.resend_count': record['retries'],
+            's3tests.ttfb_ms': None if record['ttfb'] is None else round(record['ttfb'] * 1000, 3),
+            's3tests.test': record['test'],
+        }
+        if record['error']:
+            attributes['error.type'] = record['error']
+        return {
+            'traceId': uuid.uuid4().hex,
+            'spanId': uuid.uuid4().hex[:16],
+            'name': '{}.{}'.format(record['service'], record['operation']),
+            'kind': 3,  # SPAN_KIND_CLIENT
+            'startTimeUnixNano': start_ns,
+            'endTimeUnixNano': start_ns + int(record['latency'] * 1e9),
+            'status': {'code': 2 if record['error'] else 1},
+            'attributes': {k: v for k, v in attributes.items() if v is not None},
+        }
+
+    def register(self, events):
+        """Attach the handlers to an event emitter (a botocore session's or client.meta.events)."""
+        for event, handler in (('before-parameter-build.*.*', self._before_parameter_build),
+                               ('before-send.*.*', self._before_send),
+                               ('response-received.*.*', self._response_received),
+                               ('after-call.*.*', self._after_call),
+                               ('after-call-error.*.*', self._after_call_error)):
+            events.register(event, handler, unique_id='s3tests-tracing-{}-{}'.format(id(self), event))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # -- summaries -------------------------------------------------------------------
+
+    def slowest_by_test(self, per_test=3):
+        """
+        {test: [records]}: the per_test (at most keep_per_test) slowest calls of each
+        test, tests with the most time in calls first.
+        """
+        with self._lock:
+            ranked = sorted(self.records, key=lambda test: -self._totals[test]['seconds'])
+            return {test: self.records[test][:per_test] for test in ranked}
+
+    def totals(self, test=None):
+        """Calls, retries, bytes sent/received and time in calls, overall or for one test."""
+        with self._lock:
+            if test is not None:
+                return dict(self._totals.get(test) or dict.fromkeys(TOTAL_FIELDS, 0))
+            return {field: sum(t[field] for t in self._totals.values()) for field in TOTAL_FIELDS}
+
+
+class PhaseTimings:
+    """
+    Wall time per test, split by pytest phase: setup (the autouse fixture nuking
+    buckets), the test body and teardown. time.sleep() in the main thread is
+    taken out of whichever phase it happened in and reported as its own column.
+    Request and byte counts come from the tracer's totals for the test: retries
+    are botocore's, waits are RetryPolicy's backoffs (see retry.py), with the
+    error codes waited on in wait_codes.
+    """
+
+    COLUMNS = ('test', 'outcome', 'total', 'setup', 'body', 'sleep', 'teardown',
+               'requests', 'retries', 'waits', 'bytes_sent', 'bytes_received', 'wait_codes')
+
+    def __init__(self, tracer=None, clock=time.perf_counter):
+        self.tracer = tracer
+        self.clock = clock
+        self.rows = {}
+        self._slept = 0.0
+        self._current = None
+        self._lock = threading.Lock()
+
+    def _row(self, test):
+        row = self.rows.get(test)
+        if row is None:
+            row = self.rows[test] = dict.fromkeys(self.COLUMNS, 0)
+            row['test'] = test
+            row['outcome'] = ''
+            row['wait_codes'] = ''
+        return row
+
+    def count_wait(self, code, delay):
+        """retry.on_retry callback: one backoff wait of the running test."""
+        with self._lock:
+            if self._current is None:
+                return
+            row = self._row(self._current)
+            row['waits'] += 1
+            codes = dict(c.rsplit(':', 1) for c in row['wait_codes'].split(';') if c)
+            codes[code] = int(codes.get(code, 0)) + 1
+            row['wait_codes'] = ';'.join('{}:{}'.format(c, n) for c, n in sorted(codes.items()))
+
+    def wrap_sleep(self, sleep):
+        """A time.sleep replacement that accounts main-thread sleeps to the running phase."""
+        main = threading.main_thread()
+
+        @functools.wraps(sleep)
+        def timed_sleep(seconds):
+            if threading.current_thread() is not main:
+                return sleep(seconds)
+            start = self.clock()
+            try:
+                return sleep(seconds)
+            finally:
+                self._slept += self.clock() - start
+        return timed_sleep
+
+    @contextlib.contextmanager
+    def phase(self, test, when):
+        """Time one of the 'setup', 'call' or 'teardown' phases of a test."""
+        start, slept = self.clock(), self._slept
+        self._current = test
+        try:
+            yield
+        finally:
+            self._current = None
+            row = self._row(test)
+            sleep = self._slept - slept
+            row['sleep'] += sleep
+            row['body' if when == 'call' else when] += self.clock() - start - sleep
+            row['total'] = row['setup'] + row['body'] + row['sleep'] + row['teardown']
+
+    def outcome(self, test, when, outcome):
+        """Record a phase report's outcome; a failure outside the body is an error."""
+        row = self._row(test)
+        if row['outcome'] in ('failed', 'error'):
+            return
+        if outcome == 'failed':
+            row['outcome'] = 'failed' if when == 'call' else 'error'
+        elif when == 'call' or outcome == 'skipped':
+            row['outcome'] = outcome
+
+    def finish(self, test):
+        """Copy the tracer's request counts for a test that has run all its phases."""
+        if self.tracer is None:
+            return
+        totals = self.tracer.totals(test)
+        row = self._row(test)
+        row['requests'] = totals['calls']
+        for field in ('retries', 'bytes_sent', 'bytes_received'):
+            row[field] = totals[field]
+
+    def slowest(self, count=None):
+        return sorted(self.rows.values(), key=lambda row: -row['total'])[:count]
+
+    def phase_totals(self):
+        return {column: sum(row[column] for row in self.rows.values())
+                for column in ('total', 'setup', 'body', 'sleep', 'teardown', 'requests', 'retries', 'waits')}
+
+    def write(self, path):
+        """Write all rows, slowest first, as CSV (times in seconds)."""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNS)
+            writer.writeheader()
+            for row in self.slowest():
+                writer.writerow({k: round(v, 4) if isinstance(v, float) else v for k, v in row.items()})
+
+tracer = None
+
+
+def install(path=None):
+    """Trace every client created from now on by boto3's default session."""
+    global tracer
+    if tracer is None:
+        tracer = RequestTracer(path)
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        tracer.register(boto3.DEFAULT_SESSION.events)
+    return tracer
+
+
+def install_from_env():
+    """Install the tracer when S3TEST_TRACE or S3TEST_TIMING asks for it."""
+    path = os.environ.get(TRACE_ENV)
+    if path or os.environ.get(TIMING_ENV):
+        return install(path or None)
+    return None
@@ -1,7 +1,17 @@
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import os
 import random
 import requests
 import string
+import threading
 import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 def assert_raises(excClass, callableObj, *args, **kwargs):
     """
@@ -45,3 +55,543 @@ def _get_status_and_error_code(response):
     status = response['ResponseMetadata']['HTTPStatusCode']
     error_code = response['Error']['Code']
     return status, error_code
+
+log = logging.getLogger(__name__)
+
+# the header_mutation() block active in each thread: (client, operation, add, remove)
+_header_mutation = threading.local()
+
+def _mutate_headers(client, model, params, **kwargs):
+    mutation = getattr(_header_mutation, 'current', None)
+    if mutation is None or mutation[0] is not client or mutation[1] != model.name:
+        return
+    params['headers'].update(mutation[2])
+    for name in mutation[3]:
+        params['headers'].pop(name, None)
+
+@contextlib.contextmanager
+def header_mutation(client, operation, add=None, remove=()):
+    """
+    Add and/or remove request headers of the `operation` calls client makes in this
+    thread inside the block (before signing, like a before-call handler would).
+
+    The handler is registered once per client and looks up the block of the calling
+    thread, so a client can be shared by any number of cases, concurrently, instead
+    of registering a handler on a fresh client per case.
+    """
+    client.meta.events.register('before-call.s3', functools.partial(_mutate_headers, client),
+                                unique_id='s3tests-header-mutation')
+    previous = getattr(_header_mutation, 'current', None)
+    if isinstance(remove, str):
+        remove = (remove,)
+    _header_mutation.current = (client, operation, dict(add or {}), tuple(remove))
+    try:
+        yield
+    finally:
+        _header_mutation.current = previous
+
+# Outcome of one call made by run_concurrent(): the return value or the exception it
+# raised, and its latency in seconds (measured from after the start barrier).
+CallResult = namedtuple('CallResult', ['index', 'value', 'exception', 'latency'])
+
+DEFAULT_MAX_WORKERS = 64
+
+def latency_stats(latencies):
+    """
+    Return count/min/p50/p90/p99/max of latencies (seconds).
+    """
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'count': 0}
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+    return {'count': len(latencies), 'min': latencies[0], 'p50': pct(0.50),
+            'p90': pct(0.90), 'p99': pct(0.99), 'max': latencies[-1]}
+
+class ConcurrentCalls:
+    """
+    Handle for calls started by start_concurrent().
+
+    wait() joins the calls, values() returns their results in submission order and
+    re-raises the first failure, latency_stats() summarizes how long the calls took.
+    """
+    def __init__(self, func, calls, max_workers, sync_start):
+        self.func = func
+        self.calls = list(calls)
+        self.results = [None] * len(self.calls)
+        workers = max(1, min(max_workers or DEFAULT_MAX_WORKERS, len(self.calls)))
+        # The first wave (one call per worker) is released at once, so the requests collide
+        self.barrier = threading.Barrier(workers) if sync_start and len(self.calls) > 1 else None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures = [self.executor.submit(self._call, i, args)
+                        for i, args in enumerate(self.calls)]
+        self.executor.shutdown(wait=False)
+
+    def _call(self, index, args):
+        if self.barrier is not None and index < self.barrier.parties:
+            self.barrier.wait()
+        start = time.perf_counter()
+        try:
+            value = self.func(*args)
+        except Exception as e:
+            self.results[index] = CallResult(index, None, e, time.perf_counter() - start)
+        else:
+            self.results[index] = CallResult(index, value, None, time.perf_counter() - start)
+
+    def wait(self, timeout=None):
+        for future in self.futures:
+            future.result(timeout=timeout)
+        return self
+
+    def errors(self):
+        return [r for r in self.wait().results if r.exception is not None]
+
+    def values(self):
+        """
+        Return the call results in order; raises the first exception any call raised.
+        """
+        self.wait()
+        for r in self.results:
+            if r.exception is not None:
+                raise r.exception
+        return [r.value for r in self.results]
+
+    def latency_stats(self):
+        """
+        Return count/min/p50/p90/p99/max latency in seconds of the finished calls.
+        """
+        return latency_stats(r.latency for r in self.wait().results)
+
+    def log_latency(self, label):
+        """
+        Log the latency of the calls under contention (visible with --log-cli-level=INFO).
+        """
+        stats = self.latency_stats()
+        if stats['count']:
+            log.info('%s: %d concurrent calls, latency min %.1fms p50 %.1fms p90 %.1fms p99 %.1fms max %.1fms',
+                     label, stats['count'], *(stats[k] * 1000 for k in ('min', 'p50', 'p90', 'p99', 'max')))
+        return stats
+
+def start_concurrent(func, calls, max_workers=None, sync_start=True):
+    """
+    Start func(*args) for each args tuple in calls on a bounded thread pool and return a
+    ConcurrentCalls handle without waiting.
+
+    With sync_start the first max_workers calls wait on a barrier and are released together,
+    so they really hit the server at the same time. Calls sharing one client need a
+    connection pool of max_pool_connections >= max_workers for that (botocore's default
+    is 10); a smaller pool adds client-side connection churn to the measured latency.
+    """
+    return ConcurrentCalls(func, calls, max_workers, sync_start)
+
+def run_concurrent(func, calls, max_workers=None, sync_start=True):
+    """
+    Like start_concurrent(), but wait for all calls to finish.
+    """
+    return start_concurrent(func, calls, max_workers, sync_start).wait()
+
+# Files of one SmartStore bucket in remote storage; {guid} is the uploading peer,
+# {tsidx} a <latest>-<earliest>-<n> time range
+SMARTSTORE_BUCKET_FILES = (
+    'receipt.json',
+    'guidSplunk-{guid}/rawdata/journal.zst',
+    'guidSplunk-{guid}/rawdata/slicesv2.dat',
+    'guidSplunk-{guid}/{tsidx}.tsidx',
+    'guidSplunk-{guid}/bloomfilter',
+    'guidSplunk-{guid}/Hosts.data',
+    'guidSplunk-{guid}/Sources.data',
+    'guidSplunk-{guid}/SourceTypes.data',
+    'guidSplunk-{guid}/Strings.data',
+)
+
+def smartstore_keys(count, indexes=('main', '_internal', '_audit'), seed=0):
+    """
+    Generate count object keys laid out like SmartStore remote storage:
+    <index>/db/<hh>/<hh>/<bucket-id>~<origin-guid>/guidSplunk-<guid>/...
+
+    Buckets are spread round-robin over indexes, each contributing the files in
+    SMARTSTORE_BUCKET_FILES. The same seed gives the same keys.
+    """
+    rand = random.Random(seed)
+    def guid():
+        return '%08X-%04X-%04X-%04X-%012X' % tuple(rand.getrandbits(b) for b in (32, 16, 16, 16, 48))
+    peers = [guid() for _ in range(4)]
+    produced = 0
+    for local_id in itertools.count():
+        for index in indexes:
+            origin = rand.choice(peers)
+            bucket_id = '%d~%s' % (local_id, origin)
+            digest = hashlib.sha1(bucket_id.encode()).hexdigest()
+            latest = 1700000000 + local_id * 3600
+            tsidx = '%d-%d-%d' % (latest, latest - 3600, rand.randrange(1 << 31))
+            for name in SMARTSTORE_BUCKET_FILES:
+                if produced == count:
+                    return
+                yield '%s/db/%s/%s/%s/%s' % (index, digest[0:2], digest[2:4], bucket_id,
+                                             name.format(guid=origin, tsidx=tsidx))
+                produced += 1
+
+def expected_listing(sorted_keys, prefix='', delimiter=''):
+    """
+    Yield, in listing order, the keys and common prefixes a ListObjects call with
+    prefix/delimiter returns for a bucket holding sorted_keys.
+    """
+    last_prefix = None
+    for key in sorted_keys:
+        if not key.startswith(prefix):
+            continue
+        if delimiter:
+            pos = key.find(delimiter, len(prefix))
+            if pos >= 0:
+                common = key[:pos + len(delimiter)]
+                if common != last_prefix:
+                    last_prefix = common
+                    yield common
+                continue
+        yield key
+
+def _assert_ascending(entries, what):
+    for prev, entry in zip(entries, entries[1:]):
+        assert prev < entry, '%s out of order: %r after %r' % (what, entry, prev)
+
+def _page_entries(response, versions):
+    """
+    The keys and common prefixes of a listing page, each checked to come back in
+    ascending order; with versions, every version of a key is a (key, version id) pair.
+    """
+    prefixes = [p['Prefix'] for p in response.get('CommonPrefixes', [])]
+    _assert_ascending(prefixes, 'common prefixes')
+    if versions:
+        keys = []
+        for field in ('Versions', 'DeleteMarkers'):
+            entries = [(e['Key'], e['VersionId']) for e in response.get(field, [])]
+            # the versions of a key are newest first, so only the keys have to ascend
+            for prev, entry in zip(entries, entries[1:]):
+                assert prev[0] <= entry[0], '%s out of order: %r after %r' % (field, entry, prev)
+            keys.extend(entries)
+        keys.sort(key=lambda entry: entry[0])
+    else:
+        keys = [e['Key'] for e in response.get('Contents', [])]
+        _assert_ascending(keys, 'keys')
+    return keys, prefixes
+
+def walk_listing(client, bucket_name, prefix='', delimiter='', max_keys=1000, versions=False, expected=None):
+    """
+    Page through ListObjectsV2 (or ListObjectVersions with versions=True) and check the
+    listing while it streams: entries must be in ascending order across pages and, when
+    expected is given (an iterable such as expected_listing()), match it one page at a
+    time, so only the current page is held in memory.
+
+    Returns a dict with pages, keys, prefixes, seconds, keys_per_sec and per-page
+    latency percentiles (page_p50/page_p90/page_p99/page_max, in seconds).
+    """
+    expected = iter(expected) if expected is not None else None
+    params = dict(Bucket=bucket_name, Prefix=prefix, Delimiter=delimiter, MaxKeys=max_keys)
+    latencies = []
+    num_keys = num_prefixes = 0
+    last = None
+    key_versions = set()  # the version ids listed so far of the last key
+    started = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        if versions:
+            response = client.list_object_versions(**params)
+        else:
+            response = client.list_objects_v2(**params)
+        latencies.append(time.perf_counter() - t0)
+
+        keys, prefixes = _page_entries(response, versions)
+        assert len(keys) + len(prefixes) <= max_keys
+        num_keys += len(keys)
+        num_prefixes += len(prefixes)
+        if versions:
+            # a key with several versions appears once per version, possibly over several
+            # pages: each version must be new, and the key is checked once
+            unique = []
+            for key, version_id in keys:
+                if key == last or (unique and key == unique[-1]):
+                    assert version_id not in key_versions, 'version listed twice: %r %r' % (key, version_id)
+                else:
+                    unique.append(key)
+                    key_versions = set()
+                key_versions.add(version_id)
+            keys = unique
+        for entry in sorted(keys + prefixes):
+            assert last is None or entry > last, 'listing out of order: %r after %r' % (entry, last)
+            if expected is not None:
+                want = next(expected, None)
+                assert entry == want, 'listing mismatch: got %r, expected %r' % (entry, want)
+            last = entry
+
+        if not response['IsTruncated']:
+            break
+        if versions:
+            params['KeyMarker'] = response['NextKeyMarker']
+            params['VersionIdMarker'] = response.get('NextVersionIdMarker', '')
+        else:
+            params['ContinuationToken'] = response['NextContinuationToken']
+
+    if expected is not None:
+        extra = next(expected, None)
+        assert extra is None, 'listing incomplete: %r was not returned' % extra
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'pages': len(latencies),
+        'keys': num_keys,
+        'prefixes': num_prefixes,
+        'seconds': seconds,
+        'keys_per_sec': (num_keys + num_prefixes) / seconds if seconds else 0.0,
+        'page_p50': latencies[len(latencies) // 2],
+        'page_p90': latencies[min(len(latencies) - 1, int(0.90 * len(latencies)))],
+        'page_p99': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        'page_max': latencies[-1],
+    }
+
+def iter_records(chunks, delimiter="\n"):
+    """
+    Yield the decoded records of a stream of byte chunks (e.g. s3select Records payloads)
+    as soon as each one is complete.
+
+    Chunk boundaries may split records and multi-byte characters, so bytes are buffered in
+    a bytearray until the next delimiter; nothing is concatenated beyond one record.
+    A trailing record without delimiter is yielded at the end.
+    """
+    delim = delimiter.encode('utf-8')
+    pending = bytearray()
+    for chunk in chunks:
+        start = len(pending) - len(delim) + 1 if pending else 0
+        pending += chunk
+        consumed = 0
+        pos = pending.find(delim, max(start, 0))
+        while pos >= 0:
+            yield pending[consumed:pos].decode('utf-8')
+            consumed = pos + len(delim)
+            pos = pending.find(delim, consumed)
+        del pending[:consumed]
+    if pending:
+        yield pending.decode('utf-8')
+
+class ColumnStats:
+    """
+    count/sum/min/max of integer columns, accumulated one record at a time so results
+    of any size can be checked without keeping them.
+
+    Columns are 1-based positions, as in s3select's _1, _2, ...
+    """
+    def __init__(self, columns, field_split=","):
+        self.columns = list(columns)
+        self.field_split = field_split
+        self.count = 0
+        self.sum = dict.fromkeys(self.columns, 0)
+        self.min = dict.fromkeys(self.columns)
+        self.max = dict.fromkeys(self.columns)
+
+    def add(self, record):
+        if not record:
+            return
+        fields = record.split(self.field_split)
+        self.count += 1
+        for col in self.columns:
+            value = int(fields[col - 1])
+            self.sum[col] += value
+            if self.min[col] is None or value < self.min[col]:
+                self.min[col] = value
+            if self.max[col] is None or value > self.max[col]:
+                self.max[col] = value
+
+    def update(self, records):
+        for record in records:
+            self.add(record)
+        return self
+
+    def avg(self, col):
+        return float(self.sum[col]) / self.count if self.count else 0.0
+
+class RandomIntTable:
+    """
+    rows x columns of seeded random integers in [0, max_value], rendered as CSV or JSON
+    bytes chunk by chunk (rows_per_chunk rows at a time), so objects of any size can be
+    generated and uploaded without building them in memory.
+
+    The same seed always renders the same object. The expected aggregates of every
+    column (ColumnStats) are computed from the numbers, without rendering or parsing text.
+
+    CSV rows end with col_delim, like create_random_csv_object; JSON is the
+    {"root" : [{"c1": ...}, ...]} document of create_random_json_object, with
+    col_delim between the members of a row.
+    """
+    def __init__(self, rows, columns, seed=0, max_value=1000, rows_per_chunk=10000):
+        self.rows = rows
+        self.columns = columns
+        self.seed = seed
+        self.rows_per_chunk = rows_per_chunk
+        self._population = range(max_value + 1)
+        self._text = [str(v) for v in self._population]
+        self._stats = None
+
+    def _row_values(self):
+        # (rows in chunk, flat row-major values); restarts the seeded sequence on every call
+        rng = random.Random(self.seed)
+        for start in range(0, self.rows, self.rows_per_chunk):
+            n = min(self.rows_per_chunk, self.rows - start)
+            yield n, rng.choices(self._population, k=n * self.columns)
+
+    def csv_chunks(self, col_delim=",", record_delim="\n", csv_schema=""):
+        if csv_schema:
+            yield (csv_schema + record_delim).encode('utf-8')
+        text = self._text
+        columns = self.columns
+        for _, values in self._row_values():
+            cells = [text[v] for v in values]
+            yield "".join(col_delim.join(cells[i:i + columns]) + col_delim + record_delim
+                          for i in range(0, len(cells), columns)).encode('utf-8')
+
+    def json_chunks(self, col_delim=",", record_delim="\n"):
+        keys = ['"c{}": '.format(n) for n in range(1, self.columns + 1)]
+        text = self._text
+        columns = self.columns
+        yield ('{"root" : [' + record_delim).encode('utf-8')
+        separator = ""
+        for _, values in self._row_values():
+            rows = ("{" + col_delim.join(k + text[v] for k, v in zip(keys, values[i:i + columns])) + "}"
+                    for i in range(0, len(values), columns))
+            yield (separator + ("," + record_delim).join(rows)).encode('utf-8')
+            separator = "," + record_delim
+        yield (record_delim + "]}").encode('utf-8')
+
+    def csv(self, **kwargs):
+        return b"".join(self.csv_chunks(**kwargs))
+
+    def json(self, **kwargs):
+        return b"".join(self.json_chunks(**kwargs))
+
+    @property
+    def stats(self):
+        """ColumnStats of all columns (1-based), as s3select should aggregate them."""
+        if self._stats is None:
+            stats = ColumnStats(range(1, self.columns + 1))
+            for n, values in self._row_values():
+                stats.count += n
+                for col in stats.columns:
+                    column = values[col - 1::self.columns]
+                    stats.sum[col] += sum(column)
+                    low, high = min(column), max(column)
+                    if stats.min[col] is None or low < stats.min[col]:
+                        stats.min[col] = low
+                    if stats.max[col] is None or high > stats.max[col]:
+                        stats.max[col] = high
+            self._stats = stats
+        return self._stats
+
+def upload_chunks(client, bucket_name, key, chunks, part_size=8*1024*1024):
+    """
+    Upload a stream of byte chunks, buffering at most one part: a single PUT when the
+    stream fits in part_size, a multipart upload otherwise (aborted on failure).
+    Returns the number of bytes uploaded.
+    """
+    buf = bytearray()
+    chunks = iter(chunks)
+    for chunk in chunks:
+        buf += chunk
+        if len(buf) >= part_size:
+            break
+    if len(buf) < part_size:
+        client.put_object(Bucket=bucket_name, Key=key, Body=bytes(buf))
+        return len(buf)
+
+    upload_id = client.create_multipart_upload(Bucket=bucket_name, Key=key)['UploadId']
+    parts = []
+    total = 0
+    try:
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                buf += chunk
+                if len(buf) < part_size:
+                    continue
+            while len(buf) >= part_size or (chunk is None and buf):
+                body = bytes(buf[:part_size])
+                del buf[:part_size]
+                part_num = len(parts) + 1
+                response = client.upload_part(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                              PartNumber=part_num, Body=body)
+                parts.append({'ETag': response['ETag'], 'PartNumber': part_num})
+                total += len(body)
+        client.complete_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                         MultipartUpload={'Parts': parts})
+    except Exception:
+        client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
+    return total
+
+def measure_select(events, clock=time.monotonic):
+    """
+    Consume a select_object_content event stream, keeping only sizes and timings:
+    seconds (until End), first_record_seconds, records_bytes and the bytes_scanned,
+    bytes_processed and bytes_returned of the Stats event (or of the last Progress
+    event when the store sends no Stats).
+    """
+    start = clock()
+    result = {'seconds': 0.0, 'first_record_seconds': None, 'records_bytes': 0,
+              'bytes_scanned': 0, 'bytes_processed': 0, 'bytes_returned': 0}
+    details = {}
+    for event in events:
+        if 'Records' in event:
+            if result['first_record_seconds'] is None:
+                result['first_record_seconds'] = clock() - start
+            result['records_bytes'] += len(event['Records']['Payload'])
+        elif 'Progress' in event and 'Stats' not in details:
+            details['Progress'] = event['Progress']['Details']
+        elif 'Stats' in event:
+            details['Stats'] = event['Stats']['Details']
+    result['seconds'] = clock() - start
+    final = details.get('Stats', details.get('Progress', {}))
+    result['bytes_scanned'] = final.get('BytesScanned', 0)
+    result['bytes_processed'] = final.get('BytesProcessed', 0)
+    result['bytes_returned'] = final.get('BytesReturned', 0)
+    return result
+
+def benchmark_result(target, operation, object_size, iteration, seconds, nbytes, concurrency=1, **extra):
+    """
+    One measured run as a perf-tests summary.json entry (what report.py charts):
+    nbytes processed in seconds by a single request. object_size is None for
+    operations that carry no object, such as AssumeRole.
+    """
+    latency_ms = seconds * 1000.0
+    entry = {
+        'schema_version': 1,
+        'target': target,
+        'operation': operation,
+        'object_size': object_size,
+        'concurrency': concurrency,
+        'iteration': iteration,
+        'throughput_mbps': nbytes / (1024.0 * 1024.0) / seconds if seconds else 0.0,
+        'ops_per_sec': 1.0 / seconds if seconds else 0.0,
+        'avg_latency_ms': latency_ms,
+        'p50_latency_ms': latency_ms,
+        'p90_latency_ms': latency_ms,
+        'p99_latency_ms': latency_ms,
+        'total_operations': 1,
+        'errors': 0,
+        'error_rate': 0.0,
+    }
+    entry.update(extra)
+    return entry
+
+def append_benchmark_results(results_dir, name, entries):
+    """
+    Append entries to <results_dir>/<name>_summary.json (a JSON list, rewritten atomically)
+    and return its path; report.py --input takes the file as is.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, '{}_summary.json'.format(name))
+    data = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    data.extend(entries)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+    return path
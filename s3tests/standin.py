@@ -0,0 +1,715 @@
+"""
+In-process S3 stand-in: a threaded HTTP server backed by an in-memory store that speaks
+the subset of the S3 API SmartStore uses, so harness-side code (client pools, parallel
+population and cleanup, object generators, listing walkers) can be exercised and
+profiled without a live store.
+
+Supported: ListBuckets, Create/Head/DeleteBucket, Put/Get/Head/Delete/CopyObject (ranged
+GET included), DeleteObjects, ListObjects (v1 and v2), ListObjectVersions (unversioned
+buckets: every version is 'null'), and multipart uploads (create, upload part, complete,
+abort). Requests are not authenticated (signatures are accepted as is), and there is
+no versioning, ACL, policy or lifecycle support; it is a harness tool, not a
+conformance target.
+
+Latency and bandwidth can be injected per request (latency) and per byte sent or
+received (bandwidth), to model a remote store.
+
+Standalone (then point [s3 main] host/port, or S3_ENDPOINT, at it)::
+
+  python -m s3tests.standin --port 8000 --latency-ms 5 --bandwidth-mibps 200
+
+In process::
+
+  with StandInServer(latency=0.005) as server:
+      client = boto3.client('s3', endpoint_url=server.endpoint, ...)
+"""
+
+import argparse
+import base64
+import bisect
+import hashlib
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+S3_XMLNS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+OWNER_ID = 'standin'
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_KEYS = 1000
+# sorts after every key character, to skip all keys under a common prefix
+_KEY_MAX = '\U0010ffff'
+_SEND_CHUNK = 64 * 1024
+
+
+class S3Error(Exception):
+    def __init__(self, status, code, message=''):
+        super().__init__(message or code)
+        self.status = status
+        self.code = code
+        self.message = message or code
+
+
+class StoredObject:
+    __slots__ = ('data', 'etag', 'last_modified', 'content_type', 'metadata')
+
+    def __init__(self, data, etag=None, content_type='binary/octet-stream', metadata=None):
+        self.data = data
+        self.etag = etag or '"{}"'.format(hashlib.md5(data).hexdigest())
+        self.last_modified = time.time()
+        self.content_type = content_type
+        self.metadata = metadata or {}
+
+
+class Bucket:
+    def __init__(self, name):
+        self.name = name
+        self.created = time.time()
+        self.objects = {}
+        self.keys = []       # sorted, for listings
+        self.uploads = {}    # upload id -> (key, {part number: StoredObject}, content type, metadata)
+
+
+class Store:
+    """Buckets and objects in memory; one lock, held only for dict/list updates."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, name):
+        try:
+            return self.buckets[name]
+        except KeyError:
+            raise S3Error(404, 'NoSuchBucket', 'The specified bucket does not exist') from None
+
+    def create_bucket(self, name):
+        with self.lock:
+            if name in self.buckets:
+                raise S3Error(409, 'BucketAlreadyOwnedByYou')
+            self.buckets[name] = Bucket(name)
+
+    def delete_bucket(self, name):
+        with self.lock:
+            bucket = self.bucket(name)
+            if bucket.objects or bucket.uploads:
+                raise S3Error(409, 'BucketNotEmpty', 'The bucket you tried to delete is not empty')
+            del self.buckets[name]
+
+    def put(self, bucket_name, key, obj):
+        with self.lock:
+            bucket = self.bucket(bucket_name)
+            if key not in bucket.objects:
+                bisect.insort(bucket.keys, key)
+            bucket.objects[key] = obj
+
+    def get(self, bucket_name, key):
+        obj = self.bucket(bucket_name).objects.get(key)
+        if obj is None:
+            raise S3Error(404, 'NoSuchKey', 'The specified key does not exist.')
+        return obj
+
+    def delete(self, bucket_name, key):
+        with self.lock:
+            bucket = self.bucket(bucket_name)
+            if bucket.objects.pop(key, None) is not None:
+                del bucket.keys[bisect.bisect_left(bucket.keys, key)]
+
+    def walk(self, bucket_name, prefix='', delimiter='', after='', max_keys=MAX_KEYS):
+        """
+        Keys and common prefixes in listing order, after `after` (a key or a common prefix).
+        Returns (entries, truncated) with entries of ('key', key, obj) / ('prefix', prefix, None).
+        """
+        bucket = self.bucket(bucket_name)
+        with self.lock:
+            keys = bucket.keys
+            start = max(after, prefix)
+            if after and delimiter and after.endswith(delimiter) and after.startswith(prefix):
+                i = bisect.bisect_left(keys, after + _KEY_MAX)
+            elif after >= prefix:
+                i = bisect.bisect_right(keys, start)
+            else:
+                i = bisect.bisect_left(keys, start)
+            entries = []
+            if max_keys == 0:
+                return entries, False
+            while i < len(keys) and keys[i].startswith(prefix):
+                if len(entries) == max_keys:
+                    return entries, True
+                key = keys[i]
+                pos = key.find(delimiter, len(prefix)) if delimiter else -1
+                if pos >= 0:
+                    common = key[:pos + len(delimiter)]
+                    entries.append(('prefix', common, None))
+                    i = bisect.bisect_left(keys, common + _KEY_MAX, i)
+                else:
+                    entries.append(('key', key, bucket.objects[key]))
+                    i += 1
+            return entries, False
+
+    def create_upload(self, bucket_name, key, content_type, metadata):
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self.bucket(bucket_name).uploads[upload_id] = (key, {}, content_type, metadata)
+        return upload_id
+
+    def upload(self, bucket_name, key, upload_id):
+        upload = self.bucket(bucket_name).uploads.get(upload_id)
+        if upload is None or upload[0] != key:
+            raise S3Error(404, 'NoSuchUpload', 'The specified upload does not exist.')
+        return upload
+
+    def put_part(self, bucket_name, key, upload_id, part_number, data):
+        part = StoredObject(data)
+        with self.lock:
+            self.upload(bucket_name, key, upload_id)[1][part_number] = part
+        return part
+
+    def complete_upload(self, bucket_name, key, upload_id, part_list):
+        with self.lock:
+            _, parts, content_type, metadata = self.upload(bucket_name, key, upload_id)
+            chosen = []
+            for n, (number, etag) in enumerate(part_list):
+                part = parts.get(number)
+                if part is None or (etag and etag.strip('"') != part.etag.strip('"')):
+                    raise S3Error(400, 'InvalidPart', 'One or more of the specified parts could not be found.')
+                if n and number <= part_list[n - 1][0]:
+                    raise S3Error(400, 'InvalidPartOrder', 'The list of parts was not in ascending order.')
+                if n < len(part_list) - 1 and len(part.data) < MIN_PART_SIZE:
+                    raise S3Error(400, 'EntityTooSmall',
+                                  'Your proposed upload is smaller than the minimum allowed object size.')
+                chosen.append(part)
+            if not chosen:
+                raise S3Error(400, 'MalformedXML', 'The XML you provided was not well-formed.')
+            digest = hashlib.md5(b''.join(bytes.fromhex(p.etag.strip('"')) for p in chosen)).hexdigest()
+            obj = StoredObject(b''.join(p.data for p in chosen), etag='"{}-{}"'.format(digest, len(chosen)),
+                               content_type=content_type, metadata=metadata)
+            del self.bucket(bucket_name).uploads[upload_id]
+        self.put(bucket_name, key, obj)
+        return obj
+
+    def abort_upload(self, bucket_name, key, upload_id):
+        with self.lock:
+            self.upload(bucket_name, key, upload_id)
+            del self.bucket(bucket_name).uploads[upload_id]
+
+
+def _http_date(ts):
+    return formatdate(ts, usegmt=True)
+
+
+def _iso_date(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(ts))
+
+
+def _element(parent, tag, text=None):
+    e = ET.SubElement(parent, tag)
+    if text is not None:
+        e.text = str(text)
+    return e
+
+
+def _to_xml(root):
+    root.set('xmlns', S3_XMLNS)
+    return b'<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='utf-8')
+
+
+def _from_xml(body):
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError:
+        raise S3Error(400, 'MalformedXML', 'The XML you provided was not well-formed.') from None
+    # drop namespaces, the SDKs send both
+    for e in root.iter():
+        e.tag = e.tag.rsplit('}', 1)[-1]
+    return root
+
+
+def _token(value):
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+
+def _untoken(token):
+    try:
+        return base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    except ValueError:
+        raise S3Error(400, 'InvalidArgument', 'The continuation token provided is incorrect') from None
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, or None to serve the whole object."""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first == '':
+            length = int(last)
+            if length == 0:
+                raise S3Error(416, 'InvalidRange', 'The requested range is not satisfiable')
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise S3Error(416, 'InvalidRange', 'The requested range is not satisfiable')
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class S3RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'S3StandIn'
+    # headers and body are separate writes; with Nagle every kept-alive response stalls ~40ms
+    disable_nagle_algorithm = True
+
+    # -- plumbing ---------------------------------------------------------------
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _throttle(self, nbytes):
+        bandwidth = self.server.bandwidth
+        if bandwidth and nbytes:
+            time.sleep(nbytes / bandwidth)
+
+    def _read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            raw = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                raw += self.rfile.read(size)
+                self.rfile.readline()
+            body = bytes(raw)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._throttle(len(body))
+        encoding = self.headers.get('Content-Encoding', '')
+        if 'aws-chunked' in encoding or self.headers.get('x-amz-content-sha256', '').startswith('STREAMING-'):
+            body = self._decode_aws_chunked(body)
+        return body
+
+    @staticmethod
+    def _decode_aws_chunked(body):
+        # <hex size>[;chunk-signature=...]\r\n<data>\r\n ... 0\r\n[trailers]\r\n
+        out = bytearray()
+        pos = 0
+        while pos < len(body):
+            eol = body.index(b'\r\n', pos)
+            size = int(body[pos:eol].split(b';')[0], 16)
+            if size == 0:
+                break
+            out += body[eol + 2:eol + 2 + size]
+            pos = eol + 2 + size + 2
+        return bytes(out)
+
+    def _send(self, status, body=b'', headers=None, head=False):
+        latency = self.server.latency
+        if latency:
+            time.sleep(latency)
+        self.send_response(status)
+        self.send_header('x-amz-request-id', uuid.uuid4().hex[:16].upper())
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if head or not body:
+            return
+        view = memoryview(body)
+        for start in range(0, len(body), _SEND_CHUNK):
+            chunk = view[start:start + _SEND_CHUNK]
+            self._throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    def _send_xml(self, root, status=200, headers=None):
+        headers = dict(headers or {}, **{'Content-Type': 'application/xml'})
+        self._send(status, _to_xml(root), headers)
+
+    def _send_error(self, error, head=False):
+        root = ET.Element('Error')
+        _element(root, 'Code', error.code)
+        _element(root, 'Message', error.message)
+        _element(root, 'Resource', self.path)
+        body = b'<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding='utf-8')
+        self._send(error.status, b'' if head else body, {'Content-Type': 'application/xml'}, head=head)
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        bucket, _, key = unquote(url.path).lstrip('/').partition('/')
+        head = self.command == 'HEAD'
+        try:
+            # read the body first, so errors never leave it on a kept-alive connection
+            body = self._read_body() if self.command in ('PUT', 'POST') else b''
+            if not bucket:
+                handler = getattr(self, 'service_' + self.command.lower(), None)
+                args = ()
+            elif not key:
+                handler = getattr(self, 'bucket_' + self.command.lower(), None)
+                args = (bucket,)
+            else:
+                handler = getattr(self, 'object_' + self.command.lower(), None)
+                args = (bucket, key)
+            if handler is None:
+                raise S3Error(405, 'MethodNotAllowed')
+            if self.command in ('PUT', 'POST'):
+                args += (body,)
+            handler(*args)
+        except S3Error as e:
+            self._send_error(e, head=head)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = _dispatch
+
+    def _unsupported(self, names):
+        for name in names:
+            if name in self.query:
+                raise S3Error(501, 'NotImplemented', '?{} is not supported by the stand-in'.format(name))
+
+    def _metadata(self):
+        return {name[len('x-amz-meta-'):]: value for name, value in self.headers.items()
+                if name.lower().startswith('x-amz-meta-')}
+
+    def _object_headers(self, obj):
+        headers = {
+            'ETag': obj.etag,
+            'Last-Modified': _http_date(obj.last_modified),
+            'Content-Type': obj.content_type,
+            'Accept-Ranges': 'bytes',
+        }
+        for name, value in obj.metadata.items():
+            headers['x-amz-meta-' + name] = value
+        return headers
+
+    # -- service ----------------------------------------------------------------
+
+    def service_get(self):
+        root = ET.Element('ListAllMyBucketsResult')
+        owner = _element(root, 'Owner')
+        _element(owner, 'ID', OWNER_ID)
+        _element(owner, 'DisplayName', OWNER_ID)
+        buckets = _element(root, 'Buckets')
+        for name in sorted(self.store.buckets):
+            b = _element(buckets, 'Bucket')
+            _element(b, 'Name', name)
+            _element(b, 'CreationDate', _iso_date(self.store.buckets[name].created))
+        self._send_xml(root)
+
+    # -- buckets ----------------------------------------------------------------
+
+    def bucket_put(self, bucket, body):
+        self._unsupported(('acl', 'policy', 'versioning', 'lifecycle', 'cors', 'tagging', 'logging',
+                           'encryption', 'object-lock', 'notification'))
+        self.store.create_bucket(bucket)
+        self._send(200, headers={'Location': '/' + bucket})
+
+    def bucket_head(self, bucket):
+        self.store.bucket(bucket)
+        self._send(200, head=True)
+
+    def bucket_delete(self, bucket):
+        self._unsupported(('policy', 'lifecycle', 'cors', 'tagging', 'encryption'))
+        self.store.delete_bucket(bucket)
+        self._send(204)
+
+    def bucket_post(self, bucket, body):
+        if 'delete' not in self.query:
+            raise S3Error(405, 'MethodNotAllowed')
+        request = _from_xml(body)
+        quiet = (request.findtext('Quiet') or '').lower() == 'true'
+        root = ET.Element('DeleteResult')
+        for obj in request.findall('Object'):
+            key = obj.findtext('Key')
+            version_id = obj.findtext('VersionId')
+            try:
+                if version_id not in (None, 'null'):
+                    raise S3Error(400, 'NoSuchVersion', 'The specified version does not exist.')
+                self.store.delete(bucket, key)
+            except S3Error as e:
+                error = _element(root, 'Error')
+                _element(error, 'Key', key)
+                _element(error, 'Code', e.code)
+                _element(error, 'Message', e.message)
+                continue
+            if not quiet:
+                deleted = _element(root, 'Deleted')
+                _element(deleted, 'Key', key)
+                if version_id:
+                    _element(deleted, 'VersionId', version_id)
+        self._send_xml(root)
+
+    def bucket_get(self, bucket):
+        if 'location' in self.query:
+            self.store.bucket(bucket)
+            return self._send_xml(ET.Element('LocationConstraint'))
+        if 'versioning' in self.query:
+            self.store.bucket(bucket)
+            return self._send_xml(ET.Element('VersioningConfiguration'))
+        if 'versions' in self.query:
+            return self._list_versions(bucket)
+        self._unsupported(('acl', 'policy', 'lifecycle', 'cors', 'tagging', 'logging', 'encryption',
+                           'object-lock', 'notification', 'uploads'))
+        if self.query.get('list-type') == '2':
+            return self._list_v2(bucket)
+        return self._list_v1(bucket)
+
+    def _listing_args(self):
+        try:
+            max_keys = min(int(self.query.get('max-keys', MAX_KEYS)), MAX_KEYS)
+        except ValueError:
+            raise S3Error(400, 'InvalidArgument', 'max-keys must be an integer') from None
+        if max_keys < 0:
+            raise S3Error(400, 'InvalidArgument', 'max-keys must be >= 0')
+        return self.query.get('prefix', ''), self.query.get('delimiter', ''), max_keys
+
+    def _add_entries(self, root, entries, contents_tag='Contents', version=False):
+        for kind, name, obj in entries:
+            if kind == 'prefix':
+                _element(_element(root, 'CommonPrefixes'), 'Prefix', name)
+                continue
+            item = _element(root, contents_tag)
+            _element(item, 'Key', name)
+            if version:
+                _element(item, 'VersionId', 'null')
+                _element(item, 'IsLatest', 'true')
+            _element(item, 'LastModified', _iso_date(obj.last_modified))
+            _element(item, 'ETag', obj.etag)
+            _element(item, 'Size', len(obj.data))
+            _element(item, 'StorageClass', 'STANDARD')
+            if version or self.query.get('fetch-owner') == 'true' or self.query.get('list-type') != '2':
+                owner = _element(item, 'Owner')
+                _element(owner, 'ID', OWNER_ID)
+                _element(owner, 'DisplayName', OWNER_ID)
+
+    def _list_header(self, tag, bucket, prefix, delimiter, max_keys, truncated):
+        root = ET.Element(tag)
+        _element(root, 'Name', bucket)
+        _element(root, 'Prefix', prefix)
+        if delimiter:
+            _element(root, 'Delimiter', delimiter)
+        _element(root, 'MaxKeys', max_keys)
+        _element(root, 'IsTruncated', 'true' if truncated else 'false')
+        return root
+
+    def _list_v1(self, bucket):
+        prefix, delimiter, max_keys = self._listing_args()
+        marker = self.query.get('marker', '')
+        entries, truncated = self.store.walk(bucket, prefix, delimiter, marker, max_keys)
+        root = self._list_header('ListBucketResult', bucket, prefix, delimiter, max_keys, truncated)
+        _element(root, 'Marker', marker)
+        if truncated and delimiter:
+            _element(root, 'NextMarker', entries[-1][1])
+        self._add_entries(root, entries)
+        self._send_xml(root)
+
+    def _list_v2(self, bucket):
+        prefix, delimiter, max_keys = self._listing_args()
+        token = self.query.get('continuation-token')
+        start_after = self.query.get('start-after', '')
+        after = _untoken(token) if token else start_after
+        entries, truncated = self.store.walk(bucket, prefix, delimiter, after, max_keys)
+        root = self._list_header('ListBucketResult', bucket, prefix, delimiter, max_keys, truncated)
+        _element(root, 'KeyCount', len(entries))
+        if token:
+            _element(root, 'ContinuationToken', token)
+        if start_after:
+            _element(root, 'StartAfter', start_after)
+        if truncated:
+            _element(root, 'NextContinuationToken', _token(entries[-1][1]))
+        self._add_entries(root, entries)
+        self._send_xml(root)
+
+    def _list_versions(self, bucket):
+        prefix, delimiter, max_keys = self._listing_args()
+        key_marker = self.query.get('key-marker', '')
+        entries, truncated = self.store.walk(bucket, prefix, delimiter, key_marker, max_keys)
+        root = self._list_header('ListVersionsResult', bucket, prefix, delimiter, max_keys, truncated)
+        _element(root, 'KeyMarker', key_marker)
+        _element(root, 'VersionIdMarker', self.query.get('version-id-marker', ''))
+        if truncated:
+            _element(root, 'NextKeyMarker', entries[-1][1])
+            _element(root, 'NextVersionIdMarker', 'null')
+        self._add_entries(root, entries, contents_tag='Version', version=True)
+        self._send_xml(root)
+
+    # -- objects ----------------------------------------------------------------
+
+    def _version_check(self):
+        if self.query.get('versionId') not in (None, 'null'):
+            raise S3Error(404, 'NoSuchVersion', 'The specified version does not exist.')
+
+    def object_put(self, bucket, key, body):
+        self._unsupported(('acl', 'tagging', 'retention', 'legal-hold', 'restore'))
+        if 'uploadId' in self.query:
+            return self._upload_part(bucket, key, body)
+        self.store.bucket(bucket)
+        source = self.headers.get('x-amz-copy-source')
+        if source:
+            return self._copy_object(bucket, key, source)
+        obj = StoredObject(body, content_type=self.headers.get('Content-Type', 'binary/octet-stream'),
+                           metadata=self._metadata())
+        self.store.put(bucket, key, obj)
+        self._send(200, headers={'ETag': obj.etag})
+
+    def _copy_object(self, bucket, key, source):
+        source = unquote(source.split('?versionId=')[0]).lstrip('/')
+        src_bucket, _, src_key = source.partition('/')
+        src = self.store.get(src_bucket, src_key)
+        if self.headers.get('x-amz-metadata-directive', 'COPY').upper() == 'REPLACE':
+            content_type, metadata = self.headers.get('Content-Type', src.content_type), self._metadata()
+        else:
+            content_type, metadata = src.content_type, dict(src.metadata)
+        obj = StoredObject(src.data, etag=src.etag, content_type=content_type, metadata=metadata)
+        self.store.put(bucket, key, obj)
+        root = ET.Element('CopyObjectResult')
+        _element(root, 'LastModified', _iso_date(obj.last_modified))
+        _element(root, 'ETag', obj.etag)
+        self._send_xml(root)
+
+    def object_get(self, bucket, key, head=False):
+        self._unsupported(('acl', 'tagging', 'retention', 'legal-hold', 'attributes', 'uploadId'))
+        self._version_check()
+        obj = self.store.get(bucket, key)
+        headers = self._object_headers(obj)
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and if_none_match.strip() in (obj.etag, '*'):
+            return self._send(304, headers={'ETag': obj.etag}, head=True)
+        if_match = self.headers.get('If-Match')
+        if if_match and if_match.strip() not in (obj.etag, '*'):
+            raise S3Error(412, 'PreconditionFailed', 'At least one of the pre-conditions you specified did not hold')
+        size = len(obj.data)
+        byte_range = _parse_range(self.headers.get('Range'), size)
+        if byte_range is None:
+            return self._send(200, obj.data, headers, head=head)
+        start, end = byte_range
+        headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+        self._send(206, obj.data[start:end + 1], headers, head=head)
+
+    def object_head(self, bucket, key):
+        self.object_get(bucket, key, head=True)
+
+    def object_delete(self, bucket, key):
+        if 'uploadId' in self.query:
+            self.store.abort_upload(bucket, key, self.query['uploadId'])
+            return self._send(204)
+        self._unsupported(('tagging',))
+        self._version_check()
+        self.store.delete(bucket, key)
+        self._send(204)
+
+    def object_post(self, bucket, key, body):
+        if 'uploads' in self.query:
+            self.store.bucket(bucket)
+            upload_id = self.store.create_upload(bucket, key, self.headers.get('Content-Type', 'binary/octet-stream'),
+                                                 self._metadata())
+            root = ET.Element('InitiateMultipartUploadResult')
+            _element(root, 'Bucket', bucket)
+            _element(root, 'Key', key)
+            _element(root, 'UploadId', upload_id)
+            return self._send_xml(root)
+        if 'uploadId' in self.query:
+            request = _from_xml(body)
+            try:
+                parts = [(int(p.findtext('PartNumber')), p.findtext('ETag')) for p in request.findall('Part')]
+            except (TypeError, ValueError):
+                raise S3Error(400, 'MalformedXML', 'The XML you provided was not well-formed.') from None
+            obj = self.store.complete_upload(bucket, key, self.query['uploadId'], parts)
+            root = ET.Element('CompleteMultipartUploadResult')
+            _element(root, 'Location', '/{}/{}'.format(bucket, key))
+            _element(root, 'Bucket', bucket)
+            _element(root, 'Key', key)
+            _element(root, 'ETag', obj.etag)
+            return self._send_xml(root)
+        raise S3Error(405, 'MethodNotAllowed')
+
+    def _upload_part(self, bucket, key, body):
+        try:
+            part_number = int(self.query.get('partNumber', ''))
+        except ValueError:
+            raise S3Error(400, 'InvalidArgument', 'Part number must be an integer') from None
+        if not 1 <= part_number <= 10000:
+            raise S3Error(400, 'InvalidArgument', 'Part number must be an integer between 1 and 10000')
+        if self.headers.get('x-amz-copy-source'):
+            raise S3Error(501, 'NotImplemented', 'UploadPartCopy is not supported by the stand-in')
+        part = self.store.put_part(bucket, key, self.query['uploadId'], part_number, body)
+        self._send(200, headers={'ETag': part.etag})
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    The stand-in on host:port (port 0 picks a free one; see .endpoint), serving from a
+    background thread between start() and stop(), or as a context manager.
+
+    latency: seconds added to every response; bandwidth: bytes/s cap applied to each
+    request and response body (per connection).
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=None, store=None, verbose=False):
+        super().__init__((host, port), S3RequestHandler)
+        self.store = store or Store()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='s3-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-memory S3 stand-in for running the harness offline')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='added to every response')
+    parser.add_argument('--bandwidth-mibps', type=float, default=0.0,
+                        help='MiB/s cap per request and response body (0: unlimited)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, latency=args.latency_ms / 1000.0,
+                           bandwidth=args.bandwidth_mibps * 1024 * 1024 or None, verbose=args.verbose)
+    print('S3 stand-in listening on {}'.format(server.endpoint), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()